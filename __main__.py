@@ -17,6 +17,11 @@ In addition, you should have the following subfolders
 
 Moving any of these folders or files will prevent the game from working properly
 
+To play a huge formation scaled to fit the window (see consts.py), start the game
+in stress mode with the number of rows and columns:
+
+    python invaders --stress 200 300
+
 Author: Walker M. White (wmw2)
 Date:   November 20, 2019
 """
@@ -25,4 +30,4 @@ from app import *
 
 # Application code
 if __name__ == '__main__':
-    Invaders(width=GAME_WIDTH,height=GAME_HEIGHT).run()
+    Invaders(width=GAME_WIDTH,height=GAME_HEIGHT,fps=RENDER_FPS).run()
@@ -0,0 +1,311 @@
+"""
+Allocation audit module for Alien Invaders
+
+This module measures the memory allocated by the stages of each animation
+frame, the same stages the profiler times.  A frame loop that allocates makes
+the garbage collector run during play, which shows up as hitches long after the
+code that caused it; the audit shows which stage allocated, and how much.
+
+An Audit has the same methods as a Profiler (see profiler.py), so it is given
+to Invaders, Wave and Simulation in its place.  At each lap it reads tracemalloc
+and charges the stage with
+
+    bytes       the memory the stage allocated and kept (net)
+    peak        the most memory the stage had allocated at once, counting
+                temporaries it freed again before the lap
+    blocks      the memory blocks (mostly objects) the stage allocated and kept
+
+The method finish stores the totals of the frame (the peak is the largest of
+the stage) in a ring buffer, like the profiler.  The method check raises an
+AssertionError naming every stage over a budget, so an allocation regression
+in the frame loop fails loudly in a test or script.  The method dump writes the
+source lines of this game that kept the most memory since the last dump.
+
+tracemalloc slows everything down, so the audit is only on when asked for:
+
+    python invaders --audit     (the profiler overlay shows the audit table)
+    python allocs.py            (audits a headless game and checks the budgets)
+
+Paliska Bradley, bp355 and Philip Coppolino, pcc78
+"""
+from consts import *
+from array import array
+import json
+import os
+import sys
+import tracemalloc
+
+# PRIMARY RULE: This module may only access consts.py, so that it can also
+# audit a headless Simulation.  The script code at the bottom is the exception.
+
+# The folder of the game source, to find its lines in a tracemalloc snapshot
+SOURCE = os.path.dirname(os.path.abspath(__file__))
+
+
+class Audit(object):
+    """
+    A class to measure the memory allocated by the stages of each frame.
+
+    Stages are named by strings, and are reported in the order in which they
+    were first lapped.  A new audit starts tracemalloc if it is not running
+    yet, and only counts the memory allocated after that.  The sizes are in
+    bytes; the memory used by the audit's own laps is not counted.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _stages: the names of the stages lapped so far
+    # Invariant: _stages is a list of strings, in the order first lapped
+    #
+    # Attribute _index: the position of each stage in _stages
+    # Invariant: _index is a dictionary mapping the strings of _stages to ints
+    #
+    # Attribute _samples: the bytes, peak and blocks of each stage in the last
+    # frames
+    # Invariant: _samples is a list of array('q') of length 3*_size, one per
+    # stage; frame slot n is at 3*n; the entries are 0 if the stage was not
+    # lapped in that frame
+    #
+    # Attribute _current: the bytes, peak and blocks of each stage in the
+    # current frame
+    # Invariant: _current is an array('q'), three entries per stage
+    #
+    # Attribute _size: the number of frames in the ring buffer
+    # Invariant: _size is an int > 0
+    #
+    # Attribute _frames: the number of frames finished so far
+    # Invariant: _frames is an int >= 0; frame number n is in slot n % _size
+    #
+    # Attribute _mark: the memory traced at the last lap (or start of the frame)
+    # Invariant: _mark is an int >= 0
+    #
+    # Attribute _blocks: the memory blocks allocated at the last lap
+    # Invariant: _blocks is an int >= 0
+    #
+    # Attribute _overhead: the peak measured by a lap right after start, with
+    # nothing between them
+    # Invariant: _overhead is an int >= 0
+    #
+    # Attribute _snapshot: the tracemalloc snapshot of the last dump
+    # Invariant: _snapshot is a tracemalloc.Snapshot, or None before the first
+    # dump
+
+    # GETTERS AND SETTERS
+    def getStages(self):
+        """
+        Returns the names of the stages lapped so far (as a tuple)
+        """
+        return tuple(self._stages)
+
+    def getFrames(self):
+        """
+        Returns the number of frames finished so far
+        """
+        return self._frames
+
+    def __init__(self, frames=PROFILE_FRAMES):
+        """
+        Initializes an audit with no stages.
+
+        Parameter frames: the number of frames kept for the report
+        Precondition: frames is an int > 0
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._stages = []
+        self._index = {}
+        self._samples = []
+        self._current = array('q')
+        self._size = frames
+        self._frames = 0
+        self._snapshot = None
+        self._overhead = 0
+        self.start()
+        self._overhead = max(0, tracemalloc.get_traced_memory()[1]-self._mark)
+
+    def clear(self):
+        """
+        Forgets every frame so far (but not the stages)
+
+        Call this after the first frames of a game, which fill the caches and
+        grow the arrays that the frames after them reuse.
+        """
+        for pos in range(len(self._stages)):
+            samples = self._samples[pos]
+            for slot in range(3*self._size):
+                samples[slot] = 0
+            for slot in range(3*pos, 3*pos+3):
+                self._current[slot] = 0
+        self._frames = 0
+        self.start()
+
+    def start(self):
+        """
+        Begins a new frame (the memory allocated since the last lap is not counted)
+        """
+        self._mark = tracemalloc.get_traced_memory()[0]
+        self._blocks = sys.getallocatedblocks()
+        tracemalloc.reset_peak()
+
+    def lap(self, stage):
+        """
+        Charges the memory allocated since the previous lap to the given stage
+
+        Parameter stage: the name of the stage
+        Precondition: stage is a string
+        """
+        traced, peak = tracemalloc.get_traced_memory()
+        blocks = sys.getallocatedblocks()
+        pos = self._index.get(stage)
+        if pos is None:
+            pos = len(self._stages)
+            self._index[stage] = pos
+            self._stages.append(stage)
+            self._samples.append(array('q', bytes(8*3*self._size)))
+            self._current.extend((0, 0, 0))
+        current = self._current
+        current[3*pos] += traced-self._mark
+        current[3*pos+1] = max(current[3*pos+1], peak-self._mark-self._overhead)
+        current[3*pos+2] += blocks-self._blocks
+        del traced, peak, blocks
+        self._mark = tracemalloc.get_traced_memory()[0]
+        self._blocks = sys.getallocatedblocks()
+        tracemalloc.reset_peak()
+
+    def finish(self):
+        """
+        Ends the frame, storing the allocations of each stage in the ring buffer
+        """
+        slot = 3*(self._frames % self._size)
+        current = self._current
+        for pos in range(len(self._stages)):
+            samples = self._samples[pos]
+            for k in range(3):
+                samples[slot+k] = current[3*pos+k]
+                current[3*pos+k] = 0
+        self._frames += 1
+        self.start()
+
+    def worst(self, stage):
+        """
+        Returns the most bytes, peak and blocks of a stage in one frame
+
+        The result is a tuple (bytes, peak, blocks), each the largest over the
+        frames in the ring buffer (so they may come from different frames).
+        It is all zeros if no frame has been finished.
+
+        Parameter stage: the name of the stage (or 'frame' for the total)
+        Precondition: stage is 'frame' or a string in getStages()
+        """
+        count = min(self._frames, self._size)
+        if count == 0:
+            return (0, 0, 0)
+        if stage == 'frame':
+            return tuple(max(sum(samples[3*slot+k] for samples in self._samples)
+                             for slot in range(count)) for k in range(3))
+        samples = self._samples[self._index[stage]]
+        return tuple(max(samples[k:3*count:3]) for k in range(3))
+
+    def report(self):
+        """
+        Returns a table of the worst allocations per frame of every stage
+        """
+        lines = ['%-14s%8s%8s%7s' % ('stage', 'bytes', 'peak', 'blocks')]
+        for stage in self._stages+['frame']:
+            lines.append('%-14s%8d%8d%7d' % ((stage,)+self.worst(stage)))
+        return '\n'.join(lines)
+
+    def check(self, budget=ALLOC_BUDGET):
+        """
+        Raises an AssertionError if a stage allocated more than its budget
+
+        A stage is over budget if, in any frame in the ring buffer, it kept
+        more bytes than the budget or had more than the budget allocated at
+        once.  The message lists every stage over budget, with the report.
+
+        Parameter budget: the most bytes a stage may allocate per frame, or a
+        dictionary of them by stage (stages not in it have no budget)
+        Precondition: budget is an int >= 0, or a dictionary mapping strings
+        to ints >= 0
+        """
+        over = []
+        for stage in self._stages:
+            limit = budget.get(stage) if isinstance(budget, dict) else budget
+            size, peak, blocks = self.worst(stage)
+            if limit is not None and max(size, peak) > limit:
+                over.append('%s allocated %d bytes (peak %d) in a frame, budget %d' %
+                            (stage, size, peak, limit))
+        if over:
+            raise AssertionError('\n'.join(over)+'\n'+self.report())
+
+    def dump(self, filename, limit=ALLOC_LINES):
+        """
+        Writes the lines of the game that kept the most memory since the last dump
+
+        The file is JSON: a list of the limit lines of the game source (in
+        this folder) whose memory grew the most since the last dump (or since
+        the audit started tracing), largest first.
+
+        Parameter filename: the file to write
+        Precondition: filename is a string
+
+        Parameter limit: the most lines to write
+        Precondition: limit is an int > 0
+        """
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(True, os.path.join(SOURCE, '*')),
+             tracemalloc.Filter(False, __file__)))
+        if self._snapshot is None:
+            stats = snapshot.statistics('lineno')
+        else:
+            stats = [stat for stat in snapshot.compare_to(self._snapshot, 'lineno') if stat.size_diff]
+        self._snapshot = snapshot
+        lines = []
+        for stat in stats[:limit]:
+            frame = stat.traceback[0]
+            lines.append({'file': os.path.basename(frame.filename), 'line': frame.lineno,
+                          'bytes': getattr(stat, 'size_diff', stat.size),
+                          'blocks': getattr(stat, 'count_diff', stat.count)})
+        with open(filename, 'w') as file:
+            json.dump(lines, file, indent=1)
+
+
+# Script code
+if __name__ == '__main__':
+    import argparse
+    import random
+    from simulation import Simulation, ScriptedInput
+
+    parser = argparse.ArgumentParser(description='Audit the allocations of a headless game.')
+    parser.add_argument('--frames', type=int, default=3600, help='frames to audit')
+    parser.add_argument('--warmup', type=int, default=600, help='frames before the audit')
+    parser.add_argument('--budget', type=int, default=ALLOC_BUDGET, help='bytes per stage per frame')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    audit = Audit(args.frames)
+    sim = Simulation(args.seed)
+    sim.setProfiler(audit)
+    input = ScriptedInput()
+    choices = ((), ('left',), ('right',), ('spacebar',), ('left', 'spacebar'), ('right', 'spacebar'))
+    rng = random.Random(args.seed)
+    for frame in range(args.warmup+args.frames):
+        if frame == args.warmup:
+            audit.clear()
+        input.hold(rng.choice(choices))
+        audit.start()
+        sim.update(input, SIM_STEP)
+        state = sim.state()
+        if state == 'pause':
+            sim.new()
+        elif state == 'win':
+            sim.nextwave()
+        elif state == 'over':
+            sim.reset()
+        audit.lap('statecheck')
+        audit.finish()
+    print(audit.report())
+    try:
+        audit.check(args.budget)
+    except AssertionError as error:
+        print(error.args[0].split('\n'+audit.report())[0])
+        sys.exit(1)
+    print('no stage allocated more than %d bytes per frame' % args.budget)
@@ -13,11 +13,21 @@ Paliska Bradley, bp355 and Philip Coppolino, pcc78
 from consts import *
 from game2d import *
 from wave import *
+from hud import *
+from replay import *
+from profiler import *
+from allocs import *
+from latency import *
+from kivy.core.window import Window, Keyboard
+from assets import *
 
 
 # PRIMARY RULE: Invaders can only access attributes in wave.py via getters/setters
 # Invaders is NOT allowed to access anything in models.py
 
+# The names of the keys (as in GInput) by their key codes in the window
+KEYNAMES = {code: name for name, code in Keyboard.keycodes.items()}
+
 class Invaders(GameApp):
     """
     The primary controller class for the Alien Invaders application
@@ -70,8 +80,47 @@ class Invaders(GameApp):
     # store any score across multiple waves). But you must document them.
     # LIST MORE ATTRIBUTES (AND THEIR INVARIANTS) HERE IF NECESSARY
 
-    #Attribute _lastkeys: the number of keys pressed last frame
-    #Invariant: _lastkeys is an int >= 0
+    #Attribute _keys: the key events of the window, consumed by each update
+    #(and by each frame in which the wave is not played)
+    #Invariant: _keys is an EventInput object
+
+    #Attribute _probe: the time from each key press to the frame showing it
+    #Invariant: _probe is a LatencyProbe object
+
+    #Attribute _messages: the labels for the messages, created once each
+    #Invariant: _messages is a TextCache object
+
+    #Attribute _hud: the score and lives display shown during play
+    #Invariant: _hud is a Hud object, or None until the first wave (so that
+    #its font is loaded by _assets first)
+
+    #Attribute _assets: the images, fonts and sounds shared by every wave
+    #Invariant: _assets is an Assets object
+
+    #Attribute _recording: the input recorded for the current game (every
+    #wave of it)
+    #Invariant: _recording is a Recording object, or None if RECORD_FILE is
+    #None or no game was started yet
+
+    #Attribute _replay: the recorded input being replayed
+    #Invariant: _replay is a ScriptedInput object, or None if REPLAY_FILE is
+    #None or no game was started yet
+
+    #Attribute _accumulator: the time not yet simulated by the wave
+    #Invariant: _accumulator is a float >= 0, and < SIM_STEP after each frame
+    #in STATE_ACTIVE
+
+    #Attribute _profiler: the profiler timing the stages of each frame (or
+    #auditing their allocations, if AUDIT)
+    #Invariant: _profiler is a Profiler object (an Audit object if AUDIT), or
+    #None if profiling is off
+
+    #Attribute _overlay: the table of stage timings shown while profiling
+    #Invariant: _overlay is an Overlay object
+
+    #Attribute _lastprofile: whether PROFILE_KEY and TRACE_KEY were down
+    #last frame
+    #Invariant: _lastprofile is a tuple of two bools
 
 
     # DO NOT MAKE A NEW INITIALIZER!
@@ -92,11 +141,20 @@ class Invaders(GameApp):
         to play a game.
         """
         self._state = STATE_INACTIVE
-        self._text = GLabel(text="Press 'S' to Play",font_name = 'RetroGame.ttf', font_size = 40,halign='center', valign='middle')
-        self._text.x = self.width // 2
-        self._text.y = self.height // 2
+        self._messages = TextCache()
+        self._hud = None
+        self._assets = Assets()
+        self._message("Press 'S' to Play")
         self._wave = None
-        self._lastkeys = 0
+        self._keys = EventInput()
+        self._probe = LatencyProbe()
+        Window.bind(on_key_down=self._keydown,on_key_up=self._keyup)
+        self._recording = None
+        self._replay = None
+        self._accumulator = 0.0
+        self._profiler = self._newprofiler() if PROFILE or AUDIT else None
+        self._overlay = Overlay()
+        self._lastprofile = (False,False)
 
 
     def update(self,dt):
@@ -120,13 +178,16 @@ class Invaders(GameApp):
         displays a simple message on the screen. The application remains in
         this state so long as the player never presses a key.  In addition,
         this is the state the application returns to when the game is over
-        (all lives are lost or all aliens are dead).
+        (all lives are lost or all aliens are dead).  While waiting, the
+        assets of the game are loaded, a few each frame.
 
         STATE_NEWWAVE: This is the state creates a new wave and shows it on
         the screen. The application switches to this state if the state was
         STATE_INACTIVE in the previous frame, and the player pressed a key.
-        This state only lasts one animation frame before switching to
-        STATE_ACTIVE.
+        If the last wave was won, the next (faster) wave of the same game
+        starts; otherwise a new game starts.  This state switches to
+        STATE_ACTIVE in the same animation frame, and the first update of the
+        wave is played in that frame too.
 
         STATE_ACTIVE: This is a session of normal gameplay.  The player can
         move the ship and fire laser bolts.  All of this should be handled
@@ -139,43 +200,62 @@ class Invaders(GameApp):
 
         STATE_CONTINUE: This state restores the ship after it was destroyed.
         The application switches to this state if the state was STATE_PAUSED
-        in the previous frame, and the player pressed a key. This state only
-        lasts one animation frame before switching to STATE_ACTIVE.
+        in the previous frame, and the player pressed a key. Like
+        STATE_NEWWAVE, it switches to STATE_ACTIVE and plays the first update
+        in the same animation frame.
 
         STATE_COMPLETE: The wave is over, and is either won or lost.
 
         You are allowed to add more states if you wish. Should you do so, you should
         describe them here.
 
+        While profiling, PROFILE_KEY turns the profiler off (or back on) and
+        TRACE_KEY writes the recent stage timings to TRACE_FILE.  In an
+        allocation audit, TRACE_KEY writes the source lines that kept the most
+        memory instead (see allocs.py).
+
         Parameter dt: The time in seconds since last update
         Precondition: dt is a number (int or float)
         """
+        if self._profiler is not None:
+            self._profiler.start()
+        self._profilekeys()
         self._determineState()
+        resumed = self._state == STATE_NEWWAVE or self._state == STATE_CONTINUE
 
         if self._state == STATE_INACTIVE:
-            self._text = GLabel(text="Press 'S' to Play",font_size = 64,halign='center', valign='middle')
-            self._text.x = self.width // 2
-            self._text.y = self.height // 2
+            self._message("Press 'S' to Play")
+            self._assets.step()
 
         if self._state == STATE_NEWWAVE:
             self._text = None
-            self._wave = Wave()
-            self._state = STATE_ACTIVE
-
-        self._stateactiv()
-
-        if self._state == STATE_PAUSED:
-            self._text = GLabel(text="Press 'S' to continue",font_size = 64,halign='center', valign='middle')
-            self._text.x = self.width // 2
-            self._text.y = self.height // 2
+            self._newwave()
+            self._resume()
 
         if self._state == STATE_CONTINUE:
             self._text = None
             self._wave.new()
-            self._state = STATE_ACTIVE
+            self._resume()
+
+        if self._profiler is not None:
+            self._profiler.lap('invaders')
+
+        self._stateactiv(max(dt,SIM_STEP) if resumed else dt)
+
+        if self._state == STATE_PAUSED and self._replay is not None:
+            self._state = STATE_CONTINUE
+
+        if self._state == STATE_PAUSED:
+            self._message("Press 'S' to continue")
 
         self._statecomplet()
 
+        if self._wave is not None:
+            self._hud.update(self._wave.getScore(),self._wave.getLives())
+
+        if self._profiler is not None:
+            self._profiler.lap('invaders')
+
 
     def draw(self):
         """
@@ -194,7 +274,20 @@ class Invaders(GameApp):
         if self._text is not None:
             self._text.draw(self.view)
         else:
-            self._wave.draw(self.view)
+            if SIM_INTERPOLATE:
+                self._wave.draw(self.view,self._accumulator/SIM_STEP)
+            else:
+                self._wave.draw(self.view)
+            self._hud.draw(self.view)
+        if self._probe.isWaiting():
+            self._probe.drawn(self._seen())
+        if self._profiler is not None:
+            self._profiler.lap('hud')
+            self._profiler.finish()
+            if self._profiler.getFrames() % PROFILE_REFRESH == 1:
+                self._overlay.update(self._profiler.report()+'\n'+self._probe.report()+'\n'+
+                                     self._assets.report())
+            self._overlay.draw(self.view)
 
 
     # HELPER METHODS FOR THE STATES GO HERE
@@ -209,11 +302,15 @@ class Invaders(GameApp):
         We do not want the state to continue to change as
         we hold down the key. The user must release the
         key and press it again to change the state.
-        """
 
-        curr_keys = self.input.key_count
+        While the wave is played, the key events are consumed by its
+        updates instead, so this method does nothing.
+        """
+        if self._state == STATE_ACTIVE:
+            return
 
-        change = self._lastkeys == 0 and self.input.is_key_down('s') and curr_keys > 0
+        self._advance()
+        change = self._keys.is_key_pressed('s')
 
         if change and self._state == STATE_INACTIVE:
             self._state = STATE_NEWWAVE
@@ -222,19 +319,47 @@ class Invaders(GameApp):
         if change and self._state == STATE_COMPLETE:
             self._state = STATE_INACTIVE
 
-        self._lastkeys = curr_keys
-
-    def _stateactiv(self):
+    def _stateactiv(self,dt):
         """
+        Plays the wave for dt seconds and checks whether it paused or ended
+
+        The wave is always updated in fixed steps of SIM_STEP seconds, so the
+        game runs at the same speed at any frame rate.  The time left over
+        is kept for the next frame.  At most SIM_MAX_STEPS updates are played
+        per frame; if the frame took longer than that, the rest of the time
+        is dropped, so that a slow frame cannot cause an even slower one.
+        The key events are consumed by the next update after they arrive.
 
+        Parameter dt: The time in seconds since last update
+        Precondition: dt is a number (int or float)
         """
-        if self._state == STATE_ACTIVE:
-            dt = 1/60
-            self._wave.update(self.input,dt)
-            if self._wave.state() == 'pause':
+        if self._state != STATE_ACTIVE:
+            self._accumulator = 0.0
+            return
+        self._accumulator += dt
+        steps = 0
+        while self._accumulator >= SIM_STEP and self._state == STATE_ACTIVE:
+            if steps == SIM_MAX_STEPS:
+                self._accumulator = 0.0
+                break
+            self._advance()
+            if self._replay is not None:
+                self._replay.advance()
+                self._wave.update(self._replay,SIM_STEP)
+            else:
+                if self._recording is not None:
+                    self._recording.record(self._keys)
+                self._wave.update(self._keys,SIM_STEP)
+            self._accumulator -= SIM_STEP
+            steps += 1
+            state = self._wave.state()
+            if state == 'pause':
                 self._state = STATE_PAUSED
-            if self._wave.state() == 'over' or self._wave.state() == 'win':
+            if state == 'over' or state == 'win':
                 self._state = STATE_COMPLETE
+                self._saverecording(state)
+            if self._profiler is not None:
+                self._profiler.lap('statecheck')
 
     def _statecomplet(self):
         """
@@ -242,8 +367,146 @@ class Invaders(GameApp):
         """
         if self._state == STATE_COMPLETE:
             if self._wave.state() == 'over':
-                self._text = GLabel(text="Game Over",font_size = 64,halign='center', valign='middle')
+                self._message("Game Over")
             else:
-                self._text = GLabel(text="Congratulation !",font_size = 64,halign='center', valign='middle')
-            self._text.x = self.width // 2
-            self._text.y = self.height // 2
+                self._message("Congratulation !")
+
+    def _newwave(self):
+        """
+        Creates the wave for a new game, recording or replaying it if asked
+
+        If the last wave was won, the next wave of the same game starts, and
+        its input is added to the same recording (or replay).  Otherwise a new
+        game starts.  The Wave is only created for the first game; after that
+        it is reset in place.
+
+        When replaying, the game uses the seed of the recording, so that the
+        recorded input plays exactly the same game.  Any assets that are not
+        loaded yet are loaded first.
+        """
+        self._assets.finish()
+        if self._hud is None:
+            self._hud = Hud()
+        if self._wave is not None and self._wave.state() == 'win':
+            self._wave.nextwave()
+            return
+        seed = None
+        if REPLAY_FILE is not None:
+            recording = load(REPLAY_FILE)
+            seed = recording.getSeed()
+            self._replay = ScriptedInput(recording.script())
+        if self._wave is None:
+            self._wave = Wave(Simulation(seed),self._assets.getAtlas())
+            self._wave.setProfiler(self._profiler)
+        else:
+            self._wave.reset(seed)
+        if RECORD_FILE is not None:
+            self._recording = Recording(self._wave.getSeed())
+
+    def _saverecording(self,state):
+        """
+        Saves the recording (if any) after a wave was won or the game is over
+
+        After a win the recording goes on with the next wave, so it is saved
+        again (with more input) later.
+
+        Parameter state: the state of the wave
+        Precondition: state is 'win' or 'over'
+        """
+        if self._recording is not None:
+            self._recording.save(RECORD_FILE)
+            if state == 'over':
+                self._recording = None
+
+    def _profilekeys(self):
+        """
+        Turns the profiler on or off, or writes a trace file, on a key press
+
+        Like _determineState, only the first frame a key is down counts.
+        """
+        keys = (self.input.is_key_down(PROFILE_KEY),self.input.is_key_down(TRACE_KEY))
+        if keys[0] and not self._lastprofile[0]:
+            self._profiler = None if self._profiler is not None else self._newprofiler()
+            if self._wave is not None:
+                self._wave.setProfiler(self._profiler)
+        if keys[1] and not self._lastprofile[1] and self._profiler is not None:
+            self._profiler.dump(TRACE_FILE)
+        self._lastprofile = keys
+
+    def _resume(self):
+        """
+        Switches to STATE_ACTIVE, with no time left over from before
+
+        The method update plays this frame as lasting at least SIM_STEP, so
+        the wave plays its first update now and the key press that started
+        (or continued) it shows in this animation frame.
+        """
+        self._state = STATE_ACTIVE
+        self._accumulator = 0.0
+
+    def _advance(self):
+        """
+        Consumes the key events that arrived since the last update
+
+        The first press of a key of LATENCY_KEYS starts a measure of the
+        probe, with what is on screen before the press takes effect.
+        """
+        self._keys.advance()
+        stamp = None
+        for key in LATENCY_KEYS:
+            pressed = self._keys.getPressed(key)
+            if pressed is not None and (stamp is None or pressed < stamp):
+                stamp = pressed
+        if stamp is not None:
+            self._probe.press(stamp,self._seen())
+
+    def _seen(self):
+        """
+        Returns what the player sees, as measured by the probe
+
+        The result is a tuple of the state, the horizontal coordinate of the
+        ship (None if there is none) and the number of bolts fired.
+        """
+        if self._wave is None:
+            return (self._state,None,0)
+        return (self._state,self._wave.getShipX(),self._wave.getFired())
+
+    def _keydown(self,window,key,*args):
+        """
+        Queues a key press of the window, stamped with the time it arrived
+
+        Parameter window: the window
+        Precondition: window is the Kivy Window
+
+        Parameter key: the key code
+        Precondition: key is an int
+        """
+        self._keys.press(KEYNAMES.get(key,''))
+
+    def _keyup(self,window,key,*args):
+        """
+        Queues a key release of the window, stamped with the time it arrived
+
+        Parameter window: the window
+        Precondition: window is the Kivy Window
+
+        Parameter key: the key code
+        Precondition: key is an int
+        """
+        self._keys.release(KEYNAMES.get(key,''))
+
+    def _newprofiler(self):
+        """
+        Returns a new profiler, or a new allocation audit if AUDIT
+        """
+        return Audit() if AUDIT else Profiler()
+
+    def _message(self,text):
+        """
+        Makes the (cached) label with the given text the active message
+
+        Parameter text: the text of the message
+        Precondition: text is a string
+        """
+        self._text = self._messages.get(text,self.width//2,self.height//2,
+                                        font_size=64,halign='center',valign='middle')
@@ -0,0 +1,223 @@
+"""
+Asset module for Alien Invaders
+
+This module contains the asset manager, which loads every image, font and
+sound of the game exactly once and shares them between all models and waves.
+The alien images are packed into a single texture atlas (see render.py),
+which is built once and used by every wave.
+
+Kivy can only create textures on the thread that draws, so the assets cannot
+be loaded by a background thread.  Instead, Invaders asks the manager to load
+a few assets each frame while the game waits for the player to press 'S'.
+Each frame spends at most ASSET_BUDGET seconds loading, so the prompt stays
+responsive, and by the time the player starts, everything is usually loaded.
+Whatever is left is loaded at once when the first wave starts.
+
+The manager also times itself: the cold time is the time spent loading every
+asset for the first time, and the warm time is the time to get every asset
+again once it is loaded (which is what every later wave pays).
+
+Paliska Bradley, bp355 and Philip Coppolino, pcc78
+"""
+from consts import *
+from game2d import *
+from render import *
+import time
+
+# PRIMARY RULE: This module may only access consts.py, game2d, Kivy and
+# render.py.  Invaders decides when to load; Wave is given what it needs.
+
+
+class Assets(object):
+    """
+    A class to load every asset of the game once, a few at a time.
+
+    The assets are loaded in order: images, fonts, sounds, and last the atlas
+    of the alien images.  An asset asked for before it was loaded is loaded
+    at once, so the getters always work.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _pending: the assets not loaded yet, next one last
+    # Invariant: _pending is a list of (kind, name) tuples, where kind is
+    # 'image', 'font', 'sound' or 'atlas'
+    #
+    # Attribute _textures: the textures of the images loaded so far
+    # Invariant: _textures is a dictionary mapping file names to Kivy Textures
+    #
+    # Attribute _fonts: a label for each font loaded so far, which keeps it
+    # loaded
+    # Invariant: _fonts is a dictionary mapping file names to GLabel objects
+    #
+    # Attribute _sounds: the sounds loaded so far
+    # Invariant: _sounds is a dictionary mapping file names to Sound objects
+    #
+    # Attribute _atlas: the atlas of ALIEN_IMAGES1
+    # Invariant: _atlas is an Atlas object, or None if not built yet
+    #
+    # Attribute _cold: the seconds spent loading assets so far
+    # Invariant: _cold is a float >= 0
+    #
+    # Attribute _frames: the number of calls to step that loaded something
+    # Invariant: _frames is an int >= 0
+    #
+    # Attribute _created: the time this manager was created
+    # Invariant: _created is a float
+    #
+    # Attribute _ready: the seconds from _created until every asset was loaded
+    # Invariant: _ready is a float >= 0, or None if assets are still pending
+
+    # GETTERS AND SETTERS
+    def isDone(self):
+        """
+        Returns True if every asset is loaded
+        """
+        return not self._pending
+
+    def getTexture(self, name):
+        """
+        Returns the texture of the given image (loading it if necessary)
+
+        Parameter name: the file name of the image
+        Precondition: name is a valid image file name
+        """
+        texture = self._textures.get(name)
+        if texture is None:
+            self._load('image', name)
+            texture = self._textures[name]
+        return texture
+
+    def getSound(self, name):
+        """
+        Returns the given sound (loading it if necessary)
+
+        Parameter name: the file name of the sound
+        Precondition: name is a valid sound file name
+        """
+        sound = self._sounds.get(name)
+        if sound is None:
+            self._load('sound', name)
+            sound = self._sounds[name]
+        return sound
+
+    def getAtlas(self):
+        """
+        Returns the atlas of the alien images (building it if necessary)
+        """
+        if self._atlas is None:
+            self._load('atlas', None)
+        return self._atlas
+
+    def __init__(self, images=ASSET_IMAGES, fonts=ASSET_FONTS, sounds=ASSET_SOUNDS):
+        """
+        Initializes the manager with nothing loaded yet.
+
+        Parameter images: the image files to load
+        Precondition: images is a sequence of valid image file names
+
+        Parameter fonts: the font files to load
+        Precondition: fonts is a sequence of valid font file names
+
+        Parameter sounds: the sound files to load
+        Precondition: sounds is a sequence of valid sound file names
+        """
+        pending = ([('image', name) for name in images]+[('font', name) for name in fonts]+
+                   [('sound', name) for name in sounds]+[('atlas', None)])
+        pending.reverse()
+        self._pending = pending
+        self._textures = {}
+        self._fonts = {}
+        self._sounds = {}
+        self._atlas = None
+        self._cold = 0.0
+        self._frames = 0
+        self._created = time.perf_counter()
+        self._ready = None
+
+    def step(self, budget=ASSET_BUDGET):
+        """
+        Loads assets until budget seconds have passed (or all are loaded)
+
+        At least one asset is loaded per call, unless all of them are.
+
+        Parameter budget: the most seconds to spend
+        Precondition: budget is a float >= 0
+        """
+        if not self._pending:
+            return
+        self._frames += 1
+        end = time.perf_counter()+budget
+        while self._pending:
+            kind, name = self._pending[-1]
+            self._load(kind, name)
+            if time.perf_counter() >= end:
+                break
+
+    def finish(self):
+        """
+        Loads every asset that is not loaded yet
+        """
+        while self._pending:
+            kind, name = self._pending[-1]
+            self._load(kind, name)
+
+    def warm(self):
+        """
+        Returns the seconds to get every image, sound and the atlas again
+
+        This is the cost of the assets for every wave after the first.  It
+        loads anything that is not loaded yet first (which is not timed).
+        """
+        self.finish()
+        start = time.perf_counter()
+        for name in self._textures:
+            self.getTexture(name)
+        for name in self._sounds:
+            self.getSound(name)
+        self.getAtlas()
+        return time.perf_counter()-start
+
+    def report(self):
+        """
+        Returns a line with the cold and warm loading times of the assets
+
+        The cold time is followed by the number of frames it was spread over,
+        and the time from the creation of this manager until it was done.
+        Nothing is loaded by this method; while assets are still pending, the
+        line only says how many are left.
+        """
+        if self._pending:
+            return 'loading assets: %d left' % len(self._pending)
+        count = len(self._textures)+len(self._fonts)+len(self._sounds)
+        warm = self.warm()
+        return ('%d assets: cold %.1fms over %d frames (ready at %.0fms), warm %.3fms' %
+                (count, self._cold*1000, self._frames, self._ready*1000, warm*1000))
+
+    # HELPER METHODS
+    def _load(self, kind, name):
+        """
+        Loads a single asset and removes it from the pending assets
+
+        Parameter kind: the kind of asset
+        Precondition: kind is 'image', 'font', 'sound' or 'atlas'
+
+        Parameter name: the file name of the asset (None for the atlas)
+        Precondition: name is a string naming a valid file of that kind, or
+        None if kind is 'atlas'
+        """
+        if kind == 'atlas':
+            for source in ALIEN_IMAGES1:
+                self.getTexture(source)
+        start = time.perf_counter()
+        if kind == 'image':
+            self._textures[name] = GameApp.load_texture(name)
+        elif kind == 'font':
+            self._fonts[name] = GLabel(text='0', font_name=name)
+        elif kind == 'sound':
+            self._sounds[name] = Sound(name)
+        else:
+            self._atlas = Atlas(ALIEN_IMAGES1, self.getTexture)
+        self._cold += time.perf_counter()-start
+        if (kind, name) in self._pending:
+            self._pending.remove((kind, name))
+            if not self._pending:
+                self._ready = time.perf_counter()-self._created
@@ -0,0 +1,161 @@
+"""
+Monte Carlo balance runner for Alien Invaders
+
+This script plays thousands of headless waves with a scripted player, to see
+how the game settings (the number of rows and aliens per row, the alien speed,
+the bolt rate and the bolt speed) change how hard the game is.  Every
+combination of the settings given on the command line is played GAMES times,
+spread over a process pool with one worker per core.
+
+The result of each game is written as a row of a CSV file as soon as it is
+done (so a long run can be inspected or stopped early), and a table with the
+win rate and the average length of the games for each combination is printed
+at the end.  For example,
+
+    python balance.py --rows 3 5 --cols 8 12 --speed 0.5 1.0 --games 500
+
+plays 500 games for each of the 8 combinations.
+
+Paliska Bradley, bp355 and Philip Coppolino, pcc78
+"""
+from consts import *
+from simulation import *
+import argparse
+import csv
+import itertools
+import multiprocessing
+import time
+
+# PRIMARY RULE: This module may only access consts.py and simulation.py, so
+# that it runs headless.
+
+# The columns of the CSV file, one per game
+FIELDS = ('rows', 'cols', 'speed', 'rate', 'boltspeed', 'seed',
+          'outcome', 'updates', 'killed', 'fired', 'score')
+
+# The most updates to play before a game counts as a timeout
+MAX_UPDATES = 200000
+
+
+def policy(sim, input):
+    """
+    Chooses the keys of the scripted player for the next update
+
+    The player always holds spacebar, moves out of the way of an alien bolt
+    that is about to hit it, and otherwise moves under the nearest column
+    with a living alien.
+
+    Parameter sim: the simulation being played
+    Precondition: sim is a Simulation object with a ship
+
+    Parameter input: the input to set the keys of
+    Precondition: input is a ScriptedInput
+    """
+    ship = sim.getShip()
+    pool = sim.getBolts()
+    xs, ys, velocity, enemy = pool.getArrays()
+    for k in range(pool.getCount()):
+        if enemy[k] and abs(xs[k]-ship.x) < SHIP_WIDTH and ys[k] < DEFENSE_LINE+SHIP_HEIGHT:
+            input.hold(('spacebar', 'left' if xs[k] >= ship.x else 'right'))
+            return
+    aliens = sim.getAliens()
+    target = None
+    for col in range(aliens.getColumns()):
+        shooter = aliens.shooter(col)
+        if shooter is not None:
+            x = aliens.getX(shooter)
+            if target is None or abs(x-ship.x) < abs(target-ship.x):
+                target = x
+    if target is not None and target > ship.x+SHIP_MOVEMENT:
+        input.hold(('spacebar', 'right'))
+    elif target is not None and target < ship.x-SHIP_MOVEMENT:
+        input.hold(('spacebar', 'left'))
+    else:
+        input.hold(('spacebar',))
+
+
+def game(settings):
+    """
+    Plays one game with the scripted player and returns its result
+
+    The result is a tuple with the values of FIELDS.  The outcome is 'win',
+    'over', or 'timeout' if the game lasted MAX_UPDATES updates.
+
+    Parameter settings: the rows, cols, speed, rate, boltspeed and seed
+    Precondition: settings is a tuple of valid Simulation arguments
+    """
+    rows, cols, speed, rate, boltspeed, seed = settings
+    sim = Simulation(seed, rows, cols, speed, rate, boltspeed)
+    input = ScriptedInput()
+    updates = 0
+    state = sim.state()
+    while updates < MAX_UPDATES and state not in ('over', 'win'):
+        if state == 'pause':
+            sim.new()
+        policy(sim, input)
+        sim.update(input, SIM_STEP)
+        updates += 1
+        state = sim.state()
+    outcome = 'timeout' if state is None else state
+    aliens = sim.getAliens()
+    return settings + (outcome, updates, aliens.getSize()-aliens.getCount(),
+                       sim.getFired(), sim.getScore())
+
+
+def summarize(results):
+    """
+    Prints the win rate and average game length of each combination
+
+    Parameter results: the results of the games, grouped by settings
+    Precondition: results is a dictionary mapping (rows, cols, speed, rate,
+    boltspeed) tuples to lists of results returned by game
+    """
+    header = ('rows', 'cols', 'speed', 'rate', 'bspeed', 'games', 'win %',
+              'avg secs', 'avg killed')
+    print(('%7s'*5+'%11s'*4) % header)
+    for key in sorted(results):
+        games = results[key]
+        wins = sum(1 for result in games if result[6] == 'win')
+        updates = sum(result[7] for result in games)/len(games)
+        killed = sum(result[8] for result in games)/len(games)
+        print(('%7d%7d%7.2f%7d%7g'+'%11d%11.1f%11.1f%11.1f') %
+              (key+(len(games), 100*wins/len(games), updates*SIM_STEP, killed)))
+
+
+def main():
+    """
+    Runs the games given by the command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Play many headless waves.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[ALIEN_ROWS])
+    parser.add_argument('--cols', type=int, nargs='+', default=[ALIENS_IN_ROW])
+    parser.add_argument('--speed', type=float, nargs='+', default=[ALIEN_SPEED])
+    parser.add_argument('--rate', type=int, nargs='+', default=[BOLT_RATE])
+    parser.add_argument('--boltspeed', type=float, nargs='+', default=[BOLT_SPEED])
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--output', default='balance.csv')
+    args = parser.parse_args()
+
+    combos = list(itertools.product(args.rows, args.cols, args.speed, args.rate, args.boltspeed))
+    tasks = [combo+(args.seed+pos,) for combo in combos for pos in range(args.games)]
+    results = {}
+    start = time.perf_counter()
+    with open(args.output, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(FIELDS)
+        with multiprocessing.Pool(args.workers) as pool:
+            chunk = max(1, len(tasks)//(args.workers*16))
+            for result in pool.imap_unordered(game, tasks, chunk):
+                writer.writerow(result)
+                results.setdefault(result[:5], []).append(result)
+    elapsed = time.perf_counter()-start
+    summarize(results)
+    print('%d games in %.1fs on %d workers; results in %s' %
+          (len(tasks), elapsed, args.workers, args.output))
+
+
+# Script code
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""
+Microbenchmarks for the hot paths of Alien Invaders
+
+This script times the methods that run every frame (or every alien step):
+Simulation.update, _hitdetection, state, _alienmovement and _firealien, and
+Wave.draw if game2d is available.  Each one is timed for formations from the
+default 5x12 up to the 10x15 maximum of consts.py and beyond, with synthetic
+loads from zero to hundreds of laser bolts.
+
+The bolts of the synthetic loads barely move (their speed is tiny) and are
+placed where they hit nothing: player bolts in the gaps between the alien
+columns, and alien bolts above the ship.  Every path gets its own simulation,
+and update is timed between alien steps (the step itself is timed by
+alienmovement).  That way every call does the same work, and the timings are
+steady.
+
+The script prints the time per call of each path, and how it scales with the
+number of aliens (the exponent k in time ~ aliens**k).  Timings can be saved
+as a baseline, and later checked against it:
+
+    python bench.py --save      (writes bench_baseline.json)
+    python bench.py --check     (fails if any path got slower than the baseline)
+
+Paliska Bradley, bp355 and Philip Coppolino, pcc78
+"""
+from consts import *
+from simulation import *
+import argparse
+import json
+import math
+import random
+import sys
+import timeit
+
+# NOTE: The benchmarks call hidden methods of Simulation directly, since those
+# are the hot paths being measured.  Nothing else should do this.
+
+# The formation sizes to time, as (rows, cols)
+SIZES = ((5, 12), (10, 15), (20, 30), (40, 60))
+# The synthetic bolt loads to time
+LOADS = (0, 16, 64, 256)
+# The bolt speed of the synthetic loads (so that the bolts stay in place)
+CREEP = 1e-9
+# The default slowdown (as a fraction) allowed by --check
+TOLERANCE = 0.25
+
+
+def setup(rows, cols, bolts, speed=ALIEN_SPEED):
+    """
+    Returns a simulation with the given formation size and bolt load
+
+    Parameter rows: the number of rows of aliens
+    Precondition: rows is an int > 0
+
+    Parameter cols: the number of aliens per row
+    Precondition: cols is an int > 0
+
+    Parameter bolts: the number of laser bolts on screen
+    Precondition: bolts is an int >= 0
+
+    Parameter speed: the number of seconds between alien steps
+    Precondition: speed is a float >= 0
+    """
+    sim = Simulation(0, rows, cols, speed, boltspeed=CREEP, capacity=max(bolts, 1)+1)
+    aliens = sim.getAliens()
+    rng = random.Random(0)
+    for bolt in range(bolts):
+        if bolt % 2 == 0 and cols > 1:
+            col = rng.randrange(cols-1)
+            x = (aliens.getX(aliens.index(col, 0))+aliens.getX(aliens.index(col+1, 0)))/2
+            y = rng.uniform(aliens.bottom(), aliens.getY(aliens.index(0, rows-1)))
+            sim.getBolts().fire(x, y, False)
+        else:
+            x = rng.uniform(0, GAME_WIDTH)
+            y = rng.uniform(DEFENSE_LINE+SHIP_HEIGHT, aliens.bottom()-ALIEN_HEIGHT)
+            sim.getBolts().fire(x, y, True)
+    return sim
+
+
+def paths(rows, cols, bolts):
+    """
+    Returns a dictionary mapping the name of each hot path to a callable
+
+    Parameter rows: the number of rows of aliens
+    Precondition: rows is an int > 0
+
+    Parameter cols: the number of aliens per row
+    Precondition: cols is an int > 0
+
+    Parameter bolts: the number of laser bolts on screen
+    Precondition: bolts is an int >= 0
+    """
+    input = ScriptedInput()
+    updater = setup(rows, cols, bolts, float('inf'))
+    hitter = setup(rows, cols, bolts)
+    marcher = setup(rows, cols, bolts)
+    firer = setup(rows, cols, bolts)
+
+    def firealien():
+        pool = firer.getBolts()
+        before = pool.getCount()
+        firer._firealien()
+        while pool.getCount() > before:
+            pool.remove(pool.getCount()-1)
+
+    result = {'update': lambda: updater.update(input, SIM_STEP),
+              'hitdetection': hitter._hitdetection,
+              'state': hitter.state,
+              'alienmovement': marcher._alienmovement,
+              'firealien': firealien}
+    try:
+        from wave import Wave
+    except ImportError:
+        print('no window toolkit; skipping draw %dx%d %d' % (rows, cols, bolts))
+        return result
+    wave = Wave(setup(rows, cols, bolts))
+    view = NullView()
+    wave.draw(view)
+    result['draw'] = lambda: wave.draw(view)
+    return result
+
+
+class NullView(object):
+    """
+    A view that ignores everything drawn to it, so only the drawing code is timed
+    """
+
+    def draw(self, cmd):
+        """
+        Ignores a drawing command.
+
+        Parameter cmd: the drawing command
+        Precondition: cmd is anything
+        """
+        pass
+
+
+def measure(func, budget=0.05):
+    """
+    Returns the time in seconds of one call to func (the best of 5 runs)
+
+    Parameter func: the function to time
+    Precondition: func is a callable with no arguments
+
+    Parameter budget: the rough number of seconds for each run
+    Precondition: budget is a float > 0
+    """
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number*budget/max(elapsed, 1e-9)))
+    return min(timer.repeat(5, number))/number
+
+
+def run():
+    """
+    Returns the timings of every path, size and load
+
+    The result is a dictionary mapping keys like 'update 5x12 16' to seconds.
+    """
+    timings = {}
+    for rows, cols in SIZES:
+        for bolts in LOADS:
+            for name, func in paths(rows, cols, bolts).items():
+                timings['%s %dx%d %d' % (name, rows, cols, bolts)] = measure(func)
+    return timings
+
+
+def report(timings):
+    """
+    Prints the time per call of every path, and how it scales with aliens
+
+    Parameter timings: the timings returned by run
+    Precondition: timings is a dictionary of timings
+    """
+    names = []
+    for key in timings:
+        if key.split()[0] not in names:
+            names.append(key.split()[0])
+    for name in names:
+        print(name)
+        print('%10s' % 'bolts' + ''.join('%12s' % ('%dx%d' % size) for size in SIZES) + '%8s' % 'k')
+        for bolts in LOADS:
+            line = [timings['%s %dx%d %d' % (name, rows, cols, bolts)] for rows, cols in SIZES]
+            small = SIZES[0][0]*SIZES[0][1]
+            large = SIZES[-1][0]*SIZES[-1][1]
+            exponent = math.log(line[-1]/line[0])/math.log(large/small)
+            print('%10d' % bolts + ''.join('%10.2fus' % (t*1e6) for t in line) + '%8.2f' % exponent)
+        print()
+
+
+def check(timings, baseline, tolerance):
+    """
+    Returns the keys of the timings that are slower than the baseline
+
+    A key of the baseline that was not timed (like a path that could not
+    run) counts as slower, so that a check never passes without it.
+
+    Parameter timings: the timings returned by run
+    Precondition: timings is a dictionary of timings
+
+    Parameter baseline: the saved timings to compare against
+    Precondition: baseline is a dictionary of timings
+
+    Parameter tolerance: the slowdown allowed, as a fraction
+    Precondition: tolerance is a float >= 0
+    """
+    slower = []
+    for key in sorted(baseline):
+        if key not in timings:
+            slower.append(key)
+            print('MISSING %-27s (baseline %.2fus)' % (key, baseline[key]*1e6))
+    for key in sorted(timings):
+        if key in baseline and timings[key] > baseline[key]*(1+tolerance):
+            slower.append(key)
+            print('SLOWER %-28s %10.2fus (baseline %.2fus)' %
+                  (key, timings[key]*1e6, baseline[key]*1e6))
+    return slower
+
+
+def main():
+    """
+    Runs the benchmarks given by the command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Time the hot paths of a wave.')
+    parser.add_argument('--baseline', default='bench_baseline.json')
+    parser.add_argument('--save', action='store_true', help='save the timings as the baseline')
+    parser.add_argument('--check', action='store_true', help='fail if slower than the baseline')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    timings = run()
+    report(timings)
+    if args.save:
+        with open(args.baseline, 'w') as file:
+            json.dump(timings, file, indent=1, sort_keys=True)
+        print('saved baseline to %s' % args.baseline)
+    if args.check:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if check(timings, baseline, args.tolerance):
+            sys.exit(1)
+        print('no path is slower than %s' % args.baseline)
+
+
+# Script code
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Collision module for Alien Invaders
+
+This module contains the collision tests of the simulation.  Every test works
+on plain numbers (centers and half-extents), so it allocates nothing and runs
+headless.
+
+A bolt moves a long way in a single update when the update is long (or the
+bolts are fast).  Testing only where the bolt ends up would let it tunnel
+through a target it passed over.  The function sweep tests the whole path of
+the bolt during the update instead, and returns how far along the path it
+first touched the target.
+
+Two rectangles overlap when their centers are closer than half their sizes
+added together, on both axes.  Those sums are fixed by consts.py, so they are
+computed once below (the reach of a bolt to an alien or to the ship).  The
+function sweepfirst tests a bolt against many targets at once, writing the
+hits into an array the caller owns.  No test creates any object.
+
+Paliska Bradley, bp355 and Philip Coppolino, pcc78
+"""
+from consts import *
+
+# PRIMARY RULE: This module may only access consts.py, so that the simulation
+# can use it headless.
+
+# Half the width of a laser bolt
+BOLT_HALF_WIDTH  = BOLT_WIDTH/2
+# Half the height of a laser bolt
+BOLT_HALF_HEIGHT = BOLT_HEIGHT/2
+# The most horizontal distance between the centers of a bolt and an alien that touch
+ALIEN_REACH_X = ALIEN_WIDTH/2+BOLT_HALF_WIDTH
+# The most vertical distance between the centers of a bolt and an alien that touch
+ALIEN_REACH_Y = ALIEN_HEIGHT/2+BOLT_HALF_HEIGHT
+# The most horizontal distance between the centers of a bolt and the ship that touch
+SHIP_REACH_X  = SHIP_WIDTH/2+BOLT_HALF_WIDTH
+# The most vertical distance between the centers of a bolt and the ship that touch
+SHIP_REACH_Y  = SHIP_HEIGHT/2+BOLT_HALF_HEIGHT
+
+
+def sweep(x, y, dx, dy, halfwidth, halfheight, tx, ty):
+    """
+    Returns when a moving rectangle first touches a still one (or None)
+
+    The moving rectangle starts centered at (x,y) and moves by (dx,dy).  The
+    result is the fraction of that movement (in 0..1) at which the two
+    rectangles first touch (edges included), or None if they never do.  It
+    is 0 if they already touch at the start.
+
+    Only the sum of the two sizes matters, so halfwidth and halfheight are
+    the half-extents of both rectangles added together.
+
+    Parameter x: the horizontal coordinate of the start of the moving center
+    Precondition: x is an int or a float
+
+    Parameter y: the vertical coordinate of the start of the moving center
+    Precondition: y is an int or a float
+
+    Parameter dx: the horizontal movement
+    Precondition: dx is an int or a float
+
+    Parameter dy: the vertical movement
+    Precondition: dy is an int or a float
+
+    Parameter halfwidth: half the width of both rectangles together
+    Precondition: halfwidth is an int or a float >= 0
+
+    Parameter halfheight: half the height of both rectangles together
+    Precondition: halfheight is an int or a float >= 0
+
+    Parameter tx: the horizontal coordinate of the still center
+    Precondition: tx is an int or a float
+
+    Parameter ty: the vertical coordinate of the still center
+    Precondition: ty is an int or a float
+    """
+    # The interval of the movement in which each axis overlaps (slab method)
+    first = 0.0
+    last = 1.0
+    if dx == 0:
+        if abs(x-tx) > halfwidth:
+            return None
+    else:
+        near = (tx-halfwidth-x)/dx
+        far = (tx+halfwidth-x)/dx
+        if near > far:
+            near, far = far, near
+        first = max(first, near)
+        last = min(last, far)
+    if dy == 0:
+        if abs(y-ty) > halfheight:
+            return None
+    else:
+        near = (ty-halfheight-y)/dy
+        far = (ty+halfheight-y)/dy
+        if near > far:
+            near, far = far, near
+        first = max(first, near)
+        last = min(last, far)
+    return first if first <= last else None
+
+
+def sweepfirst(x, y, dy, halfwidth, halfheight, xs, ys, ox, oy, indices, count, out):
+    """
+    Returns the number of targets a moving bolt hit first
+
+    Target i is centered at (ox+xs[i], oy+ys[i]), and only the targets in the
+    first count entries of indices are tested (see sweep; the bolt only moves
+    vertically).  The indices of the targets hit first (several, if they tie)
+    are written to the start of out, and the result is how many there are.
+    It is 0 if the bolt hit nothing.
+
+    Parameter x: the horizontal coordinate of the bolt
+    Precondition: x is an int or a float
+
+    Parameter y: the vertical coordinate of the bolt before it moved
+    Precondition: y is an int or a float
+
+    Parameter dy: the vertical distance the bolt moved
+    Precondition: dy is an int or a float
+
+    Parameter halfwidth: half the width of the bolt and a target together
+    Precondition: halfwidth is an int or a float >= 0
+
+    Parameter halfheight: half the height of the bolt and a target together
+    Precondition: halfheight is an int or a float >= 0
+
+    Parameter xs: the horizontal offset of each target
+    Precondition: xs is a sequence of numbers
+
+    Parameter ys: the vertical offset of each target
+    Precondition: ys is a sequence of numbers the same length as xs
+
+    Parameter ox: the horizontal coordinate the offsets are from
+    Precondition: ox is an int or a float
+
+    Parameter oy: the vertical coordinate the offsets are from
+    Precondition: oy is an int or a float
+
+    Parameter indices: the targets to test
+    Precondition: indices is a sequence of valid indices of xs
+
+    Parameter count: the number of targets to test
+    Precondition: count is an int in 0..len(indices)
+
+    Parameter out: the array to write the hits to
+    Precondition: out is a mutable sequence of ints at least count long
+    """
+    hits = 0
+    first = None
+    for pos in range(count):
+        i = indices[pos]
+        when = sweep(x, y, 0, dy, halfwidth, halfheight, ox+xs[i], oy+ys[i])
+        if when is None or (first is not None and when > first):
+            continue
+        if first is None or when < first:
+            first = when
+            hits = 0
+        out[hits] = i
+        hits += 1
+    return hits
@@ -35,6 +35,9 @@ SHIP_IMAGE1    = 'ship-strip.png'
 SHIP_LIVES    = 3
 # How many seconds a death animation takes
 DEATH_SPEED   = 0.3
+# The number of frames in the ship image strip (2 rows of 4); frame 0 is the
+# whole ship, and the others are its explosion
+SHIP_FRAMES   = 8
 # The y-coordinate of the defensive line the ship is protecting
 DEFENSE_LINE = 100
 
@@ -75,6 +78,81 @@ BOLT_HEIGHT = 16
 BOLT_SPEED  = 10
 # the number of ALIEN STEPS (not frames) between bolts
 BOLT_RATE   = 5
+# the most laser bolts on screen at once (more are not fired)
+BOLT_CAPACITY = 64
+# the number of aliens (in different columns) that fire together
+ALIEN_SHOOTERS = 1
+# the chance (0..1) that the alien above the ship is one of the aliens firing
+ALIEN_AIM = 0.0
+
+
+### RENDER CONSTANTS ###
+
+# the most aliens drawn by a single mesh (a Kivy mesh has at most 65535
+# vertices, or 16383 aliens).  Smaller meshes are faster to rebuild when an
+# alien dies, and can be culled when they are off screen.
+BATCH_QUADS = 1024
+
+
+### SIMULATION CONSTANTS ###
+
+# the number of seconds simulated by a single update of a wave.  SHIP_MOVEMENT
+# and BOLT_SPEED are per update, so this also sets the speed of the game.
+SIM_STEP    = 1/60
+# the most updates of a wave per animation frame (more time is dropped)
+SIM_MAX_STEPS = 5
+# whether to draw the ship and bolts between their last two positions
+SIM_INTERPOLATE = True
+# the number of animation frames per second (independent of SIM_STEP)
+RENDER_FPS  = 60
+
+
+### PROFILING CONSTANTS ###
+
+# the number of frames kept for the stage percentiles of the profiler
+PROFILE_FRAMES = 240
+# the number of stage timings kept for the trace file
+PROFILE_EVENTS = 4096
+# the number of frames between refreshes of the profiler overlay
+PROFILE_REFRESH = 30
+# the key that turns the profiler (and its overlay) on and off
+PROFILE_KEY = 'p'
+# the key that writes the recent stage timings to TRACE_FILE
+TRACE_KEY   = 't'
+# the trace file written by TRACE_KEY (open it in chrome://tracing)
+TRACE_FILE  = 'trace.json'
+# the most bytes a stage of a frame may allocate in an allocation audit (the
+# headless stages peak at about 400 once the game has warmed up)
+ALLOC_BUDGET = 512
+# the number of source lines written by TRACE_KEY during an allocation audit
+ALLOC_LINES = 20
+# the number of key press latencies kept for the percentiles (see latency.py)
+LATENCY_SAMPLES = 240
+# the seconds after which a key press that showed no effect is not measured
+LATENCY_TIMEOUT = 0.5
+# the keys whose presses are measured (the others have no effect on the game)
+LATENCY_KEYS = ('left', 'right', 'spacebar', 's')
+
+
+### SERVER CONSTANTS ###
+
+# the address the game server listens on (only local clients can connect)
+SERVER_HOST  = '127.0.0.1'
+# the port the game server listens on (worker n of a server uses the port plus n)
+SERVER_PORT  = 8765
+# the number of seconds between ticks of the server (every session updates once per tick)
+SERVER_TICK  = SIM_STEP
+# the most sessions updated before the server lets its clients be read
+SERVER_SLICE = 256
+# the number of seconds between metric reports of the server
+SERVER_REPORT = 5.0
+
+
+### SNAPSHOT CONSTANTS ###
+
+# the number of ticks between full snapshots in a stream (a spectator can only
+# start watching at one of them)
+SNAPSHOT_KEYFRAME = 600
 
 
 ### GAME CONSTANTS ###
@@ -102,28 +180,115 @@ everything after the word python. So if you start the game typing
 
 Python puts ['breakout.py', '3', '4', '0.5'] into sys.argv. Below, we take advantage of
 this fact to change the constants ALIEN_ROWS, ALIENS_IN_ROW, and ALIEN_SPEED.
+Only the arguments before the first option (an argument starting with --) count,
+so that the values of options are never mistaken for these numbers.
 """
+_numbers = sys.argv[:1]
+for _arg in sys.argv[1:]:
+    if _arg.startswith('--'):
+        break
+    _numbers.append(_arg)
+
 try:
-    rows = int(sys.argv[1])
+    rows = int(_numbers[1])
     if rows >= 1 and rows <= 10:
         ALIEN_ROWS = rows
 except:
     pass # Use original value
 
 try:
-    perrow = int(sys.argv[2])
+    perrow = int(_numbers[2])
     if perrow >= 1 and perrow <= 15:
         ALIENS_IN_ROW = perrow
 except:
     pass # Use original value
 
 try:
-    speed = float(sys.argv[3])
+    speed = float(_numbers[3])
     if speed >= 0 and speed <= 3:
         ALIEN_SPEED = speed
 except:
     pass # Use original value
 
+"""
+Two more command line arguments record or replay a game:
+
+    python invaders --record session.inv
+    python invaders --replay session.inv
+
+Recording saves the input of each game to the file when it is complete.  Replaying
+plays the recorded input instead of the keyboard (press 's' to start it).
+"""
+# The file to record the input of each game to (None for no recording)
+RECORD_FILE = None
+# The file with the recorded input to replay (None to play normally)
+REPLAY_FILE = None
+
+try:
+    if '--record' in sys.argv:
+        RECORD_FILE = sys.argv[sys.argv.index('--record')+1]
+except:
+    pass # Do not record
+
+try:
+    if '--replay' in sys.argv:
+        REPLAY_FILE = sys.argv[sys.argv.index('--replay')+1]
+except:
+    pass # Do not replay
+
+"""
+A stress mode plays a much larger formation (up to STRESS_MAX rows and columns):
+
+    python invaders --stress 200 300
+
+The aliens (and their separation and steps) are scaled down so that the formation
+fits STRESS_FILL of the width of the window.  The bottom row starts halfway up the
+window, and any rows that do not fit are above the top of the window; they scroll
+into view as the aliens march down.
+"""
+# The rows and columns of the stress formation (None to play normally)
+STRESS = None
+# The largest number of rows or columns in stress mode
+STRESS_MAX  = 1000
+# The fraction of the window width taken by the stress formation
+STRESS_FILL = 0.75
+
+try:
+    if '--stress' in sys.argv:
+        _pos = sys.argv.index('--stress')
+        rows = int(sys.argv[_pos+1])
+        perrow = int(sys.argv[_pos+2])
+        if rows >= 1 and rows <= STRESS_MAX and perrow >= 1 and perrow <= STRESS_MAX:
+            STRESS = (rows, perrow)
+except:
+    pass # Play normally
+
+if STRESS is not None:
+    ALIEN_ROWS, ALIENS_IN_ROW = STRESS
+    _scale = min(1, STRESS_FILL*GAME_WIDTH/(ALIENS_IN_ROW*(ALIEN_WIDTH+ALIEN_H_SEP)))
+    ALIEN_WIDTH   = ALIEN_WIDTH*_scale
+    ALIEN_HEIGHT  = ALIEN_HEIGHT*_scale
+    ALIEN_H_SEP   = ALIEN_H_SEP*_scale
+    ALIEN_V_SEP   = ALIEN_V_SEP*_scale
+    ALIEN_H_WALK  = ALIEN_WIDTH/4
+    ALIEN_V_WALK  = ALIEN_HEIGHT/2
+    # Put the bottom row halfway up (the ceiling is negative if the top is off screen)
+    ALIEN_CEILING = GAME_HEIGHT - GAME_HEIGHT//2 - ALIEN_HEIGHT*(ALIEN_ROWS-1) - ALIEN_V_SEP*ALIEN_ROWS
+
+"""
+The profiler can also be on from the start:
+
+    python invaders --profile
+
+or audit the memory allocated by each stage instead of timing it:
+
+    python invaders --audit
+"""
+# Whether the profiler is on when the game starts
+PROFILE = '--profile' in sys.argv
+# Whether the profiler measures allocations (see allocs.py) instead of time
+AUDIT = '--audit' in sys.argv
+
 ### ADD MORE CONSTANTS (PROPERLY COMMENTED) AS NECESSARY ###
 
 # The alternate images to use in the filmstrip
@@ -133,7 +298,7 @@ SHIP_IMAGE2    = 'ship-strip.png'
 ALIEN_IMAGES2   = ('alien-strip1.png','alien-strip2.png','alien-strip3.png')
 # The number of (base) points each alien is worth.  Multiplied by row
 ALIEN_POINTS = 10
-# The speed up factor for each alien killed.
+# The speed up factor for each wave cleared (aliens step this much more often)
 SPEED_FACTOR = 1.03
 # The music volume for each alien step.
 STEP_VOLUME = 0.3
@@ -166,3 +331,12 @@ LIVES_OFFSET  = 135
 BANNER_WIDTH  = GAME_WIDTH-100
 # The height of a message banner
 BANNER_HEIGHT = GAME_HEIGHT/4
+
+# The images loaded by the asset manager before the first wave
+ASSET_IMAGES  = (SHIP_IMAGE1,)+ALIEN_IMAGES1
+# The fonts loaded by the asset manager (the overlay uses the Kivy default)
+ASSET_FONTS   = (ARCADE_FONT,)
+# The sounds loaded by the asset manager (the game plays none yet)
+ASSET_SOUNDS  = ()
+# The most seconds per frame spent loading assets while the game waits to start
+ASSET_BUDGET  = 0.004
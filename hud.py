@@ -0,0 +1,179 @@
+"""
+Text module for Alien Invaders
+
+This module contains the retained text layer for the game: a cache of GLabel
+objects for the messages (like "Press 'S' to Play"), the heads-up display
+with the score and the number of lives, and the overlay of the profiler.
+
+Creating a GLabel lays out its text and creates a texture, which is far too
+slow to do every animation frame.  The classes in this module create each
+label once and only change its text when the content actually changes.
+
+Paliska Bradley, bp355 and Philip Coppolino, pcc78
+"""
+from consts import *
+from game2d import *
+
+# PRIMARY RULE: This module may only access consts.py and game2d.  It knows
+# nothing about the wave; Invaders tells it what to show.
+
+
+class TextCache(object):
+    """
+    A class to create each message label only once.
+
+    A label is identified by its text and its style (the keyword arguments
+    given to GLabel, like font_size).  The first time a label is asked for,
+    it is created and stored; after that, the same GLabel is returned.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _labels: the labels created so far
+    # Invariant: _labels is a dictionary mapping (text,style) tuples to GLabel
+    # objects, where style is a sorted tuple of (keyword,value) pairs
+
+    def __init__(self):
+        """
+        Initializes an empty cache.
+        """
+        self._labels = {}
+
+    def get(self, text, x, y, **style):
+        """
+        Returns the label with the given text and style, centered at (x,y)
+
+        Parameter text: the text of the label
+        Precondition: text is a string
+
+        Parameter x: the horizontal coordinate of the label center
+        Precondition: x is an int or a float
+
+        Parameter y: the vertical coordinate of the label center
+        Precondition: y is an int or a float
+
+        Parameter style: the keyword arguments for GLabel
+        Precondition: style has hashable values accepted by GLabel
+        """
+        key = (text, tuple(sorted(style.items())))
+        label = self._labels.get(key)
+        if label is None:
+            label = GLabel(text=text, **style)
+            self._labels[key] = label
+        if label.x != x:
+            label.x = x
+        if label.y != y:
+            label.y = y
+        return label
+
+
+class Hud(object):
+    """
+    A class to display the score and the number of lives.
+
+    The captions ("Score" and "Lives") never change.  Each value has its own
+    label, whose text is only changed (and laid out again) when the value
+    changes.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _labels: the captions and values, in drawing order
+    # Invariant: _labels is a list of four GLabel objects: the score caption,
+    # the score value, the lives caption and the lives value
+    #
+    # Attribute _score: the score currently displayed
+    # Invariant: _score is an int >= 0
+    #
+    # Attribute _lives: the number of lives currently displayed
+    # Invariant: _lives is an int >= 0
+
+    def __init__(self):
+        """
+        Initializes the display with a score of 0 and SHIP_LIVES lives.
+        """
+        y = GAME_HEIGHT - LABEL_HEIGHT
+        style = {'font_name': ARCADE_FONT, 'font_size': ARCADE_SMALL,
+                 'halign': 'left', 'valign': 'middle'}
+        self._score = 0
+        self._lives = SHIP_LIVES
+        self._labels = [GLabel(text='Score', **style),
+                        GLabel(text=str(self._score), **style),
+                        GLabel(text='Lives', **style),
+                        GLabel(text=str(self._lives), **style)]
+        positions = [LIVES_MARGIN//4, LIVES_MARGIN//4+SCORE_OFFSET,
+                     GAME_WIDTH-LIVES_MARGIN, GAME_WIDTH-LIVES_MARGIN+LIVES_OFFSET]
+        for pos in range(len(self._labels)):
+            self._labels[pos].left = positions[pos]
+            self._labels[pos].y = y
+
+    def update(self, score, lives):
+        """
+        Changes the displayed score and lives (if they changed)
+
+        Parameter score: the current score
+        Precondition: score is an int >= 0
+
+        Parameter lives: the number of lives left
+        Precondition: lives is an int >= 0
+        """
+        if score != self._score:
+            self._score = score
+            self._labels[1].text = str(score)
+        if lives != self._lives:
+            self._lives = lives
+            self._labels[3].text = str(lives)
+
+    def draw(self, view):
+        """
+        Draws the display to the view.
+
+        Parameter view: the game view, used in drawing
+        Precondition: view is an instance of GView
+        """
+        for label in self._labels:
+            label.draw(view)
+
+
+class Overlay(object):
+    """
+    A class to display the profiler table over the game.
+
+    The table is a single label, left aligned below the score.  Its text is
+    only changed (and laid out again) when Invaders gives it a new table,
+    which it does every PROFILE_REFRESH frames.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _label: the label showing the table
+    # Invariant: _label is a GLabel object
+    #
+    # Attribute _text: the table currently displayed
+    # Invariant: _text is a string
+
+    def __init__(self):
+        """
+        Initializes the overlay with an empty table.
+        """
+        self._text = ''
+        self._label = GLabel(text=self._text, font_size=16, halign='left', valign='top',
+                             linecolor=YELLOW_COLOR)
+        self._label.left = LIVES_MARGIN//4
+        self._label.top = GAME_HEIGHT-2*LABEL_HEIGHT
+
+    def update(self, text):
+        """
+        Changes the displayed table (if it changed)
+
+        Parameter text: the table to display
+        Precondition: text is a string
+        """
+        if text != self._text:
+            self._text = text
+            self._label.text = text
+            self._label.left = LIVES_MARGIN//4
+            self._label.top = GAME_HEIGHT-2*LABEL_HEIGHT
+
+    def draw(self, view):
+        """
+        Draws the table to the view.
+
+        Parameter view: the game view, used in drawing
+        Precondition: view is an instance of GView
+        """
+        self._label.draw(view)
@@ -0,0 +1,285 @@
+"""
+Input latency module for Alien Invaders
+
+This module contains the keyboard input of the game as timestamped events, and
+a probe that measures how long a key press takes to show on screen.
+
+GInput only answers whether a key is down at the moment it is asked, and the
+game asks once per update.  A key pressed and released between two updates is
+never seen, and nothing records when a key was pressed.  An EventInput is told
+about every key press and release as the window receives them, stamped with the
+time they arrived.  The events are queued until the next update consumes them,
+which it does by calling the method advance: a key pressed since the last
+update counts as down for that update, even if it was already released.  A
+key down event for a key that is already held (the window repeats them while
+a key is held) is not a new press.
+
+A LatencyProbe measures the time from a key press to the end of the first
+frame drawn with an effect of that press: the ship moved, the player fired a
+bolt, or the game changed state.  Some presses have no effect (firing with a
+bolt already in flight, or moving into the edge of the window), so a press
+that shows nothing within LATENCY_TIMEOUT seconds is not measured.  The time
+ends when the frame is drawn, not when the display shows it, so the wait for
+the display is not part of it.  The last LATENCY_SAMPLES times are kept, and
+reported as percentiles like the stages of the profiler.
+
+Paliska Bradley, bp355 and Philip Coppolino, pcc78
+"""
+from consts import *
+from array import array
+import time
+
+# PRIMARY RULE: This module may only access consts.py.  Invaders binds the
+# window to an EventInput, so events can also be scripted headless.
+
+
+class EventInput(object):
+    """
+    A class to queue the key events of the window until the next update.
+
+    This class answers the same questions as GInput (is_key_down and
+    key_count), about the keys as of the last call to advance.  Keys are named
+    like in GInput (e.g. 'left', 'spacebar' or 's').
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _queue: the events not consumed yet, as (time, key, down)
+    # Invariant: _queue is a list of tuples (float, string, bool), in the
+    # order the events arrived
+    #
+    # Attribute _held: the keys held down after the events consumed so far
+    # Invariant: _held is a set of strings
+    #
+    # Attribute _keys: the keys down in the current update (those held, and
+    # those pressed since the last update)
+    # Invariant: _keys is a set of strings that contains _held
+    #
+    # Attribute _pressed: the time each key pressed since the last update was
+    # first pressed
+    # Invariant: _pressed is a dictionary mapping strings in _keys to floats
+
+    @property
+    def key_count(self):
+        """
+        The number of keys down in the current update
+        """
+        return len(self._keys)
+
+    # GETTERS AND SETTERS
+    def getPressed(self, key):
+        """
+        Returns the time key was first pressed since the last update
+
+        The time is from time.perf_counter.  The result is None if key was not
+        pressed since the last update.
+
+        Parameter key: the key to check
+        Precondition: key is a string
+        """
+        return self._pressed.get(key)
+
+    def __init__(self):
+        """
+        Initializes an input with no keys down.
+        """
+        self._queue = []
+        self._held = set()
+        self._keys = set()
+        self._pressed = {}
+
+    def is_key_down(self, key):
+        """
+        Returns True if key is down in the current update
+
+        A key pressed since the last update is down, even if it was released
+        again before this one.
+
+        Parameter key: the key to check
+        Precondition: key is a string
+        """
+        return key in self._keys
+
+    def is_key_pressed(self, key):
+        """
+        Returns True if key was pressed since the last update
+
+        Parameter key: the key to check
+        Precondition: key is a string
+        """
+        return key in self._pressed
+
+    def press(self, key, stamp=None):
+        """
+        Queues a key press
+
+        Parameter key: the key pressed
+        Precondition: key is a string
+
+        Parameter stamp: the time of the press (None for now)
+        Precondition: stamp is a float from time.perf_counter, or None
+        """
+        self._queue.append((time.perf_counter() if stamp is None else stamp, key, True))
+
+    def release(self, key, stamp=None):
+        """
+        Queues a key release
+
+        Parameter key: the key released
+        Precondition: key is a string
+
+        Parameter stamp: the time of the release (None for now)
+        Precondition: stamp is a float from time.perf_counter, or None
+        """
+        self._queue.append((time.perf_counter() if stamp is None else stamp, key, False))
+
+    def advance(self):
+        """
+        Consumes the queued events, to begin the next update
+
+        Call this once before every update.  If nothing was queued, this only
+        forgets the keys pressed since the update before.  A key is only
+        pressed if it was not held, so the repeated down events of a held key
+        are ignored.
+        """
+        self._pressed.clear()
+        if not self._queue:
+            if len(self._keys) != len(self._held):
+                self._keys.intersection_update(self._held)
+            return
+        for stamp, key, down in self._queue:
+            if down:
+                if key not in self._held and key not in self._pressed:
+                    self._pressed[key] = stamp
+                self._held.add(key)
+            else:
+                self._held.discard(key)
+        del self._queue[:]
+        self._keys.clear()
+        self._keys.update(self._held)
+        self._keys.update(self._pressed)
+
+
+class LatencyProbe(object):
+    """
+    A class to measure the time from a key press to the frame showing its effect.
+
+    The game tells the probe about each update that consumed a key press
+    (the method press), and about each frame it drew while a press is waiting
+    (the method drawn), with what the player can see: a tuple of the state of
+    the game, the position of the ship and the number of bolts fired.  Only
+    the oldest press not shown yet is measured; presses while it waits are
+    shown by the same frame, so they would only measure the same effect
+    again.  Times are in seconds.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _samples: the last times measured
+    # Invariant: _samples is an array('d') of length _size
+    #
+    # Attribute _size: the number of times kept
+    # Invariant: _size is an int > 0
+    #
+    # Attribute _count: the number of times measured so far
+    # Invariant: _count is an int >= 0; time number n is in slot n % _size
+    #
+    # Attribute _timeout: the seconds after which a press with no effect is
+    # dropped
+    # Invariant: _timeout is a float > 0
+    #
+    # Attribute _pending: the time of the press waiting for its effect
+    # Invariant: _pending is a float, or None if no press is waiting
+    #
+    # Attribute _seen: what the player saw when the press was consumed
+    # Invariant: _seen is a tuple (state, ship, fired), or None if no press is
+    # waiting
+
+    # GETTERS AND SETTERS
+    def getCount(self):
+        """
+        Returns the number of times measured so far
+        """
+        return self._count
+
+    def isWaiting(self):
+        """
+        Returns True if a press is waiting for a frame to show its effect
+        """
+        return self._pending is not None
+
+    def __init__(self, samples=LATENCY_SAMPLES, timeout=LATENCY_TIMEOUT):
+        """
+        Initializes a probe with no times.
+
+        Parameter samples: the number of times kept for the percentiles
+        Precondition: samples is an int > 0
+
+        Parameter timeout: the seconds after which a press with no effect is dropped
+        Precondition: timeout is a float > 0
+        """
+        self._samples = array('d', bytes(8*samples))
+        self._size = samples
+        self._count = 0
+        self._timeout = timeout
+        self._pending = None
+        self._seen = None
+
+    def press(self, stamp, seen):
+        """
+        Starts measuring a press, unless another one is waiting
+
+        Call this before the update that consumed the press, so that seen is
+        what the player saw before it.
+
+        Parameter stamp: the time of the press
+        Precondition: stamp is a float from time.perf_counter
+
+        Parameter seen: the state of the game, the horizontal coordinate of the
+        ship (None if there is no ship) and the number of bolts fired
+        Precondition: seen is a tuple (state, ship, fired)
+        """
+        if self._pending is None:
+            self._pending = stamp
+            self._seen = seen
+
+    def drawn(self, seen, stamp=None):
+        """
+        Ends the measure of the waiting press if this frame shows its effect
+
+        Parameter seen: what this frame shows (see press)
+        Precondition: seen is a tuple (state, ship, fired)
+
+        Parameter stamp: the time the frame was drawn (None for now)
+        Precondition: stamp is a float from time.perf_counter, or None
+        """
+        if self._pending is None:
+            return
+        if stamp is None:
+            stamp = time.perf_counter()
+        if seen != self._seen:
+            self._samples[self._count % self._size] = stamp-self._pending
+            self._count += 1
+            self._pending = None
+            self._seen = None
+        elif stamp-self._pending > self._timeout:
+            self._pending = None
+            self._seen = None
+
+    def percentiles(self, points=(50, 95, 99)):
+        """
+        Returns the percentiles of the times measured
+
+        The result is a tuple of seconds, one for each percentile in points.
+        It is all zeros if nothing was measured.
+
+        Parameter points: the percentiles to compute
+        Precondition: points is a sequence of numbers in 0..100
+        """
+        count = min(self._count, self._size)
+        if count == 0:
+            return (0.0,)*len(points)
+        values = sorted(self._samples[:count])
+        return tuple(values[min(count-1, int(count*point/100))] for point in points)
+
+    def report(self):
+        """
+        Returns the p50, p95 and p99 of the times measured, in milliseconds
+        """
+        return '%-14s%7.2f%7.2f%7.2f' % (('latency',)+tuple(t*1000 for t in self.percentiles()))
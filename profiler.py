@@ -0,0 +1,196 @@
+"""
+Frame profiling module for Alien Invaders
+
+This module times the stages of each animation frame: the stages of a wave
+update (ship movement, firing, hit detection, alien movement, bolt movement),
+the state checks of Invaders, and drawing.  When a frame hitches, the
+percentiles of each stage show which one was slow.
+
+A Profiler works like a stopwatch with laps.  The method start begins a frame,
+and each call to lap charges the time since the previous lap to a stage.  A
+stage may be lapped several times per frame (once per update, when a frame
+plays several updates); its times are added up.  The method finish ends the
+frame and stores the total of each stage in a ring buffer of the last
+PROFILE_FRAMES frames, from which the percentiles are computed.  The last
+PROFILE_EVENTS laps are also kept, and can be written to a trace file that
+chrome://tracing (or Perfetto) can open.
+
+Profiling is off unless a Profiler is given to the objects being timed.  Each
+of them keeps it in an attribute that is None otherwise, so the cost of an
+unused profiler is one test per stage.
+
+Paliska Bradley, bp355 and Philip Coppolino, pcc78
+"""
+from consts import *
+from array import array
+import json
+import time
+
+# PRIMARY RULE: This module may only access consts.py, so that it can also
+# time a headless Simulation.
+
+
+class Profiler(object):
+    """
+    A class to time the stages of each animation frame.
+
+    Stages are named by strings, and are reported in the order in which they
+    were first lapped.  Percentiles are over the frames in the ring buffer,
+    and are in seconds.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _stages: the names of the stages lapped so far
+    # Invariant: _stages is a list of strings, in the order first lapped
+    #
+    # Attribute _index: the position of each stage in _stages
+    # Invariant: _index is a dictionary mapping the strings of _stages to ints
+    #
+    # Attribute _samples: the total time of each stage in the last frames
+    # Invariant: _samples is a list of array('d') of length _size, one per
+    # stage; the entry of a frame is 0 if the stage was not lapped in it
+    #
+    # Attribute _current: the time of each stage in the current frame
+    # Invariant: _current is an array('d'), one entry per stage
+    #
+    # Attribute _size: the number of frames in the ring buffer
+    # Invariant: _size is an int > 0
+    #
+    # Attribute _frames: the number of frames finished so far
+    # Invariant: _frames is an int >= 0; frame number n is in slot n % _size
+    #
+    # Attribute _events: the last laps, as (stage, start, duration) triples
+    # Invariant: _events is an array('d') of length 3*_eventsize; the stage is
+    # its index in _stages
+    #
+    # Attribute _eventsize: the number of laps in the event ring buffer
+    # Invariant: _eventsize is an int > 0
+    #
+    # Attribute _laps: the number of laps so far
+    # Invariant: _laps is an int >= 0; lap number n is at 3*(n % _eventsize)
+    #
+    # Attribute _mark: the time of the last lap (or start of the frame)
+    # Invariant: _mark is a float
+
+    # GETTERS AND SETTERS
+    def getStages(self):
+        """
+        Returns the names of the stages lapped so far (as a tuple)
+        """
+        return tuple(self._stages)
+
+    def getFrames(self):
+        """
+        Returns the number of frames finished so far
+        """
+        return self._frames
+
+    def __init__(self, frames=PROFILE_FRAMES, events=PROFILE_EVENTS):
+        """
+        Initializes a profiler with no stages.
+
+        Parameter frames: the number of frames kept for the percentiles
+        Precondition: frames is an int > 0
+
+        Parameter events: the number of laps kept for the trace file
+        Precondition: events is an int > 0
+        """
+        self._stages = []
+        self._index = {}
+        self._samples = []
+        self._current = array('d')
+        self._size = frames
+        self._frames = 0
+        self._events = array('d', bytes(8*3*events))
+        self._eventsize = events
+        self._laps = 0
+        self._mark = time.perf_counter()
+
+    def start(self):
+        """
+        Begins a new frame (the time since the last lap is not counted)
+        """
+        self._mark = time.perf_counter()
+
+    def lap(self, stage):
+        """
+        Charges the time since the previous lap to the given stage
+
+        Parameter stage: the name of the stage
+        Precondition: stage is a string
+        """
+        now = time.perf_counter()
+        pos = self._index.get(stage)
+        if pos is None:
+            pos = len(self._stages)
+            self._index[stage] = pos
+            self._stages.append(stage)
+            self._samples.append(array('d', bytes(8*self._size)))
+            self._current.append(0.0)
+        self._current[pos] += now-self._mark
+        slot = 3*(self._laps % self._eventsize)
+        self._events[slot] = pos
+        self._events[slot+1] = self._mark
+        self._events[slot+2] = now-self._mark
+        self._laps += 1
+        self._mark = now
+
+    def finish(self):
+        """
+        Ends the frame, storing the time of each stage in the ring buffer
+        """
+        slot = self._frames % self._size
+        for pos in range(len(self._current)):
+            self._samples[pos][slot] = self._current[pos]
+            self._current[pos] = 0.0
+        self._frames += 1
+
+    def percentiles(self, stage, points=(50, 95, 99)):
+        """
+        Returns the percentiles of the time per frame of the given stage
+
+        The result is a tuple of seconds, one for each percentile in points.
+        It is all zeros if no frame has been finished.
+
+        Parameter stage: the name of the stage (or 'frame' for the total)
+        Precondition: stage is 'frame' or a string in getStages()
+
+        Parameter points: the percentiles to compute
+        Precondition: points is a sequence of numbers in 0..100
+        """
+        count = min(self._frames, self._size)
+        if count == 0:
+            return (0.0,)*len(points)
+        if stage == 'frame':
+            values = [sum(samples[slot] for samples in self._samples) for slot in range(count)]
+        else:
+            values = list(self._samples[self._index[stage]][:count])
+        values.sort()
+        return tuple(values[min(count-1, int(count*point/100))] for point in points)
+
+    def report(self):
+        """
+        Returns a table of the p50, p95 and p99 of every stage, in milliseconds
+        """
+        lines = ['%-14s%7s%7s%7s' % ('stage', 'p50', 'p95', 'p99')]
+        for stage in self._stages+['frame']:
+            times = self.percentiles(stage)
+            lines.append('%-14s%7.2f%7.2f%7.2f' % ((stage,)+tuple(t*1000 for t in times)))
+        return '\n'.join(lines)
+
+    def dump(self, filename):
+        """
+        Writes the last laps to a trace file in the Chrome trace event format
+
+        Parameter filename: the file to write
+        Precondition: filename is a string
+        """
+        count = min(self._laps, self._eventsize)
+        first = self._laps-count
+        events = []
+        for lap in range(first, first+count):
+            slot = 3*(lap % self._eventsize)
+            events.append({'name': self._stages[int(self._events[slot])], 'ph': 'X',
+                           'ts': self._events[slot+1]*1e6, 'dur': self._events[slot+2]*1e6,
+                           'pid': 0, 'tid': 0})
+        with open(filename, 'w') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
@@ -0,0 +1,488 @@
+"""
+Batched rendering module for Alien Invaders
+
+This module contains the classes that draw many models at once.  Drawing a
+GObject is one draw call, so drawing a formation of aliens one GImage at a time
+is one draw call per alien.  Instead, the classes here put the aliens (and the
+bolts) into a few Kivy Meshes, each of which is drawn in one call.
+
+All of the alien images are copied into a single texture atlas, so that one
+mesh can show every kind of alien.  The alien mesh is built relative to the
+formation origin and drawn through a Translate instruction, so a march step
+only changes the translation.  Large formations are split into several meshes,
+and only the mesh holding an alien is rebuilt when that alien dies.
+
+The formation only changes when it marches or an alien dies, and the defense
+line never changes, so neither needs to be drawn every frame.  A Layer renders
+them once into an offscreen texture, and each frame draws that texture with a
+single rectangle.  The layer is only rendered again when something in it
+changes.
+
+Paliska Bradley, bp355 and Philip Coppolino, pcc78
+"""
+from consts import *
+from game2d import *
+from kivy.graphics import (InstructionGroup, Fbo, ClearColor, ClearBuffers, Color,
+                           Rectangle, Mesh, PushMatrix, PopMatrix, Translate)
+
+# PRIMARY RULE: This module may only access consts.py, game2d and Kivy.  Wave
+# passes it the simulation objects (Formation, BoltPool) to draw.
+
+
+def quad(vertices, left, bottom, width, height, uvs):
+    """
+    Appends the four vertices of a textured rectangle to a vertex list
+
+    Each vertex is x, y, u, v (the default Mesh format).
+
+    Parameter vertices: the vertex list to append to
+    Precondition: vertices is a list of floats
+
+    Parameter left: the left edge of the rectangle
+    Precondition: left is an int or a float
+
+    Parameter bottom: the bottom edge of the rectangle
+    Precondition: bottom is an int or a float
+
+    Parameter width: the width of the rectangle
+    Precondition: width is an int or a float
+
+    Parameter height: the height of the rectangle
+    Precondition: height is an int or a float
+
+    Parameter uvs: the texture coordinates of the four corners
+    Precondition: uvs is a tuple of 8 floats in the order of Texture.tex_coords
+    """
+    right = left+width
+    top = bottom+height
+    vertices.extend((left, bottom, uvs[0], uvs[1], right, bottom, uvs[2], uvs[3],
+                     right, top, uvs[4], uvs[5], left, top, uvs[6], uvs[7]))
+
+
+# The index lists made by quadindices, by the number of quads
+INDICES = {}
+
+
+def quadindices(count):
+    """
+    Returns the indices drawing count quads as pairs of triangles
+
+    The lists are cached by count, so that meshes rebuilt every frame (like
+    the bolts) do not make a new list each time.  Do not modify the result.
+
+    Parameter count: the number of quads
+    Precondition: count is an int >= 0
+    """
+    indices = INDICES.get(count)
+    if indices is None:
+        indices = []
+        for pos in range(0, 4*count, 4):
+            indices.extend((pos, pos+1, pos+2, pos+2, pos+3, pos))
+        INDICES[count] = indices
+    return indices
+
+
+class Atlas(object):
+    """
+    A class representing many images packed into one texture.
+
+    The images are placed side by side in an offscreen buffer, and the
+    region of each image can then be looked up by its file name.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _fbo: the offscreen buffer holding the images
+    # Invariant: _fbo is a Kivy Fbo object
+    #
+    # Attribute _regions: the region of each image in the atlas
+    # Invariant: _regions is a dictionary mapping file names to Kivy Textures
+
+    def getTexture(self):
+        """
+        Returns the texture holding every image
+        """
+        return self._fbo.texture
+
+    def getRegion(self, source):
+        """
+        Returns the region of the atlas holding the given image
+
+        Parameter source: the file name of the image
+        Precondition: source was one of the images of this atlas
+        """
+        return self._regions[source]
+
+    def __init__(self, sources, load=None):
+        """
+        Initializes an atlas from the given image files.
+
+        Parameter sources: the file names of the images
+        Precondition: sources is a sequence of valid image file names
+
+        Parameter load: the function returning the texture of a file name
+        (GameApp.load_texture if None)
+        Precondition: load is a callable or None
+        """
+        if load is None:
+            load = GameApp.load_texture
+        textures = [load(source) for source in sources]
+        width = sum(texture.width for texture in textures)
+        height = max(texture.height for texture in textures)
+        self._fbo = Fbo(size=(width, height))
+        left = 0
+        places = []
+        with self._fbo:
+            ClearColor(0, 0, 0, 0)
+            ClearBuffers()
+            Color(1, 1, 1, 1)
+            for texture in textures:
+                Rectangle(texture=texture, pos=(left, 0), size=texture.size)
+                places.append(left)
+                left += texture.width
+        self._fbo.draw()
+        self._regions = {}
+        for pos in range(len(sources)):
+            texture = textures[pos]
+            region = self._fbo.texture.get_region(places[pos], 0, texture.width, texture.height)
+            self._regions[sources[pos]] = region
+
+
+class OffscreenView(object):
+    """
+    A view that draws into an offscreen buffer instead of the window.
+
+    Models draw to it exactly as they draw to a GView, so any model can be
+    drawn into a Layer.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _fbo: the offscreen buffer to draw into
+    # Invariant: _fbo is a Kivy Fbo object
+
+    def __init__(self, fbo):
+        """
+        Initializes a view of the given offscreen buffer.
+
+        Parameter fbo: the offscreen buffer to draw into
+        Precondition: fbo is a Kivy Fbo object
+        """
+        self._fbo = fbo
+
+    def draw(self, cmd):
+        """
+        Adds a drawing command to the offscreen buffer.
+
+        Parameter cmd: the drawing command
+        Precondition: cmd is a Kivy Instruction or InstructionGroup
+        """
+        self._fbo.add(cmd)
+
+
+class Layer(object):
+    """
+    A class to draw slow-changing models from an offscreen texture.
+
+    The method render draws the models into an offscreen buffer the size of
+    the game.  From then on, the method draw shows that buffer with a single
+    textured rectangle, no matter how many models were in it, until render is
+    called again.  Only call render when one of the models changed.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _fbo: the offscreen buffer holding the models
+    # Invariant: _fbo is a Kivy Fbo object of size (GAME_WIDTH, GAME_HEIGHT)
+    #
+    # Attribute _view: the view drawing into _fbo
+    # Invariant: _view is an OffscreenView of _fbo
+    #
+    # Attribute _group: the instructions to draw the texture of _fbo
+    # Invariant: _group is a Kivy InstructionGroup
+    #
+    # Attribute _renders: the number of calls to render so far
+    # Invariant: _renders is an int >= 0
+
+    def getRenders(self):
+        """
+        Returns the number of times the layer was rendered
+        """
+        return self._renders
+
+    def __init__(self):
+        """
+        Initializes an empty layer.
+        """
+        self._fbo = Fbo(size=(GAME_WIDTH, GAME_HEIGHT))
+        self._view = OffscreenView(self._fbo)
+        self._group = InstructionGroup()
+        self._group.add(Color(1, 1, 1, 1))
+        self._group.add(Rectangle(texture=self._fbo.texture, pos=(0, 0),
+                                  size=(GAME_WIDTH, GAME_HEIGHT)))
+        self._renders = 0
+
+    def render(self, models):
+        """
+        Draws the models into the layer, replacing what was in it
+
+        Parameter models: the models to draw, bottom first
+        Precondition: models is a sequence of objects with a draw(view) method
+        """
+        self._fbo.clear()
+        self._fbo.add(ClearColor(0, 0, 0, 0))
+        self._fbo.add(ClearBuffers())
+        for model in models:
+            model.draw(self._view)
+        self._fbo.draw()
+        self._renders += 1
+
+    def draw(self, view):
+        """
+        Draws the layer to the view.
+
+        Parameter view: the game view, used in drawing
+        Precondition: view is an instance of GView
+        """
+        view.draw(self._group)
+
+
+class FormationBatch(object):
+    """
+    A class to draw an entire alien formation in a few draw calls.
+
+    The formation is split into bands of rows with at most BATCH_QUADS aliens
+    each.  Every band has a mesh with a quad for each of its living aliens,
+    positioned relative to the formation origin.  A mesh is only rebuilt when
+    an alien in its band dies, so a death in a huge formation only rebuilds a
+    small mesh.  When the formation marches, only the Translate is changed.
+
+    A band that is entirely outside the window (in stress mode, the rows above
+    the top) is culled: its mesh is not drawn until it comes into view.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _atlas: the atlas with the alien images
+    # Invariant: _atlas is an Atlas object
+    #
+    # Attribute _group: the instructions to draw the formation
+    # Invariant: _group is a Kivy InstructionGroup
+    #
+    # Attribute _translate: the translation to the formation origin
+    # Invariant: _translate is a Kivy Translate in _group
+    #
+    # Attribute _visible: the meshes of the bands that are drawn
+    # Invariant: _visible is a Kivy InstructionGroup in _group (after
+    # _translate) holding the meshes of _meshes whose _shown is True
+    #
+    # Attribute _formation: the formation split into bands
+    # Invariant: _formation is a Formation object, or None before the first update
+    #
+    # Attribute _rows: the number of rows in each band (the last may have fewer)
+    # Invariant: _rows is an int > 0
+    #
+    # Attribute _meshes: the quads of the living aliens in each band
+    # Invariant: _meshes is a list of Kivy Meshes, one per band
+    #
+    # Attribute _counts: the number of living aliens in the mesh of each band
+    # Invariant: _counts is a list of ints, one per band; -1 if never built
+    #
+    # Attribute _extents: the lowest and highest offset of each band
+    # Invariant: _extents is a list of (bottom, top) tuples of floats, one
+    # per band, relative to the formation origin
+    #
+    # Attribute _shown: whether the mesh of each band is in _visible
+    # Invariant: _shown is a list of bools, one per band
+    #
+    # Attribute _total: the number of living aliens in the meshes
+    # Invariant: _total is an int >= 0, or -1 if a mesh was never built
+
+    def __init__(self, atlas):
+        """
+        Initializes an empty batch using the given atlas.
+
+        Parameter atlas: the atlas with the alien images
+        Precondition: atlas is an Atlas containing ALIEN_IMAGES1
+        """
+        self._atlas = atlas
+        self._group = InstructionGroup()
+        self._translate = Translate(0, 0)
+        self._visible = InstructionGroup()
+        self._group.add(PushMatrix())
+        self._group.add(Color(1, 1, 1, 1))
+        self._group.add(self._translate)
+        self._group.add(self._visible)
+        self._group.add(PopMatrix())
+        self._formation = None
+        self._rows = 1
+        self._meshes = []
+        self._counts = []
+        self._extents = []
+        self._shown = []
+        self._total = -1
+
+    def update(self, formation):
+        """
+        Updates the batch from the formation (if it changed)
+
+        The result is True if the formation looks any different than the last
+        time (it marched, or an alien died), and False otherwise.
+
+        Parameter formation: the formation to draw
+        Precondition: formation is a Formation object
+        """
+        changed = False
+        if formation is not self._formation:
+            self._split(formation)
+        ox, oy = formation.getOrigin()
+        if formation.getCount() != self._total:
+            changed = True
+            self._total = 0
+            for band in range(len(self._meshes)):
+                first = band*self._rows
+                last = min(first+self._rows, formation.getRows())
+                count = 0
+                for row in range(first, last):
+                    count += formation.getRowCount(row)
+                if count != self._counts[band]:
+                    self._build(band, first, last, count)
+                self._total += count
+        for band in range(len(self._meshes)):
+            bottom, top = self._extents[band]
+            shown = self._counts[band] > 0 and oy+top >= 0 and oy+bottom <= GAME_HEIGHT
+            if shown != self._shown[band]:
+                if shown:
+                    self._visible.add(self._meshes[band])
+                else:
+                    self._visible.remove(self._meshes[band])
+                self._shown[band] = shown
+                changed = True
+        if self._translate.xy != (ox, oy):
+            self._translate.xy = (ox, oy)
+            changed = True
+        return changed
+
+    def draw(self, view):
+        """
+        Draws the formation to the view.
+
+        Parameter view: the game view, used in drawing
+        Precondition: view is an instance of GView
+        """
+        view.draw(self._group)
+
+    # HELPER METHODS
+    def _split(self, formation):
+        """
+        Splits a new formation into bands, none of which is built yet
+
+        Parameter formation: the formation to draw
+        Precondition: formation is a Formation object
+        """
+        self._visible.clear()
+        self._formation = formation
+        self._rows = max(1, BATCH_QUADS // formation.getColumns())
+        ox, oy = formation.getOrigin()
+        bands = -(-formation.getRows() // self._rows)
+        self._meshes = [Mesh(mode='triangles', texture=self._atlas.getTexture())
+                        for band in range(bands)]
+        self._counts = [-1]*bands
+        self._shown = [False]*bands
+        self._extents = []
+        for band in range(bands):
+            first = band*self._rows
+            last = min(first+self._rows, formation.getRows())
+            ys = [formation.getY(formation.index(col, row))-oy
+                  for col in range(formation.getColumns()) for row in range(first, last)]
+            self._extents.append((min(ys)-ALIEN_HEIGHT/2, max(ys)+ALIEN_HEIGHT/2))
+        self._total = -1
+
+    def _build(self, band, first, last, count):
+        """
+        Rebuilds the mesh of a band from the living aliens in it
+
+        Parameter band: the band to rebuild
+        Precondition: band is an int in 0..len(_meshes)-1
+
+        Parameter first: the first row of the band
+        Precondition: first is an int, equal to band*_rows
+
+        Parameter last: the row after the last row of the band
+        Precondition: last is an int, the smaller of first+_rows and the rows
+        of the formation
+
+        Parameter count: the number of living aliens in the band
+        Precondition: count is an int >= 0
+        """
+        formation = self._formation
+        ox, oy = formation.getOrigin()
+        vertices = []
+        for col in range(formation.getColumns()):
+            for row in range(first, last):
+                i = formation.index(col, row)
+                if formation.isAlive(i):
+                    region = self._atlas.getRegion(ALIEN_IMAGES1[formation.getImage(i)])
+                    quad(vertices, formation.getX(i)-ox-ALIEN_WIDTH/2,
+                         formation.getY(i)-oy-ALIEN_HEIGHT/2,
+                         ALIEN_WIDTH, ALIEN_HEIGHT, region.tex_coords)
+        self._counts[band] = count
+        self._meshes[band].vertices = vertices
+        self._meshes[band].indices = quadindices(count)
+
+
+class BoltBatch(object):
+    """
+    A class to draw every laser bolt in two draw calls.
+
+    There is one mesh for the player bolts (blue) and one for the alien bolts
+    (red).  Bolts move every update, so the meshes are rebuilt every frame;
+    the vertex lists are reused to avoid allocating new ones.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _group: the instructions to draw the bolts
+    # Invariant: _group is a Kivy InstructionGroup
+    #
+    # Attribute _meshes: the meshes of the player and alien bolts
+    # Invariant: _meshes is a list of two Kivy Meshes, player bolts first
+    #
+    # Attribute _vertices: the vertex lists of the two meshes
+    # Invariant: _vertices is a list of two lists of floats
+
+    def __init__(self):
+        """
+        Initializes an empty batch.
+        """
+        self._group = InstructionGroup()
+        self._meshes = [Mesh(mode='triangles'), Mesh(mode='triangles')]
+        self._vertices = [[], []]
+        self._group.add(Color(0, 0, 1, 1))
+        self._group.add(self._meshes[0])
+        self._group.add(Color(1, 0, 0, 1))
+        self._group.add(self._meshes[1])
+
+    def update(self, pool, alpha=1.0):
+        """
+        Updates the batch from the active bolts of the pool
+
+        If alpha is less than 1, each bolt is drawn between its positions
+        before and after the last update (see Wave.draw).
+
+        Parameter pool: the bolts to draw
+        Precondition: pool is a BoltPool object
+
+        Parameter alpha: how far to draw between the last two updates
+        Precondition: alpha is a float in 0..1
+        """
+        for vertices in self._vertices:
+            del vertices[:]
+        uvs = (0, 0, 1, 0, 1, 1, 0, 1)
+        xs, ys, velocity, enemy = pool.getArrays()
+        for k in range(pool.getCount()):
+            y = ys[k] - velocity[k]*(1-alpha)
+            quad(self._vertices[enemy[k]],
+                 xs[k]-BOLT_WIDTH/2, y-BOLT_HEIGHT/2, BOLT_WIDTH, BOLT_HEIGHT, uvs)
+        for pos in range(2):
+            self._meshes[pos].vertices = self._vertices[pos]
+            self._meshes[pos].indices = quadindices(len(self._vertices[pos])//16)
+
+    def draw(self, view):
+        """
+        Draws the bolts to the view.
+
+        Parameter view: the game view, used in drawing
+        Precondition: view is an instance of GView
+        """
+        view.draw(self._group)
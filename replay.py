@@ -0,0 +1,231 @@
+"""
+Recording and replay module for Alien Invaders
+
+This module records the input of a game so that it can be played again.  A
+wave is completely decided by the seed of its random numbers and the keys
+held down in each update, so that is all a Recording stores.  A recording
+can be replayed in the window (see Invaders) or headless at full speed, which
+makes real games usable as reproducible benchmarks.
+
+The keys of each update are stored as a bitmask in a single byte.  In a file,
+the bitmasks are run-length encoded, since players hold keys for many updates
+at a time.  A file looks like this (all integers are little-endian):
+
+    b'INVR'        magic number
+    version        1 byte (currently 4)
+    seed           8 bytes
+    updates        4 bytes, the number of updates recorded
+    runs           a sequence of (bitmask byte, run length varint) pairs
+
+This module can also be run as a script, which replays a file headless:
+
+    python replay.py session.inv
+
+Paliska Bradley, bp355 and Philip Coppolino, pcc78
+"""
+from consts import *
+from simulation import *
+import struct
+import sys
+import time
+
+# PRIMARY RULE: This module may only access consts.py and simulation.py, so
+# that recordings can be replayed headless.
+
+# The keys recorded, in bit order
+KEYS = ('left', 'right', 'spacebar', 's')
+
+# The keys held down for each bitmask, so a replay never builds new tuples
+KEYSETS = tuple(tuple(KEYS[bit] for bit in range(len(KEYS)) if mask & (1 << bit))
+                for mask in range(1 << len(KEYS)))
+
+# The first bytes of a recording file
+MAGIC = b'INVR'
+# The version of the file format (2: aliens pick shooters from a column index,
+# so the same seed plays a different game than with version 1; 3: bolts are
+# tested for hits as soon as they move, and the ship stops exactly at the
+# edges of the window; 4: alien steps and shots are scheduled events, and the
+# ship takes DEATH_SPEED to explode)
+VERSION = 4
+
+
+def keymask(input):
+    """
+    Returns the bitmask of the recorded keys that input holds down
+
+    Parameter input: the input to read
+    Precondition: input is a GInput or a ScriptedInput
+    """
+    mask = 0
+    for bit in range(len(KEYS)):
+        if input.is_key_down(KEYS[bit]):
+            mask |= 1 << bit
+    return mask
+
+
+class Recording(object):
+    """
+    A class representing the seed and per-update input of a wave.
+
+    The method record appends the keys held down in one update.  The method
+    script returns the recorded keys in the form expected by ScriptedInput.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _seed: the seed of the random numbers of the wave
+    # Invariant: _seed is an int >= 0
+    #
+    # Attribute _masks: the keys held down in each update, as bitmasks
+    # Invariant: _masks is a bytearray; each byte is < 2**len(KEYS)
+
+    # GETTERS AND SETTERS
+    def getSeed(self):
+        """
+        Returns the seed of the random numbers of the wave
+        """
+        return self._seed
+
+    def getUpdates(self):
+        """
+        Returns the number of updates recorded
+        """
+        return len(self._masks)
+
+    def __init__(self, seed, masks=b''):
+        """
+        Initializes a recording of a wave.
+
+        Parameter seed: the seed of the random numbers of the wave
+        Precondition: seed is an int >= 0
+
+        Parameter masks: the keys held down in each update so far
+        Precondition: masks is a bytes-like object of key bitmasks
+        """
+        self._seed = seed
+        self._masks = bytearray(masks)
+
+    def record(self, input):
+        """
+        Records the keys that input holds down for one update
+
+        Parameter input: the input to record
+        Precondition: input is a GInput or a ScriptedInput
+        """
+        self._masks.append(keymask(input))
+
+    def script(self):
+        """
+        Returns an iterator over the keys held down in each update
+        """
+        return (KEYSETS[mask] for mask in self._masks)
+
+    def save(self, filename):
+        """
+        Writes this recording to a file (in the format described above)
+
+        Parameter filename: the file to write
+        Precondition: filename is a string
+        """
+        data = bytearray(MAGIC)
+        data += struct.pack('<BQI', VERSION, self._seed, len(self._masks))
+        pos = 0
+        while pos < len(self._masks):
+            mask = self._masks[pos]
+            end = pos+1
+            while end < len(self._masks) and self._masks[end] == mask:
+                end += 1
+            data.append(mask)
+            run = end-pos
+            while run >= 0x80:
+                data.append((run & 0x7f) | 0x80)
+                run >>= 7
+            data.append(run)
+            pos = end
+        with open(filename, 'wb') as file:
+            file.write(data)
+
+
+def load(filename):
+    """
+    Returns the Recording stored in a file
+
+    This function raises a ValueError if the file is not a recording.
+
+    Parameter filename: the file to read
+    Precondition: filename is a string naming an existing file
+    """
+    with open(filename, 'rb') as file:
+        data = file.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError('%s is not a recording' % repr(filename))
+    version, seed, updates = struct.unpack_from('<BQI', data, len(MAGIC))
+    if version != VERSION:
+        raise ValueError('%s has unknown version %d' % (repr(filename), version))
+    masks = bytearray()
+    pos = len(MAGIC)+struct.calcsize('<BQI')
+    while pos < len(data):
+        mask = data[pos]
+        run = 0
+        shift = 0
+        pos += 1
+        while data[pos] & 0x80:
+            run |= (data[pos] & 0x7f) << shift
+            shift += 7
+            pos += 1
+        run |= data[pos] << shift
+        pos += 1
+        masks += bytes((mask,))*run
+    if len(masks) != updates:
+        raise ValueError('%s is truncated' % repr(filename))
+    return Recording(seed, masks)
+
+
+def replay(recording, realtime=False):
+    """
+    Replays a recording headless and returns the finished Simulation
+
+    The game is played until it is over or the recording runs out.  Like play,
+    the ship is recreated as soon as it is destroyed, and the next wave is
+    started as soon as a wave is won (in the game, the player had to press
+    's', but that does not change the game).
+
+    Parameter recording: the recording to replay
+    Precondition: recording is a Recording object
+
+    Parameter realtime: True to take SIM_STEP seconds per update, False to
+    replay as fast as possible
+    Precondition: realtime is a bool
+    """
+    sim = Simulation(recording.getSeed())
+    input = ScriptedInput(recording.script())
+    if not realtime:
+        left = recording.getUpdates()
+        while left > 0:
+            state, updates = play(sim, input, left)
+            left -= updates
+            if state != 'win' or left == 0:
+                break
+            sim.nextwave()
+        return sim
+    start = time.perf_counter()
+    for update in range(recording.getUpdates()):
+        if sim.state() == 'win':
+            sim.nextwave()
+        if play(sim, input, 1)[0] == 'over':
+            break
+        delay = start + (update+1)*SIM_STEP - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    return sim
+
+
+# Script code
+if __name__ == '__main__':
+    recording = load(sys.argv[-1])
+    start = time.perf_counter()
+    sim = replay(recording)
+    elapsed = time.perf_counter()-start
+    print('seed %d, %d updates: wave %d %s, score %d, %d lives left' %
+          (recording.getSeed(), recording.getUpdates(), sim.getWave(), sim.state(),
+           sim.getScore(), sim.getLives()))
+    print('replayed in %.3fs (%.0f updates per second)' %
+          (elapsed, recording.getUpdates()/max(elapsed, 1e-9)))
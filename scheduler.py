@@ -0,0 +1,121 @@
+"""
+Event scheduling module for Alien Invaders
+
+This module contains the scheduler of the timed events of a wave: the march
+steps of the aliens, their shots, and the frames of the ship explosion.  None
+of these happen every update, so instead of checking a timer every update,
+each one is registered with the time it is due, and the scheduler keeps them
+in a heap ordered by that time.
+
+Each update advances the clock of the scheduler by dt.  If the first event of
+the heap is not due yet, that is one comparison and nothing else, so an update
+with no due events does no timing work.  Otherwise every due event is run, in
+order, even if an update is so long that several of the same kind are due.  A
+headless run can also ask when the next event is due, and jump straight to it.
+
+Paliska Bradley, bp355 and Philip Coppolino, pcc78
+"""
+from consts import *
+import heapq
+
+# PRIMARY RULE: This module may only access consts.py, so that the simulation
+# can use it headless.
+
+
+class Scheduler(object):
+    """
+    A class to run callbacks once the time they are due has come.
+
+    Events due at the same time are run by their order (lowest first), and
+    events with the same order in the order they were scheduled.  While an
+    event runs, the clock reads the time it was due, so an event that
+    schedules the next one some time after itself does not drift.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _heap: the events not run yet, as (due, order, number, callback)
+    # Invariant: _heap is a list satisfying the heap property of heapq
+    #
+    # Attribute _time: the current time of the clock
+    # Invariant: _time is a float >= 0
+    #
+    # Attribute _count: the number of events scheduled since the last clear
+    # Invariant: _count is an int >= 0; it numbers the events of _heap
+
+    # GETTERS AND SETTERS
+    def getTime(self):
+        """
+        Returns the current time of the clock, in seconds
+        """
+        return self._time
+
+    def getNext(self):
+        """
+        Returns the time the next event is due (or infinity if there is none)
+        """
+        return self._heap[0][0] if self._heap else float('inf')
+
+    def __init__(self):
+        """
+        Initializes a scheduler with no events, at time 0.
+        """
+        self._heap = []
+        self._time = 0.0
+        self._count = 0
+
+    def clear(self):
+        """
+        Removes every event and sets the clock back to 0
+        """
+        del self._heap[:]
+        self._time = 0.0
+        self._count = 0
+
+    def at(self, time, callback, order=0):
+        """
+        Schedules a call to callback at the given time
+
+        Parameter time: the time the event is due (infinity for never)
+        Precondition: time is a float
+
+        Parameter callback: the function to call
+        Precondition: callback is a callable with no arguments
+
+        Parameter order: the order among the events due at the same time
+        Precondition: order is an int
+        """
+        heapq.heappush(self._heap, (time, order, self._count, callback))
+        self._count += 1
+
+    def after(self, delay, callback, order=0):
+        """
+        Schedules a call to callback delay seconds from now
+
+        Parameter delay: the seconds until the event is due
+        Precondition: delay is a float >= 0
+
+        Parameter callback: the function to call
+        Precondition: callback is a callable with no arguments
+
+        Parameter order: the order among the events due at the same time
+        Precondition: order is an int
+        """
+        self.at(self._time+delay, callback, order)
+
+    def advance(self, dt):
+        """
+        Moves the clock forward by dt, running every event that becomes due
+
+        An event is due once the clock reaches its time.  Events scheduled by
+        the events being run are also run if they are due by the end.
+
+        Parameter dt: the seconds to move the clock forward
+        Precondition: dt is a number >= 0
+        """
+        end = self._time+dt
+        heap = self._heap
+        while heap and heap[0][0] <= end:
+            event = heapq.heappop(heap)
+            if event[0] > self._time:
+                self._time = event[0]
+            event[3]()
+        self._time = end
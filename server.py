@@ -0,0 +1,455 @@
+"""
+Game server module for Alien Invaders
+
+This module hosts many headless games at once in a single process: bots, load
+tests, or clients connected through a local socket.  Each game is a Session
+playing its own Simulation (the rules that Wave renders), and every session
+is updated once per tick of SERVER_TICK seconds by an asyncio event loop.
+
+The sessions are updated SERVER_SLICE at a time, and the loop reads its
+sockets between slices, so input is never stuck behind thousands of updates.
+If a tick takes longer than SERVER_TICK (an overrun), the next ticks start
+late and the server catches up, but never by more than SIM_MAX_STEPS ticks;
+older ticks are dropped.  That bounds how late any session can be, no matter
+how many there are.  How many sessions one core can host is the tick time
+divided by the time per session, so the server reports that estimate along
+with the tick percentiles and overruns.  To use more cores, run several
+workers; each is a process with its own loop and its own share of the bots.
+
+A client connects to SERVER_HOST on SERVER_PORT (plus the worker number) and
+sends one byte per change of keys: a bitmask of the keys held down (see KEYS
+in replay.py).  When it connects, and whenever the state of its game changes,
+the server sends back a line 'wave score lives state', where the state is
+'play', 'pause', 'win' or 'over'.  For example,
+
+    python server.py --sessions 2000 --workers 4 --seconds 30
+
+plays 2000 bots on 4 cores for 30 seconds and prints the metrics of each.
+
+Paliska Bradley, bp355 and Philip Coppolino, pcc78
+"""
+from consts import *
+from simulation import *
+from replay import KEYS, KEYSETS
+from profiler import *
+import argparse
+import asyncio
+import multiprocessing
+import random
+import time
+
+# PRIMARY RULE: This module may only access consts.py, simulation.py, replay.py
+# and profiler.py, so that it runs headless.
+
+# The keys a bot picks from (each is held until the bot picks again)
+BOT_KEYS = (('spacebar',), ('left', 'spacebar'), ('right', 'spacebar'),
+            ('left',), ('right',), ('s',))
+# The shortest and longest seconds a bot holds its keys
+BOT_HOLD = (0.05, 0.5)
+
+
+def mask(keys):
+    """
+    Returns the bitmask of the given keys (as sent by a client)
+
+    Parameter keys: the keys held down
+    Precondition: keys is a collection of strings in KEYS
+    """
+    result = 0
+    for key in keys:
+        result |= 1 << KEYS.index(key)
+    return result
+
+
+class Session(object):
+    """
+    A class representing one game hosted by a Server.
+
+    A session plays a headless Simulation, one update per tick.  Its keys come
+    from its inbox, a queue of key bitmasks: each bitmask replaces the keys
+    held down until the next one arrives.  Bots put bitmasks straight into
+    the inbox, and the server puts the bytes sent by a client there.
+
+    Like Invaders, a session waits for 's' after the ship is destroyed, and
+    starts the next wave after a win.  A session is done once its game is
+    over or its client has gone.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _sim: the game of this session
+    # Invariant: _sim is a Simulation object
+    #
+    # Attribute _input: the keys held down
+    # Invariant: _input is a ScriptedInput
+    #
+    # Attribute _inbox: the key bitmasks not applied yet
+    # Invariant: _inbox is an asyncio.Queue of ints in 0..255
+    #
+    # Attribute _writer: the stream to the client
+    # Invariant: _writer is an asyncio.StreamWriter, or None for a bot
+    #
+    # Attribute _state: the state of _sim last sent to the client
+    # Invariant: _state is 'pause', 'over', 'win' or None
+    #
+    # Attribute _done: whether the session has ended
+    # Invariant: _done is a bool
+
+    # GETTERS AND SETTERS
+    def getSimulation(self):
+        """
+        Returns the game of this session
+        """
+        return self._sim
+
+    def getInbox(self):
+        """
+        Returns the queue of key bitmasks of this session
+        """
+        return self._inbox
+
+    def isDone(self):
+        """
+        Returns True if the session has ended
+        """
+        return self._done
+
+    def __init__(self, seed=None, writer=None):
+        """
+        Initializes a session with a new game.
+
+        Parameter seed: the seed of the game (None picks one)
+        Precondition: seed is an int >= 0 or None
+
+        Parameter writer: the stream to the client (None for a bot)
+        Precondition: writer is an asyncio.StreamWriter or None
+        """
+        self._sim = Simulation(seed)
+        self._input = ScriptedInput()
+        self._inbox = asyncio.Queue()
+        self._writer = writer
+        self._state = None
+        self._done = False
+        self._send()
+
+    def tick(self):
+        """
+        Applies the keys that arrived and plays one update of the game
+        """
+        inbox = self._inbox
+        while not inbox.empty():
+            self._input.hold(KEYSETS[inbox.get_nowait() % len(KEYSETS)])
+        sim = self._sim
+        state = sim.state()
+        if state is None:
+            sim.update(self._input, SERVER_TICK)
+        elif state == 'pause':
+            if self._input.is_key_down('s'):
+                sim.new()
+        elif state == 'win':
+            sim.nextwave()
+        else:
+            self._done = True
+        state = sim.state()
+        if state != self._state:
+            self._state = state
+            self._send()
+
+    def close(self):
+        """
+        Ends the session, closing the stream to the client (if any)
+        """
+        self._done = True
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    # HELPER METHODS
+    def _send(self):
+        """
+        Sends the wave, score, lives and state of the game to the client (if any)
+        """
+        if self._writer is not None:
+            sim = self._sim
+            state = 'play' if self._state is None else self._state
+            self._writer.write(('%d %d %d %s\n' % (sim.getWave(), sim.getScore(),
+                                                   sim.getLives(), state)).encode())
+
+
+class Server(object):
+    """
+    A class to update many sessions on a fixed tick.
+
+    The method run plays the ticks; the method serve accepts clients.  Both
+    must be awaited in the same event loop.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _sessions: the sessions being played
+    # Invariant: _sessions is a list of Session objects that are not done
+    #
+    # Attribute _profiler: the time of each tick
+    # Invariant: _profiler is a Profiler object with the stage 'tick'
+    #
+    # Attribute _ticks: the number of ticks played
+    # Invariant: _ticks is an int >= 0
+    #
+    # Attribute _overruns: the number of ticks that took longer than SERVER_TICK
+    # Invariant: _overruns is an int in 0.._ticks
+    #
+    # Attribute _dropped: the number of ticks skipped to catch up
+    # Invariant: _dropped is an int >= 0
+    #
+    # Attribute _lag: the latest start of a tick since the last report
+    # Invariant: _lag is a float >= 0, in seconds
+
+    # GETTERS AND SETTERS
+    def getCount(self):
+        """
+        Returns the number of sessions being played
+        """
+        return len(self._sessions)
+
+    def getTicks(self):
+        """
+        Returns the number of ticks played so far
+        """
+        return self._ticks
+
+    def getOverruns(self):
+        """
+        Returns the number of ticks that took longer than SERVER_TICK
+        """
+        return self._overruns
+
+    def __init__(self):
+        """
+        Initializes a server with no sessions.
+        """
+        self._sessions = []
+        self._profiler = Profiler()
+        self._ticks = 0
+        self._overruns = 0
+        self._dropped = 0
+        self._lag = 0.0
+
+    def add(self, seed=None, writer=None):
+        """
+        Returns a new session, played from the next tick on
+
+        Parameter seed: the seed of the game (None picks one)
+        Precondition: seed is an int >= 0 or None
+
+        Parameter writer: the stream to the client (None for a bot)
+        Precondition: writer is an asyncio.StreamWriter or None
+        """
+        session = Session(seed, writer)
+        self._sessions.append(session)
+        return session
+
+    async def tick(self):
+        """
+        Updates every session once, and removes the sessions that are done
+        """
+        sessions = self._sessions
+        pos = 0
+        updated = 0
+        while pos < len(sessions):
+            session = sessions[pos]
+            session.tick()
+            if session.isDone():
+                session.close()
+                sessions[pos] = sessions[-1]
+                sessions.pop()
+            else:
+                pos += 1
+            updated += 1
+            if updated % SERVER_SLICE == 0:
+                await asyncio.sleep(0)
+
+    async def run(self, seconds=None, report=SERVER_REPORT):
+        """
+        Plays ticks every SERVER_TICK seconds, printing the metrics regularly
+
+        Parameter seconds: how long to play (None for ever)
+        Precondition: seconds is a float > 0 or None
+
+        Parameter report: the seconds between reports
+        Precondition: report is a float > 0
+        """
+        loop = asyncio.get_running_loop()
+        due = loop.time()
+        end = None if seconds is None else due+seconds
+        nextreport = due+report
+        while end is None or due < end:
+            now = loop.time()
+            if now < due:
+                await asyncio.sleep(due-now)
+                continue
+            if now-due > SIM_MAX_STEPS*SERVER_TICK:
+                skipped = int((now-due)/SERVER_TICK)
+                self._dropped += skipped
+                due += skipped*SERVER_TICK
+            self._lag = max(self._lag, now-due)
+            self._profiler.start()
+            await self.tick()
+            self._profiler.lap('tick')
+            self._profiler.finish()
+            if loop.time()-now > SERVER_TICK:
+                self._overruns += 1
+            self._ticks += 1
+            due += SERVER_TICK
+            if now >= nextreport:
+                print(self.report(), flush=True)
+                nextreport += report
+
+    def close(self):
+        """
+        Ends every session (closing the stream to each client)
+        """
+        for session in self._sessions:
+            session.close()
+        del self._sessions[:]
+
+    async def serve(self, port=SERVER_PORT):
+        """
+        Returns a listener that starts a session for every client
+
+        Parameter port: the port to listen on
+        Precondition: port is an int in 1..65535
+        """
+        return await asyncio.start_server(self._connect, SERVER_HOST, port)
+
+    def report(self):
+        """
+        Returns a line with the metrics of the server
+
+        The times are the p50 and p99 of the last PROFILE_FRAMES ticks.  The
+        lag is how late the latest tick started since the last report, and
+        the sessions per core is how many sessions fit in SERVER_TICK at the
+        p50 time per session.
+        """
+        p50, p99 = self._profiler.percentiles('tick', (50, 99))
+        count = len(self._sessions)
+        capacity = int(count*SERVER_TICK/p50) if p50 > 0 else 0
+        line = ('%d sessions: tick p50 %.2fms p99 %.2fms, %d of %d ticks overran, '
+                '%d dropped, lag %.2fms, ~%d sessions per core' %
+                (count, p50*1000, p99*1000, self._overruns, self._ticks,
+                 self._dropped, self._lag*1000, capacity))
+        self._lag = 0.0
+        return line
+
+    # HELPER METHODS
+    async def _connect(self, reader, writer):
+        """
+        Plays a session for a client until it disconnects (or the game ends)
+
+        Parameter reader: the stream from the client
+        Precondition: reader is an asyncio.StreamReader
+
+        Parameter writer: the stream to the client
+        Precondition: writer is an asyncio.StreamWriter
+        """
+        session = self.add(writer=writer)
+        inbox = session.getInbox()
+        while not session.isDone():
+            data = await reader.read(64)
+            if not data:
+                break
+            for byte in data:
+                inbox.put_nowait(byte)
+        session.close()
+
+
+async def bot(session, seed):
+    """
+    Plays a session with random keys until it is done
+
+    Parameter session: the session to play
+    Precondition: session is a Session object
+
+    Parameter seed: the seed of the choice of keys
+    Precondition: seed is an int
+    """
+    rng = random.Random(seed)
+    inbox = session.getInbox()
+    masks = [mask(keys) for keys in BOT_KEYS]
+    while not session.isDone():
+        inbox.put_nowait(rng.choice(masks))
+        await asyncio.sleep(rng.uniform(*BOT_HOLD))
+
+
+async def host(sessions, seconds, seed, port=None):
+    """
+    Plays the given number of bots (and any clients) for a while
+
+    The result is a tuple (sessions, ticks, overruns) at the end.
+
+    Parameter sessions: the number of bots
+    Precondition: sessions is an int >= 0
+
+    Parameter seconds: how long to play
+    Precondition: seconds is a float > 0
+
+    Parameter seed: the seed of the first bot
+    Precondition: seed is an int >= 0
+
+    Parameter port: the port for clients (None for no clients)
+    Precondition: port is an int in 1..65535 or None
+    """
+    server = Server()
+    bots = [asyncio.ensure_future(bot(server.add(seed+pos), seed+pos))
+            for pos in range(sessions)]
+    listener = None if port is None else await server.serve(port)
+    await server.run(seconds)
+    if listener is not None:
+        listener.close()
+    for task in bots:
+        task.cancel()
+    print(server.report(), flush=True)
+    result = (server.getCount(), server.getTicks(), server.getOverruns())
+    server.close()
+    await asyncio.sleep(0)
+    return result
+
+
+def work(task):
+    """
+    Runs one worker of the server (in its own process)
+
+    Parameter task: the sessions, seconds, seed and port of the worker
+    Precondition: task is a tuple of valid arguments for host
+    """
+    return asyncio.run(host(*task))
+
+
+def main():
+    """
+    Runs the server given by the command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Host many headless games.')
+    parser.add_argument('--sessions', type=int, default=100, help='bots in all')
+    parser.add_argument('--workers', type=int, default=1, help='processes (one per core)')
+    parser.add_argument('--seconds', type=float, default=30.0)
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first bot')
+    parser.add_argument('--listen', action='store_true', help='accept clients on SERVER_PORT')
+    args = parser.parse_args()
+
+    tasks = []
+    for worker in range(args.workers):
+        share = args.sessions//args.workers + (worker < args.sessions % args.workers)
+        port = SERVER_PORT+worker if args.listen else None
+        tasks.append((share, args.seconds, args.seed+worker*args.sessions, port))
+    start = time.perf_counter()
+    if args.workers == 1:
+        results = [work(tasks[0])]
+    else:
+        with multiprocessing.Pool(args.workers) as pool:
+            results = pool.map(work, tasks)
+    elapsed = time.perf_counter()-start
+    ticks = sum(result[1] for result in results)
+    overruns = sum(result[2] for result in results)
+    print('%d sessions on %d workers for %.1fs: %d of %d ticks overran' %
+          (args.sessions, args.workers, elapsed, overruns, ticks))
+
+
+# Script code
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,1427 @@
+"""
+Headless simulation module for Alien Invaders
+
+This module contains the simulation core for a single wave of Alien Invaders.
+It plays by exactly the same rules as the subcontroller Wave (the ship moves
+and fires, the aliens march and fire back, bolts fly and hit things), but it
+works on plain geometry instead of GObjects. That means a wave can be created
+and played without a window, without Kivy and without game2d at all.
+
+The class Wave in wave.py renders from an instance of Simulation, so the
+windowed game and any headless run (tests, batch jobs) share the same rules.
+Instead of a GInput object, a headless run is driven by a ScriptedInput, which
+answers the same questions (is_key_down and key_count) from a script.
+
+The alien steps, the alien shots and the frames of the ship explosion are timed
+events of a Scheduler (scheduler.py), so an update only does timing work when
+one of them is due.
+
+Paliska Bradley, bp355 and Philip Coppolino, pcc78
+"""
+from consts import *
+from collision import *
+from scheduler import *
+from array import array
+import random
+
+# PRIMARY RULE: This module may only access consts.py, collision.py and
+# scheduler.py.  It must never import game2d (or anything that imports game2d),
+# so that it can run headless.
+
+
+class Body(object):
+    """
+    A class representing a plain axis-aligned rectangle.
+
+    A Body is the geometry-only counterpart of a GObject.  It has a center
+    (x,y) and a size (width,height), and nothing else.  It is used for the
+    ship in the simulation.
+    """
+    # INSTANCE ATTRIBUTES:
+    # Attribute x: the horizontal coordinate of the center
+    # Invariant: x is an int or a float
+    #
+    # Attribute y: the vertical coordinate of the center
+    # Invariant: y is an int or a float
+    #
+    # Attribute width: the width of the rectangle
+    # Invariant: width is an int or a float > 0
+    #
+    # Attribute height: the height of the rectangle
+    # Invariant: height is an int or a float > 0
+
+    def __init__(self, x, y, width, height):
+        """
+        Initializes the body.
+
+        Parameter x: x is the horizontal coordinate of the center
+        Precondition: x is an int or a float
+
+        Parameter y: y is the vertical coordinate of the center
+        Precondition: y is an int or a float
+
+        Parameter width: the width of the rectangle
+        Precondition: width is an int or a float > 0
+
+        Parameter height: the height of the rectangle
+        Precondition: height is an int or a float > 0
+        """
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+
+class Formation(object):
+    """
+    A class representing the alien formation as a structure of arrays.
+
+    Instead of one object per alien, the formation stores each alien property
+    in its own contiguous array: the position of the alien relative to the
+    formation origin, whether it is alive, and the index of its image in
+    ALIEN_IMAGES1.  Alien i is in column i // rows and row i % rows, where row
+    0 is the bottom row.  The aliens always move together, so a march step
+    only moves the origin; it costs the same no matter how big the formation.
+
+    Dead aliens stay in the arrays with their alive flag cleared, so the
+    formation is always rectangular.  The offsets never change, so they are
+    the template of the formation: the method reset brings every alien back
+    to life in the starting position without creating anything new.
+
+    The formation is a regular lattice, so the aliens that might touch a
+    rectangle (like a bolt) are found directly from its coordinates.  The
+    method candidates does a constant amount of work for a bolt-sized
+    rectangle, no matter how big the formation.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _cols: the number of columns
+    # Invariant: _cols is an int > 0
+    #
+    # Attribute _rows: the number of rows
+    # Invariant: _rows is an int > 0
+    #
+    # Attribute _x: the horizontal offset of each alien from the origin
+    # Invariant: _x is an array of floats of length _cols*_rows
+    #
+    # Attribute _y: the vertical offset of each alien from the origin
+    # Invariant: _y is an array of floats of length _cols*_rows
+    #
+    # Attribute _alive: whether each alien is alive (1) or dead (0)
+    # Invariant: _alive is a bytearray of length _cols*_rows
+    #
+    # Attribute _image: the index in ALIEN_IMAGES1 of each alien image
+    # Invariant: _image is an array of ints of length _cols*_rows
+    #
+    # Attribute _ox: the horizontal coordinate of the formation origin
+    # Invariant: _ox is an int or a float
+    #
+    # Attribute _oy: the vertical coordinate of the formation origin
+    # Invariant: _oy is an int or a float
+    #
+    # Attribute _count: the number of living aliens
+    # Invariant: _count is an int equal to the number of 1s in _alive
+    #
+    # Attribute _colcount: the number of living aliens in each column
+    # Invariant: _colcount is a list of _cols ints >= 0 that sum to _count
+    #
+    # Attribute _rowcount: the number of living aliens in each row
+    # Invariant: _rowcount is a list of _rows ints >= 0 that sum to _count
+    #
+    # Attribute _lowest: the index of the bottom living alien of each column
+    # Invariant: _lowest is an array of _cols ints; the entry of an empty
+    # column is -1
+    #
+    # Attribute _shooters: the columns that still have a living alien
+    # Invariant: _shooters is a list of the columns whose _colcount is > 0,
+    # in no particular order
+    #
+    # Attribute _slot: the position of each column in _shooters
+    # Invariant: _slot is an array of _cols ints; _shooters[_slot[col]] == col
+    # for every column in _shooters
+    #
+    # Attribute _minx: the smallest horizontal offset of a living alien
+    # Invariant: _minx is a float, or None if _count is 0
+    #
+    # Attribute _maxx: the largest horizontal offset of a living alien
+    # Invariant: _maxx is a float, or None if _count is 0
+    #
+    # Attribute _miny: the smallest vertical offset of a living alien
+    # Invariant: _miny is a float, or None if _count is 0
+
+    # GETTERS AND SETTERS
+    def getColumns(self):
+        """
+        Returns the number of columns in the formation
+        """
+        return self._cols
+
+    def getRows(self):
+        """
+        Returns the number of rows in the formation
+        """
+        return self._rows
+
+    def getSize(self):
+        """
+        Returns the number of aliens (dead or alive) in the formation
+        """
+        return len(self._alive)
+
+    def getCount(self):
+        """
+        Returns the number of living aliens
+        """
+        return self._count
+
+    def getShooterCount(self):
+        """
+        Returns the number of columns that still have a living alien
+        """
+        return len(self._shooters)
+
+    def getShooter(self, pos):
+        """
+        Returns the index of the bottom living alien of a non-empty column
+
+        The non-empty columns are numbered from 0 to getShooterCount()-1, in
+        no particular order (the order changes as columns empty).
+
+        Parameter pos: the number of the non-empty column
+        Precondition: pos is an int in 0..getShooterCount()-1
+        """
+        return self._lowest[self._shooters[pos]]
+
+    def getShooterPos(self, col):
+        """
+        Returns the number of a non-empty column (see getShooter)
+
+        Parameter col: the column
+        Precondition: col is an int in 0..getColumns()-1 and col is not empty
+        """
+        return self._slot[col]
+
+    def getRowCount(self, row):
+        """
+        Returns the number of living aliens in the given row
+
+        Parameter row: the row (0 is the bottom row)
+        Precondition: row is an int in 0..getRows()-1
+        """
+        return self._rowcount[row]
+
+    def getOrigin(self):
+        """
+        Returns the formation origin as a tuple (x,y)
+        """
+        return (self._ox, self._oy)
+
+    def getX(self, i):
+        """
+        Returns the horizontal coordinate of the center of alien i
+
+        Parameter i: the alien index
+        Precondition: i is an int in 0..getSize()-1
+        """
+        return self._ox + self._x[i]
+
+    def getY(self, i):
+        """
+        Returns the vertical coordinate of the center of alien i
+
+        Parameter i: the alien index
+        Precondition: i is an int in 0..getSize()-1
+        """
+        return self._oy + self._y[i]
+
+    def getOffsets(self):
+        """
+        Returns the offsets of the aliens from the origin as a tuple (xs,ys)
+
+        These are the formation's own arrays (see the hidden attributes), so
+        the collision tests can read them without copying.  Do not modify them.
+        """
+        return (self._x, self._y)
+
+    def getAlive(self):
+        """
+        Returns whether each alien is alive, as a bytearray of 1s and 0s
+
+        This is the formation's own array (see the hidden attributes), so it
+        can be read without copying.  Do not modify it.
+        """
+        return self._alive
+
+    def getImage(self, i):
+        """
+        Returns the index in ALIEN_IMAGES1 of the image of alien i
+
+        Parameter i: the alien index
+        Precondition: i is an int in 0..getSize()-1
+        """
+        return self._image[i]
+
+    def isAlive(self, i):
+        """
+        Returns True if alien i is alive
+
+        Parameter i: the alien index
+        Precondition: i is an int in 0..getSize()-1
+        """
+        return self._alive[i] == 1
+
+    def __init__(self, cols, rows):
+        """
+        Initializes a full formation in the standard starting position.
+
+        The bottom left alien is the origin, so its offset is (0,0).
+
+        Parameter cols: the number of columns (aliens in a row)
+        Precondition: cols is an int > 0
+
+        Parameter rows: the number of rows
+        Precondition: rows is an int > 0
+        """
+        self._cols = cols
+        self._rows = rows
+        size = cols*rows
+        hsep = ALIEN_H_SEP + ALIEN_WIDTH
+        vsep = ALIEN_V_SEP + ALIEN_HEIGHT
+        self._x = array('d', [(i // rows)*hsep for i in range(size)])
+        self._y = array('d', [(i % rows)*vsep for i in range(size)])
+        self._image = array('B', [((i % rows)//2) % len(ALIEN_IMAGES1) for i in range(size)])
+        self._alive = bytearray(size)
+        self._colcount = [0]*cols
+        self._rowcount = [0]*rows
+        self._lowest = array('i', bytes(4*cols))
+        self._shooters = []
+        self._slot = array('i', bytes(4*cols))
+        self.reset()
+
+    def reset(self):
+        """
+        Brings every alien back to life in the standard starting position
+
+        The arrays are changed in place, so this allocates nothing.
+        """
+        cols = self._cols
+        rows = self._rows
+        for i in range(cols*rows):
+            self._alive[i] = 1
+        del self._shooters[:]
+        for col in range(cols):
+            self._colcount[col] = rows
+            self._lowest[col] = col*rows
+            self._slot[col] = col
+            self._shooters.append(col)
+        for row in range(rows):
+            self._rowcount[row] = cols
+        self._count = cols*rows
+        self._extents()
+        self._ox = 2 * ALIEN_H_SEP
+        self._oy = GAME_HEIGHT - (ALIEN_CEILING + (ALIEN_HEIGHT*(rows-1))+(ALIEN_V_SEP * rows))
+
+    def restore(self, alive, x, y):
+        """
+        Sets which aliens are alive and where the origin of the formation is
+
+        Parameter alive: the aliens alive, as a bitmask (bit i is alien i)
+        Precondition: alive is an int in 0..2**getSize()-1
+
+        Parameter x: the horizontal coordinate of the origin
+        Precondition: x is an int or a float
+
+        Parameter y: the vertical coordinate of the origin
+        Precondition: y is an int or a float
+        """
+        self.reset()
+        dead = ~alive & ((1 << (self._cols*self._rows))-1)
+        while dead:
+            low = dead & -dead
+            self.kill(low.bit_length()-1)
+            dead ^= low
+        self._ox = x
+        self._oy = y
+
+    def index(self, col, row):
+        """
+        Returns the index of the alien in the given column and row
+
+        Parameter col: the column
+        Precondition: col is an int in 0..getColumns()-1
+
+        Parameter row: the row (0 is the bottom row)
+        Precondition: row is an int in 0..getRows()-1
+        """
+        return col*self._rows+row
+
+    def kill(self, i):
+        """
+        Marks alien i as dead
+
+        Parameter i: the alien index
+        Precondition: i is an int in 0..getSize()-1 and alien i is alive
+        """
+        self._alive[i] = 0
+        self._count -= 1
+        col = i // self._rows
+        row = i % self._rows
+        self._colcount[col] -= 1
+        self._rowcount[row] -= 1
+        if self._colcount[col] == 0:
+            # Swap the column out of the shooters with the last one
+            last = self._shooters.pop()
+            if last != col:
+                self._shooters[self._slot[col]] = last
+                self._slot[last] = self._slot[col]
+            self._lowest[col] = -1
+        elif self._lowest[col] == i:
+            # The bottom alien only moves up, so each column is searched once
+            self._lowest[col] = self._alive.find(1, i+1, (col+1)*self._rows)
+        # An extent only changes when a column or row empties
+        if self._colcount[col] == 0 or self._rowcount[row] == 0:
+            self._extents()
+
+    def move(self, dx, dy):
+        """
+        Moves every alien by (dx,dy)
+
+        Parameter dx: the horizontal distance to move
+        Precondition: dx is an int or a float
+
+        Parameter dy: the vertical distance to move
+        Precondition: dy is an int or a float
+        """
+        self._ox += dx
+        self._oy += dy
+
+    def right(self):
+        """
+        Returns the x coordinate of the most right living alien
+
+        Precondition: at least one alien is alive
+        """
+        return self._ox + self._maxx
+
+    def left(self):
+        """
+        Returns the x coordinate of the most left living alien
+
+        Precondition: at least one alien is alive
+        """
+        return self._ox + self._minx
+
+    def bottom(self):
+        """
+        Returns the y coordinate of the lowest living alien
+
+        Precondition: at least one alien is alive
+        """
+        return self._oy + self._miny
+
+    def candidates(self, left, bottom, right, top, nearby):
+        """
+        Returns the number of living aliens that might touch a rectangle
+
+        The indices of these aliens are written to the start of nearby, so
+        that finding them allocates nothing.  Every living alien overlapping
+        the rectangle is in the result, but the result may also have aliens
+        that are just nearby, so the caller still has to check each one.
+
+        Parameter left: the left edge of the rectangle
+        Precondition: left is an int or a float
+
+        Parameter bottom: the bottom edge of the rectangle
+        Precondition: bottom is an int or a float
+
+        Parameter right: the right edge of the rectangle
+        Precondition: right is an int or a float >= left
+
+        Parameter top: the top edge of the rectangle
+        Precondition: top is an int or a float >= bottom
+
+        Parameter nearby: the buffer to write the alien indices to
+        Precondition: nearby is an array of ints at least getSize() long
+        """
+        left = left - self._ox - ALIEN_WIDTH/2
+        right = right - self._ox + ALIEN_WIDTH/2
+        bottom = bottom - self._oy - ALIEN_HEIGHT/2
+        top = top - self._oy + ALIEN_HEIGHT/2
+        hsep = ALIEN_H_SEP + ALIEN_WIDTH
+        vsep = ALIEN_V_SEP + ALIEN_HEIGHT
+        col0 = max(0, -int(-left // hsep))
+        col1 = min(self._cols-1, int(right // hsep))
+        row0 = max(0, -int(-bottom // vsep))
+        row1 = min(self._rows-1, int(top // vsep))
+        alive = self._alive
+        count = 0
+        for col in range(col0, col1+1):
+            for i in range(col*self._rows+row0, col*self._rows+row1+1):
+                if alive[i]:
+                    nearby[count] = i
+                    count += 1
+        return count
+
+    def _extents(self):
+        """
+        Recomputes the offsets of the most left, right and lowest aliens
+
+        This only looks at the column and row counts.
+        """
+        if self._count == 0:
+            self._minx = self._maxx = self._miny = None
+        else:
+            cols = [col for col in range(self._cols) if self._colcount[col] > 0]
+            row = 0
+            while self._rowcount[row] == 0:
+                row += 1
+            self._minx = self._x[self.index(cols[0], 0)]
+            self._maxx = self._x[self.index(cols[-1], 0)]
+            self._miny = self._y[row]
+
+    def shooter(self, col):
+        """
+        Returns the index of the bottom living alien in col, or None if empty
+
+        Parameter col: the column
+        Precondition: col is an int in 0..getColumns()-1
+        """
+        pos = self._lowest[col]
+        return None if pos == -1 else pos
+
+    def column(self, x):
+        """
+        Returns the column of the lattice nearest to x
+
+        Parameter x: the horizontal coordinate
+        Precondition: x is an int or a float
+        """
+        col = int(round((x-self._ox)/(ALIEN_H_SEP+ALIEN_WIDTH)))
+        return min(max(col, 0), self._cols-1)
+
+    def swapShooters(self, pos1, pos2):
+        """
+        Swaps the numbers of two non-empty columns (see getShooter)
+
+        Parameter pos1: the number of the first column
+        Precondition: pos1 is an int in 0..getShooterCount()-1
+
+        Parameter pos2: the number of the second column
+        Precondition: pos2 is an int in 0..getShooterCount()-1
+        """
+        shooters = self._shooters
+        col1 = shooters[pos1]
+        col2 = shooters[pos2]
+        shooters[pos1] = col2
+        shooters[pos2] = col1
+        self._slot[col1] = pos2
+        self._slot[col2] = pos1
+
+
+class BoltPool(object):
+    """
+    A class representing a fixed number of laser bolts as parallel arrays.
+
+    Instead of one object per bolt, the pool stores each bolt property in its
+    own array: the position (x,y) of its center, its velocity (pixels per
+    update, negative for alien bolts), and whether it came from an alien.
+    Bolt k is entry k of every array.  The active bolts are the first
+    getCount() entries, with no gaps; removing bolt k moves the last active
+    bolt into its place (so the number of a bolt can change).
+
+    All of the arrays are created with the pool, so no memory is allocated
+    during play.  If every entry is in use, the pool is full and firing does
+    nothing (the new bolt is dropped).  Bolts that leave the
+    screen are culled by the method cull, so with a reasonable capacity this
+    should not happen.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _x: the horizontal coordinate of each bolt center
+    # Invariant: _x is an array of floats with one entry per bolt in the pool
+    #
+    # Attribute _y: the vertical coordinate of each bolt center
+    # Invariant: _y is an array of floats the same length as _x
+    #
+    # Attribute _start: the vertical coordinate of each bolt before it last moved
+    # Invariant: _start is an array of floats the same length as _x; it is the
+    # same as _y for a bolt that has not moved since it was fired
+    #
+    # Attribute _velocity: the number of pixels to move each bolt per update
+    # Invariant: _velocity is an array of floats the same length as _x; it is
+    # _speed for a player bolt and -_speed for an alien bolt
+    #
+    # Attribute _enemy: whether each bolt came from an alien (1) or not (0)
+    # Invariant: _enemy is a bytearray the same length as _x
+    #
+    # Attribute _count: the number of active bolts
+    # Invariant: _count is an int in 0..len(_x); the active bolts are the
+    # first _count entries of the arrays
+    #
+    # Attribute _friendly: the number of active bolts fired by the player
+    # Invariant: _friendly is an int >= 0
+    #
+    # Attribute _speed: the number of pixels a bolt moves per update
+    # Invariant: _speed is an int or a float > 0
+
+    # GETTERS AND SETTERS
+    def getCount(self):
+        """
+        Returns the number of active bolts
+        """
+        return self._count
+
+    def getArrays(self):
+        """
+        Returns the arrays of the pool as a tuple (x, y, velocity, enemy)
+
+        These are the pool's own arrays, which change as bolts are fired,
+        moved and removed; only the first getCount() entries are bolts.  Do
+        not modify them.
+        """
+        return (self._x, self._y, self._velocity, self._enemy)
+
+    def getStarts(self):
+        """
+        Returns the array of the vertical coordinates of the bolts before the
+        last call to move
+
+        Like getArrays, this is the pool's own array.  Do not modify it.
+        """
+        return self._start
+
+    def getSpeed(self):
+        """
+        Returns the number of pixels a bolt moves per update
+        """
+        return self._speed
+
+    def getFriendly(self):
+        """
+        Returns the number of active bolts fired by the player
+        """
+        return self._friendly
+
+    def __init__(self, capacity, speed=BOLT_SPEED):
+        """
+        Initializes an empty pool.
+
+        Parameter capacity: the most bolts in the pool at once
+        Precondition: capacity is an int > 0
+
+        Parameter speed: the number of pixels a bolt moves per update
+        Precondition: speed is an int or a float > 0
+        """
+        self._speed = speed
+        self._x = array('d', bytes(8*capacity))
+        self._y = array('d', bytes(8*capacity))
+        self._start = array('d', bytes(8*capacity))
+        self._velocity = array('d', bytes(8*capacity))
+        self._enemy = bytearray(capacity)
+        self._count = 0
+        self._friendly = 0
+
+    def fire(self, x, y, isenemy):
+        """
+        Fires a bolt from (x,y), returning True (or False if the pool is full)
+
+        Parameter x: x is the horizontal coordinate of the center
+        Precondition: x is an int or a float
+
+        Parameter y: y is the vertical coordinate of the center
+        Precondition: y is an int or a float
+
+        Parameter isenemy: True if the bolt came from an alien
+        Precondition: isenemy is a bool
+        """
+        k = self._count
+        if k == len(self._x):
+            return False
+        self._x[k] = x
+        self._y[k] = y
+        self._start[k] = y
+        self._velocity[k] = -self._speed if isenemy else self._speed
+        self._enemy[k] = isenemy
+        self._count = k+1
+        if not isenemy:
+            self._friendly += 1
+        return True
+
+    def remove(self, k):
+        """
+        Removes active bolt k, moving the last active bolt into its place
+
+        Parameter k: the number of the bolt to remove
+        Precondition: k is an int in 0..getCount()-1
+        """
+        last = self._count-1
+        if not self._enemy[k]:
+            self._friendly -= 1
+        if k != last:
+            self._x[k] = self._x[last]
+            self._y[k] = self._y[last]
+            self._start[k] = self._start[last]
+            self._velocity[k] = self._velocity[last]
+            self._enemy[k] = self._enemy[last]
+        self._count = last
+
+    def clear(self):
+        """
+        Removes every active bolt
+        """
+        self._count = 0
+        self._friendly = 0
+
+    def move(self, scale=1.0):
+        """
+        Moves every active bolt by its velocity times scale
+
+        The position before the move is kept (see getStarts), so that a bolt
+        can be tested along the whole path it moved.
+
+        Parameter scale: the number of updates of SIM_STEP seconds to move
+        Precondition: scale is a float >= 0
+        """
+        ys = self._y
+        starts = self._start
+        velocity = self._velocity
+        for k in range(self._count):
+            starts[k] = ys[k]
+            ys[k] += velocity[k]*scale
+
+    def cull(self):
+        """
+        Removes every bolt that has left the screen
+
+        Player bolts are removed once they reach the top of the screen, and
+        alien bolts once they reach the bottom.
+        """
+        # Walk backwards, as removing a bolt moves the last one into its place
+        ys = self._y
+        enemy = self._enemy
+        k = self._count-1
+        while k >= 0:
+            if ys[k] <= 0 if enemy[k] else ys[k] >= GAME_HEIGHT:
+                self.remove(k)
+            k -= 1
+
+
+class ScriptedInput(object):
+    """
+    A class to drive a simulation from a script instead of the keyboard.
+
+    This class answers the same questions as GInput (is_key_down and
+    key_count), so the simulation cannot tell the difference.  The script is
+    a sequence with one entry per update; each entry is a collection of the
+    keys held down during that update (e.g. ('left','spacebar')).  Call the
+    method advance once before every update to move to the next entry.  When
+    the script runs out, no keys are held down.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _script: the remaining entries of the script
+    # Invariant: _script is an iterator over collections of key names
+    #
+    # Attribute _keys: the keys held down in the current update
+    # Invariant: _keys is a frozenset of strings
+
+    @property
+    def key_count(self):
+        """
+        The number of keys currently held down
+        """
+        return len(self._keys)
+
+    def __init__(self, script=()):
+        """
+        Initializes the input with the given script.
+
+        Parameter script: the keys held down in each update
+        Precondition: script is an iterable of collections of key names
+        """
+        self._script = iter(script)
+        self._keys = frozenset()
+
+    def is_key_down(self, key):
+        """
+        Returns True if key is held down in the current update
+
+        Parameter key: the key to check
+        Precondition: key is a string
+        """
+        return key in self._keys
+
+    def hold(self, keys):
+        """
+        Replaces the keys held down in the current update
+
+        Parameter keys: the keys to hold down
+        Precondition: keys is a collection of key names
+        """
+        self._keys = frozenset(keys)
+
+    def advance(self):
+        """
+        Moves to the next entry of the script.
+
+        This method returns False (and releases every key) if the script has
+        run out, and True otherwise.
+        """
+        try:
+            self._keys = frozenset(next(self._script))
+            return True
+        except StopIteration:
+            self._keys = frozenset()
+            return False
+
+
+class Simulation(object):
+    """
+    This class simulates a single wave of Alien Invaders without a window.
+
+    It has exactly the same rules as the subcontroller Wave: every call to
+    update moves the ship, fires and moves laser bolts, marches the aliens and
+    removes anything that was hit.  The method state reports whether the wave
+    needs to pause (the ship died), is over, or is won, using the same strings
+    as Wave.
+
+    The ship is a Body, and the aliens and bolts are arrays (a Formation and a
+    BoltPool), so a Simulation can be created and played anywhere, including
+    a test or a batch job.
+
+    A Simulation plays a whole game: when a wave is won, the method nextwave
+    starts the next (faster) one, and the method reset starts a new game.
+    Both reuse every object of the simulation instead of creating new ones.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _ship: the player ship to control
+    # Invariant: _ship is a Body object or None
+    #
+    # Attribute _aliens: the aliens in the wave
+    # Invariant: _aliens is a Formation object
+    #
+    # Attribute _bolts: the laser bolts currently on screen
+    # Invariant: _bolts is a BoltPool object
+    #
+    # Attribute _lives: the number of lives left
+    # Invariant: _lives is an int >= 0
+    #
+    # Attribute _score: the points for the aliens destroyed so far
+    # Invariant: _score is an int >= 0
+    #
+    # Attribute _fired: the number of bolts fired by the player
+    # Invariant: _fired is an int >= 0
+    #
+    # Attribute _speed: the number of seconds between alien steps
+    # Invariant: _speed is a float >= 0, equal to _basespeed divided by
+    # SPEED_FACTOR once for every wave before this one
+    #
+    # Attribute _basespeed: the number of seconds between steps in the first wave
+    # Invariant: _basespeed is a float >= 0
+    #
+    # Attribute _wave: the number of the current wave in this game
+    # Invariant: _wave is an int >= 1
+    #
+    # Attribute _body: the ship, created once and reused on every respawn
+    # Invariant: _body is a Body object; _ship is _body or None
+    #
+    # Attribute _rate: the most alien steps between alien bolts
+    # Invariant: _rate is an int >= 1
+    #
+    # Attribute _shooters: the number of aliens that fire together
+    # Invariant: _shooters is an int >= 1
+    #
+    # Attribute _aim: the chance that the alien above the ship fires
+    # Invariant: _aim is a float in 0..1
+    #
+    # Attribute _events: the timed events of the wave (steps, shots, explosion)
+    # Invariant: _events is a Scheduler object whose clock started with the wave
+    #
+    # Attribute _marches: the number of alien steps so far in this wave
+    # Invariant: _marches is an int >= 0
+    #
+    # Attribute _right: the alien direction (True = right and False = left)
+    # Invariant: _right is a bool
+    #
+    # Attribute _nextfire: the alien step on which the aliens fire next
+    # Invariant: _nextfire is an int > _marches, at most _rate steps after the
+    # last shot
+    #
+    # Attribute _frame: the frame of the ship explosion
+    # Invariant: _frame is an int in 0..SHIP_FRAMES-1; it is 0 unless the ship
+    # was hit and is exploding
+    #
+    # Attribute _seed: the seed of the random numbers of this wave
+    # Invariant: _seed is an int >= 0
+    #
+    # Attribute _random: the random numbers deciding when and where aliens fire
+    # Invariant: _random is a random.Random object seeded with _seed
+    #
+    # Attribute _state: the state of the wave (see the method state)
+    # Invariant: _state is 'pause', 'over', 'win' or None, and is updated
+    # whenever the ship dies or respawns, an alien dies or the aliens march
+    #
+    # Attribute _nearby: the aliens near the bolt being tested (see candidates)
+    # Invariant: _nearby is an array of ints as long as the formation
+    #
+    # Attribute _hits: the aliens hit by the bolt being tested (see sweepfirst)
+    # Invariant: _hits is an array of ints as long as the formation
+    #
+    # Attribute _profiler: the profiler timing the stages of each update
+    # Invariant: _profiler is a Profiler object (profiler.py), or None if
+    # profiling is off
+
+    # GETTERS AND SETTERS
+    def getShip(self):
+        """
+        Returns the player ship, or None if it was destroyed
+        """
+        return self._ship
+
+    def getAliens(self):
+        """
+        Returns the alien formation
+        """
+        return self._aliens
+
+    def getBolts(self):
+        """
+        Returns the pool of laser bolts (its active shots are on screen)
+        """
+        return self._bolts
+
+    def getLives(self):
+        """
+        Returns the number of lives left
+        """
+        return self._lives
+
+    def getSeed(self):
+        """
+        Returns the seed of the random numbers of this wave
+
+        Two simulations with the same seed and the same input play exactly
+        the same game.
+        """
+        return self._seed
+
+    def getFired(self):
+        """
+        Returns the number of bolts fired by the player
+        """
+        return self._fired
+
+    def setProfiler(self, profiler):
+        """
+        Sets the profiler timing the stages of each update
+
+        Parameter profiler: the profiler to use (None turns profiling off)
+        Precondition: profiler is a Profiler object or None
+        """
+        self._profiler = profiler
+
+    def getWave(self):
+        """
+        Returns the number of the current wave in this game (starting at 1)
+        """
+        return self._wave
+
+    def getFrame(self):
+        """
+        Returns the frame of the ship explosion (0 if the ship is not exploding)
+        """
+        return self._frame
+
+    def getTime(self):
+        """
+        Returns the seconds played in this wave
+        """
+        return self._events.getTime()
+
+    def getMarch(self):
+        """
+        Returns the march of the aliens as a tuple (steps, nextfire, right)
+
+        The value steps is the number of alien steps so far in this wave,
+        nextfire is the step on which they fire next, and right is True if
+        they are marching right.
+        """
+        return (self._marches, self._nextfire, self._right)
+
+    def getWait(self):
+        """
+        Returns the seconds until the next timed event (or infinity if none)
+
+        The timed events are the alien steps, the alien shots and the frames
+        of the ship explosion.  Until then, only the ship and bolts move.
+        """
+        return self._events.getNext()-self._events.getTime()
+
+    def getScore(self):
+        """
+        Returns the points for the aliens destroyed so far
+
+        An alien is worth ALIEN_POINTS times its row (counting from 1 at the
+        bottom).
+        """
+        return self._score
+
+    def state(self):
+        """
+        Returns the state of the wave as a string, or None if still in play
+
+        The result is 'pause' if the ship was destroyed but there are lives
+        left, 'over' if there are no lives left or an alien reached the
+        defense line, and 'win' if every alien was destroyed.
+        """
+        return self._state
+
+    def new(self):
+        """
+        Recreates the ship after it was destroyed
+        """
+        self._body.x = GAME_WIDTH//2
+        self._body.y = SHIP_BOTTOM+SHIP_HEIGHT//2
+        self._ship = self._body
+        self._frame = 0
+        self._updatestate()
+
+    def reset(self, seed=None):
+        """
+        Starts a new game in place, with a full formation and all lives
+
+        Nothing is created: the formation, bolt pool, ship and random number
+        generator of this simulation are reused.  With the same seed, the
+        game is exactly the one a new Simulation would play.
+
+        Parameter seed: the seed of the random numbers (None picks one)
+        Precondition: seed is an int >= 0 or None
+        """
+        if seed is None:
+            seed = random.randrange(2**32)
+        self._seed = seed
+        self._random.seed(seed)
+        self._lives = SHIP_LIVES
+        self._score = 0
+        self._fired = 0
+        self._wave = 1
+        self._speed = self._basespeed
+        self._startwave()
+
+    def restore(self, snapshot):
+        """
+        Puts the wave in the state of a snapshot (see snapshot.py)
+
+        Everything shown on screen, the counters and the clock of the timed
+        events come from the snapshot.  The random numbers are not part of a
+        snapshot, so the aliens pick different shooters from then on than
+        they did in the game it came from, and an exploding ship starts the
+        current frame over.
+
+        Parameter snapshot: the snapshot to restore
+        Precondition: snapshot is a Snapshot of a formation of the same size
+        """
+        self._wave = snapshot.getWave()
+        self._lives = snapshot.getLives()
+        self._score = snapshot.getScore()
+        self._speed = self._basespeed
+        for wave in range(1, self._wave):
+            self._speed = self._speed/SPEED_FACTOR
+        ox, oy = snapshot.getOrigin()
+        self._aliens.restore(snapshot.getAlive(), ox, oy)
+        self._bolts.clear()
+        xs, ys, enemy = snapshot.getBolts()
+        for k in range(len(xs)):
+            self._bolts.fire(xs[k], ys[k], enemy[k] == 1)
+        self._marches, self._nextfire, self._right = snapshot.getMarch()
+        self._events.clear()
+        self._events.advance(snapshot.getTime())
+        self._events.at(self._marchtime(self._marches+1), self._march)
+        self._events.at(self._marchtime(self._nextfire), self._fire, 1)
+        x = snapshot.getShip()
+        self._frame = snapshot.getFrame()
+        if x is None:
+            self._ship = None
+        else:
+            self._body.x = x
+            self._body.y = SHIP_BOTTOM+SHIP_HEIGHT//2
+            self._ship = self._body
+            if self._frame > 0:
+                self._events.after(DEATH_SPEED/(SHIP_FRAMES-1), self._blowup, 2)
+        self._updatestate()
+
+    def nextwave(self):
+        """
+        Starts the next wave of this game in place, after a wave was won
+
+        The lives and score carry over, and the aliens step SPEED_FACTOR
+        times more often than in the previous wave.  The random numbers carry
+        on from the previous wave, so a whole game stays deterministic.
+        """
+        self._wave += 1
+        self._speed = self._speed/SPEED_FACTOR
+        self._startwave()
+
+    # INITIALIZER TO CREATE SHIP AND ALIENS
+    def __init__(self, seed=None, rows=ALIEN_ROWS, cols=ALIENS_IN_ROW,
+                 speed=ALIEN_SPEED, rate=BOLT_RATE, boltspeed=BOLT_SPEED,
+                 capacity=BOLT_CAPACITY, shooters=ALIEN_SHOOTERS, aim=ALIEN_AIM):
+        """
+        Initializes the simulation with a full formation and a new ship
+
+        The remaining parameters default to the constants in consts.py; they
+        can be changed to try out other settings (see balance.py).
+
+        Parameter seed: the seed of the random numbers (None picks one)
+        Precondition: seed is an int >= 0 or None
+
+        Parameter rows: the number of rows of aliens
+        Precondition: rows is an int > 0
+
+        Parameter cols: the number of aliens per row
+        Precondition: cols is an int > 0
+
+        Parameter speed: the number of seconds between alien steps
+        Precondition: speed is a float >= 0
+
+        Parameter rate: the most alien steps between alien bolts
+        Precondition: rate is an int >= 1
+
+        Parameter boltspeed: the number of pixels a bolt moves per update
+        Precondition: boltspeed is an int or a float > 0
+
+        Parameter capacity: the most laser bolts on screen at once
+        Precondition: capacity is an int > 0
+
+        Parameter shooters: the number of aliens that fire together
+        Precondition: shooters is an int >= 1
+
+        Parameter aim: the chance that the alien above the ship is one of them
+        Precondition: aim is a float in 0..1
+        """
+        self._random = random.Random()
+        self._aliens = Formation(cols, rows)
+        self._nearby = array('i', bytes(4*rows*cols))
+        self._hits = array('i', bytes(4*rows*cols))
+        self._body = Body(0, 0, SHIP_WIDTH, SHIP_HEIGHT)
+        self._basespeed = speed
+        self._rate = rate
+        self._shooters = shooters
+        self._aim = aim
+        self._bolts = BoltPool(capacity, boltspeed)
+        self._events = Scheduler()
+        self._profiler = None
+        self.reset(seed)
+
+    # UPDATE METHOD TO MOVE THE SHIP, ALIENS, AND LASER BOLTS
+    def update(self, input, dt):
+        """
+        Animates a single update of the wave.
+
+        The alien steps, alien shots and explosion frames that are due by the
+        end of the update are run (see the class Scheduler), so a long update
+        can have several of them.  If there is a profiler (see setProfiler),
+        each stage of the update is lapped on it.
+
+        Parameter input: the player input, used to control the ship
+        Precondition: input is a GInput or a ScriptedInput
+
+        Parameter dt: The time in seconds since last update
+        Precondition: dt is a number (int or float)
+        """
+        profiler = self._profiler
+        self._boltmovement(dt)
+        if profiler is not None:
+            profiler.lap('boltmovement')
+        if self._ship is not None and self._frame == 0:
+            self._shipmovement(input, dt)
+            if profiler is not None:
+                profiler.lap('ship')
+            self._fireship(input)
+            if profiler is not None:
+                profiler.lap('fireship')
+        self._events.advance(dt)
+        if profiler is not None:
+            profiler.lap('events')
+
+    # HELPER METHODS
+    def _startwave(self):
+        """
+        Puts the aliens, ship and bolts back in their starting positions
+        """
+        self._aliens.reset()
+        self._bolts.clear()
+        self._events.clear()
+        self._marches = 0
+        self._right = True
+        self._nextfire = self._random.randint(1, self._rate)
+        self._events.at(self._marchtime(1), self._march)
+        self._events.at(self._marchtime(self._nextfire), self._fire, 1)
+        self.new()
+
+    def _updatestate(self):
+        """
+        Recomputes the state of the wave from the ship, lives and aliens
+        """
+        if self._ship is None:
+            self._state = 'pause' if self._lives > 0 else 'over'
+        elif self._aliens.getCount() == 0:
+            self._state = 'win'
+        elif self._aliens.bottom() <= DEFENSE_LINE:
+            self._state = 'over'
+        else:
+            self._state = None
+
+    def _shipmovement(self, input, dt):
+        """
+        Moves the ship, keeping it on screen
+
+        The ship moves SHIP_MOVEMENT pixels for every SIM_STEP seconds, and
+        stops at the edges of the window, so it ends in the same place however
+        long the updates are.
+
+        Parameter input: the player input, used to control the ship
+        Precondition: input is a GInput or a ScriptedInput
+
+        Parameter dt: The time in seconds since last update
+        Precondition: dt is a number (int or float)
+        """
+        ship = self._ship
+        if input.is_key_down('right'):
+            ship.x += SHIP_MOVEMENT*dt/SIM_STEP
+        if input.is_key_down('left'):
+            ship.x -= SHIP_MOVEMENT*dt/SIM_STEP
+        if ship.x > GAME_WIDTH - SHIP_WIDTH//2:
+            ship.x = GAME_WIDTH - SHIP_WIDTH//2
+        elif ship.x < SHIP_WIDTH//2:
+            ship.x = SHIP_WIDTH//2
+
+    def _marchtime(self, step):
+        """
+        Returns the time in the wave at which the aliens take the given step
+
+        The steps are _speed seconds apart, but never less than SIM_STEP, so
+        that the aliens take at most one step per update even at speed 0.
+        Every event of a step is scheduled with this time, so they are all due
+        at exactly the same time.
+
+        Parameter step: the number of the step (the first is 1)
+        Precondition: step is an int >= 1
+        """
+        return step*max(self._speed, SIM_STEP)
+
+    def _march(self):
+        """
+        Marches the aliens one step and schedules the next step
+
+        This is a timed event of _events.
+        """
+        self._marches += 1
+        self._alienmovement()
+        self._events.at(self._marchtime(self._marches+1), self._march)
+
+    def _fire(self):
+        """
+        Makes the aliens fire and schedules their next shot
+
+        This is a timed event of _events, due at the same time as an alien
+        step but run after it.  The next shot is a random number of steps
+        (between 1 and _rate) later.  Once every alien is dead, the aliens
+        stop firing.
+        """
+        if self._aliens.getShooterCount() != 0:
+            self._firealien()
+            self._nextfire = self._marches+self._random.randint(1, self._rate)
+            self._events.at(self._marchtime(self._nextfire), self._fire, 1)
+
+    def _blowup(self):
+        """
+        Shows the next frame of the ship explosion, or removes the ship
+
+        This is a timed event of _events.  The frames are DEATH_SPEED seconds
+        apart in total; after the last one the ship is destroyed, which
+        pauses the wave (or ends it if there are no lives left).
+        """
+        if self._frame < SHIP_FRAMES-1:
+            self._frame += 1
+            self._events.after(DEATH_SPEED/(SHIP_FRAMES-1), self._blowup, 2)
+        else:
+            self._ship = None
+            self._frame = 0
+            self._updatestate()
+
+    def _alienmovement(self):
+        """
+        Marches the aliens one step sideways, or down at the edge of the screen
+        """
+        if self._aliens.getCount() > 0:
+            if self._right:
+                if self._aliens.right() + ALIEN_H_WALK < GAME_WIDTH - ALIEN_WIDTH/2:
+                    self._aliens.move(ALIEN_H_WALK, 0)
+                else:
+                    self._aliens.move(0, -ALIEN_V_WALK)
+                    self._right = False
+            else:
+                if self._aliens.left() - ALIEN_H_WALK > ALIEN_WIDTH/2:
+                    self._aliens.move(-ALIEN_H_WALK, 0)
+                else:
+                    self._aliens.move(0, -ALIEN_V_WALK)
+                    self._right = True
+            self._updatestate()
+
+    def _boltmovement(self, dt):
+        """
+        Moves every laser bolt by its velocity for every SIM_STEP seconds
+
+        Every bolt is tested for hits along the path it moved (see
+        _hitdetection) before the bolts that left the screen are removed, as
+        they could have passed through a target on the way out.
+
+        Parameter dt: The time in seconds since last update
+        Precondition: dt is a number (int or float)
+        """
+        self._bolts.move(dt/SIM_STEP)
+        self._hitdetection()
+        self._bolts.cull()
+
+    def _fireship(self, input):
+        """
+        Fires a player bolt if spacebar is down and none is on screen
+
+        Parameter input: the player input, used to control the ship
+        Precondition: input is a GInput or a ScriptedInput
+        """
+        if input.is_key_down('spacebar') and self._bolts.getFriendly() == 0:
+            if self._bolts.fire(self._ship.x, SHIP_BOTTOM+SHIP_HEIGHT, False):
+                self._fired += 1
+
+    def _firealien(self):
+        """
+        Makes the bottom aliens of _shooters random columns fire a bolt each.
+        When they fire is decided by the timed event _fire.
+
+        With chance _aim, one of the bolts is fired by the bottom alien of the
+        column above the ship (if that column is not empty).  The formation
+        keeps the bottom alien of every column, so no column is searched.
+
+        The columns are picked by a partial shuffle of the numbers of the
+        non-empty columns: the column numbered pos fires after it is swapped
+        with a random one from pos up.  So no column fires twice, and no list
+        of columns is built.  The aimed column is swapped to number 0 first,
+        so that the random picks skip it.
+        """
+        aliens = self._aliens
+        count = aliens.getShooterCount()
+        if count != 0:
+            volley = min(self._shooters, count)
+            first = 0
+            if self._aim > 0 and self._ship is not None and self._random.random() < self._aim:
+                col = aliens.column(self._ship.x)
+                if aliens.shooter(col) is not None:
+                    aliens.swapShooters(0, aliens.getShooterPos(col))
+                    first = 1
+            for pos in range(volley):
+                if pos >= first:
+                    aliens.swapShooters(pos, self._random.randint(pos, count-1))
+                self._fireshooter(aliens.getShooter(pos))
+
+    def _fireshooter(self, shooter):
+        """
+        Fires an alien bolt from the given alien
+
+        Parameter shooter: the alien index
+        Precondition: shooter is a living alien of _aliens
+        """
+        self._bolts.fire(self._aliens.getX(shooter), self._aliens.getY(shooter), True)
+
+    def _hitdetection(self):
+        """
+        Removes the ship or any alien hit by a bolt (and the bolt itself)
+
+        Each bolt is swept along the path it just moved, so even a long update
+        cannot make it pass through a target.  The bolts are tested as soon
+        as they move, before the ship and the aliens move, so the targets are
+        where they were when the bolts moved.  A bolt hits a target that it
+        touched anywhere on its path (edges included), including where it
+        started: a target that moved onto a bolt between two updates is hit
+        by it.  A player bolt destroys the first alien it hit (all of them,
+        if several are first).  Only alien bolts hit the ship, and only
+        player bolts hit aliens.  A ship that is hit loses a life and starts
+        to explode (see _blowup); it cannot be hit again while it explodes.
+        """
+        pool = self._bolts
+        xs, ys, velocity, enemy = pool.getArrays()
+        starts = pool.getStarts()
+        aliens = self._aliens
+        offx, offy = aliens.getOffsets()
+        nearby = self._nearby
+        hits = self._hits
+        # Walk backwards, as removing a bolt moves the last one into its place
+        k = pool.getCount()-1
+        while k >= 0:
+            x = xs[k]
+            y = starts[k]
+            dy = ys[k]-y
+            if enemy[k]:
+                ship = self._ship
+                if (ship is not None and self._frame == 0 and
+                    sweep(x, y, 0, dy, SHIP_REACH_X, SHIP_REACH_Y, ship.x, ship.y) is not None):
+                    pool.remove(k)
+                    self._lives -= 1
+                    self._blowup()
+            else:
+                count = aliens.candidates(x-BOLT_HALF_WIDTH, min(y, y+dy)-BOLT_HALF_HEIGHT,
+                                          x+BOLT_HALF_WIDTH, max(y, y+dy)+BOLT_HALF_HEIGHT, nearby)
+                ox, oy = aliens.getOrigin()
+                count = sweepfirst(x, y, dy, ALIEN_REACH_X, ALIEN_REACH_Y,
+                                   offx, offy, ox, oy, nearby, count, hits)
+                if count > 0:
+                    for pos in range(count):
+                        i = hits[pos]
+                        aliens.kill(i)
+                        self._score += ALIEN_POINTS*(i % aliens.getRows()+1)
+                    pool.remove(k)
+                    self._updatestate()
+            k -= 1
+
+
+def play(sim, input, maxupdates, dt=SIM_STEP, jump=False):
+    """
+    Plays a simulation until the wave is over, won, or maxupdates have passed
+
+    The ship is recreated immediately whenever it is destroyed, just as if the
+    player pressed 's' on the pause screen.  The function returns a tuple
+    (state, updates), where state is the result of sim.state() ('over', 'win',
+    or None if the time ran out), and updates is the number of updates played.
+
+    If jump is True, an update in which no key is held and no bolt is on
+    screen lasts until the next timed event (see getWait), as nothing can
+    happen before it.  Such an update still counts as one update.
+
+    Parameter sim: the simulation to play
+    Precondition: sim is a Simulation object
+
+    Parameter input: the scripted player input
+    Precondition: input is a ScriptedInput
+
+    Parameter maxupdates: the maximum number of updates to play
+    Precondition: maxupdates is an int >= 0
+
+    Parameter dt: the time in seconds of a single update
+    Precondition: dt is a number > 0
+
+    Parameter jump: whether to jump to the next timed event when nothing moves
+    Precondition: jump is a bool
+    """
+    updates = 0
+    state = sim.state()
+    while updates < maxupdates and state not in ('over', 'win'):
+        if state == 'pause':
+            sim.new()
+        input.advance()
+        step = dt
+        if jump and input.key_count == 0 and sim.getBolts().getCount() == 0:
+            wait = sim.getWait()
+            if dt < wait < float('inf'):
+                step = wait
+        sim.update(input, step)
+        updates += 1
+        state = sim.state()
+    return (state, updates)
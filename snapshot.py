@@ -0,0 +1,663 @@
+"""
+Snapshot module for Alien Invaders
+
+This module contains a compact binary form of the state of a wave, so that a
+spectator or logger can follow a whole game and reconstruct any frame of it.
+
+A Snapshot is the state of a Simulation at one moment, in fixed-layout values:
+the counters (wave, lives, score, state, explosion frame, alien steps and the
+step of the next shot), the clock, the ship position, the formation origin, a
+bitmask of the living aliens, and the bolt arrays.  Positions are stored as
+4-byte floats, which holds the positions of the standard game exactly.
+
+A snapshot can be encoded in full (a keyframe), or as a delta against the
+previous one.  A delta only has the parts that differ from what the previous
+snapshot predicts: the clock moves one tick, every bolt moves by its velocity,
+and nothing else changes.  Most ticks nothing else happens, so most deltas are
+a single byte (after its length); a moving ship adds 4 bytes, a dead alien 2 or 3, and a new bolt
+10 or so.
+
+A Stream encodes a Simulation tick by tick, as a header followed by records: a
+keyframe first, then deltas, with a new keyframe every SNAPSHOT_KEYFRAME ticks.
+A Reader decodes the records back into snapshots, and Simulation.restore puts
+a simulation in the state of one.  Every record starts with its length (as a
+varint), so the records can be written one after another to a file or socket.
+All numbers are little-endian.
+
+    header      b'INVS', version (1 byte), columns and rows (2 bytes each),
+                pixels a bolt moves per tick (4) and seconds per tick (8)
+    keyframe    KEYFRAME, counters, clock (8), ship x (4, NaN if none),
+                origin (4+4), alive bitmask, bolt count (2), bolt x's (4 each),
+                bolt y's (4 each), enemy bitmask of the bolts
+    delta       flags (1 byte), then each part whose flag is set, in this
+                order: counters, clock (8), ship x (4), origin (4+4), the
+                aliens that died or came back (count and index gaps, varints),
+                and the bolts (count, number changed, and for each changed
+                bolt its position in the pool (varints), x, y (4 each) and
+                whether it is an alien bolt (1))
+
+Paliska Bradley, bp355 and Philip Coppolino, pcc78
+"""
+from consts import *
+from array import array
+import math
+import struct
+
+# PRIMARY RULE: This module may only access consts.py.  It reads a Simulation
+# through its getters, so it does not need to import it.
+
+# The first bytes of a stream
+MAGIC = b'INVS'
+# The version of the stream format
+VERSION = 1
+# The layout of the header, after MAGIC
+HEADER = '<BHHfd'
+# The layout of the counters: wave, lives, state, frame, right, score, steps, next shot
+COUNTERS = '<HBBBBIII'
+# The states of a wave, by their number in the counters
+STATES = (None, 'pause', 'over', 'win')
+
+# The flags of a delta (KEYFRAME marks a keyframe instead)
+COUNTERS_CHANGED = 1
+CLOCK_CHANGED = 2
+SHIP_CHANGED = 4
+ORIGIN_CHANGED = 8
+ALIENS_CHANGED = 16
+BOLTS_CHANGED = 32
+KEYFRAME = 128
+
+# Maps the bytes of an alive array (0 or 1) to the digits of a binary number
+BINARY = bytes.maketrans(b'\x00\x01', b'01')
+
+
+def single(value):
+    """
+    Returns value rounded to the nearest 4-byte float
+
+    Parameter value: the number to round
+    Precondition: value is an int or a float
+    """
+    return struct.unpack('<f', struct.pack('<f', value))[0]
+
+
+def putvarint(data, value):
+    """
+    Appends a number to data as a varint (7 bits per byte, low bits first)
+
+    Parameter data: the bytes to append to
+    Precondition: data is a bytearray
+
+    Parameter value: the number to append
+    Precondition: value is an int >= 0
+    """
+    while value >= 0x80:
+        data.append((value & 0x7f) | 0x80)
+        value >>= 7
+    data.append(value)
+
+
+def getvarint(data, pos):
+    """
+    Returns the varint at position pos of data, and the position after it
+
+    Parameter data: the bytes to read
+    Precondition: data is a bytes-like object with a varint at pos
+
+    Parameter pos: the position of the varint
+    Precondition: pos is an int >= 0
+    """
+    value = 0
+    shift = 0
+    while data[pos] & 0x80:
+        value |= (data[pos] & 0x7f) << shift
+        shift += 7
+        pos += 1
+    return (value | (data[pos] << shift), pos+1)
+
+
+class Snapshot(object):
+    """
+    A class representing the state of a wave at one moment.
+
+    A snapshot is never changed once made.  The getters return what
+    Simulation.restore needs; the bolt arrays are the snapshot's own, so do
+    not modify them.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _cols: the number of columns of the formation
+    # Invariant: _cols is an int > 0
+    #
+    # Attribute _rows: the number of rows of the formation
+    # Invariant: _rows is an int > 0
+    #
+    # Attribute _counters: the wave, lives, state, frame, right, score, steps
+    # and next shot, as stored in COUNTERS
+    # Invariant: _counters is a tuple of 8 ints; the state is a position in
+    # STATES, and right is 1 or 0
+    #
+    # Attribute _time: the seconds played in the wave
+    # Invariant: _time is a float >= 0
+    #
+    # Attribute _ship: the horizontal coordinate of the ship
+    # Invariant: _ship is a 4-byte float, or NaN if there is no ship
+    #
+    # Attribute _origin: the origin of the formation
+    # Invariant: _origin is a tuple of two 4-byte floats
+    #
+    # Attribute _alive: the aliens alive (bit i is alien i)
+    # Invariant: _alive is an int in 0..2**(_cols*_rows)-1
+    #
+    # Attribute _count: the number of aliens alive
+    # Invariant: _count is the number of 1 bits of _alive
+    #
+    # Attribute _xs: the horizontal coordinate of each bolt
+    # Invariant: _xs is an array('f')
+    #
+    # Attribute _ys: the vertical coordinate of each bolt
+    # Invariant: _ys is an array('f') the same length as _xs
+    #
+    # Attribute _enemy: whether each bolt was fired by an alien (1) or not (0)
+    # Invariant: _enemy is a bytearray the same length as _xs
+
+    # GETTERS AND SETTERS
+    def getSize(self):
+        """
+        Returns the size of the formation as a tuple (cols, rows)
+        """
+        return (self._cols, self._rows)
+
+    def getWave(self):
+        """
+        Returns the number of the wave
+        """
+        return self._counters[0]
+
+    def getLives(self):
+        """
+        Returns the number of lives left
+        """
+        return self._counters[1]
+
+    def getState(self):
+        """
+        Returns the state of the wave ('pause', 'over', 'win' or None)
+        """
+        return STATES[self._counters[2]]
+
+    def getFrame(self):
+        """
+        Returns the frame of the ship explosion (0 if the ship is not exploding)
+        """
+        return self._counters[3]
+
+    def getScore(self):
+        """
+        Returns the points for the aliens destroyed so far
+        """
+        return self._counters[5]
+
+    def getMarch(self):
+        """
+        Returns the march of the aliens as a tuple (steps, nextfire, right)
+
+        See the method getMarch in Simulation.
+        """
+        return (self._counters[6], self._counters[7], self._counters[4] == 1)
+
+    def getTime(self):
+        """
+        Returns the seconds played in the wave
+        """
+        return self._time
+
+    def getShip(self):
+        """
+        Returns the horizontal coordinate of the ship (None if there is none)
+        """
+        return None if math.isnan(self._ship) else self._ship
+
+    def getOrigin(self):
+        """
+        Returns the origin of the formation as a tuple (x,y)
+        """
+        return self._origin
+
+    def getAlive(self):
+        """
+        Returns the aliens alive, as a bitmask (bit i is alien i)
+        """
+        return self._alive
+
+    def isAlive(self, i):
+        """
+        Returns True if alien i is alive
+
+        Parameter i: the alien index
+        Precondition: i is an int in 0..cols*rows-1
+        """
+        return (self._alive >> i) & 1 == 1
+
+    def getBolts(self):
+        """
+        Returns the bolts as a tuple (xs, ys, enemy) of arrays
+        """
+        return (self._xs, self._ys, self._enemy)
+
+    def __init__(self, sim=None, previous=None):
+        """
+        Initializes a snapshot of a simulation (or an empty one)
+
+        An empty snapshot is only filled in by the functions of this module.
+        If a previous snapshot of the same simulation is given and no alien
+        died or came back since, its bitmask of the aliens is reused instead
+        of being computed again.
+
+        Parameter sim: the simulation to take a snapshot of
+        Precondition: sim is a Simulation object or None
+
+        Parameter previous: the previous snapshot of sim
+        Precondition: previous is a Snapshot object or None
+        """
+        if sim is None:
+            return
+        aliens = sim.getAliens()
+        self._cols = aliens.getColumns()
+        self._rows = aliens.getRows()
+        ship = sim.getShip()
+        steps, nextfire, right = sim.getMarch()
+        self._counters = (sim.getWave(), sim.getLives(), STATES.index(sim.state()),
+                          sim.getFrame(), int(right), sim.getScore(), steps, nextfire)
+        self._time = sim.getTime()
+        self._ship = math.nan if ship is None else single(ship.x)
+        ox, oy = aliens.getOrigin()
+        self._origin = (single(ox), single(oy))
+        if previous is not None and previous._count == aliens.getCount():
+            self._alive = previous._alive
+        else:
+            self._alive = int(aliens.getAlive().translate(BINARY)[::-1] or b'0', 2)
+        self._count = aliens.getCount()
+        pool = sim.getBolts()
+        xs, ys, velocity, enemy = pool.getArrays()
+        count = pool.getCount()
+        self._xs = array('f', xs[:count])
+        self._ys = array('f', ys[:count])
+        self._enemy = bytearray(enemy[:count])
+
+    def encode(self):
+        """
+        Returns this snapshot encoded as a keyframe
+        """
+        data = bytearray((KEYFRAME,))
+        data += struct.pack(COUNTERS, *self._counters)
+        data += struct.pack('<dfff', self._time, self._ship, *self._origin)
+        data += self._alive.to_bytes((self._cols*self._rows+7)//8, 'little')
+        data += struct.pack('<H', len(self._xs))
+        data += self._xs.tobytes()
+        data += self._ys.tobytes()
+        data += self._bits(self._enemy)
+        return bytes(data)
+
+    def diff(self, previous, step, tick):
+        """
+        Returns this snapshot encoded as a delta against the previous one
+
+        Parameter previous: the snapshot of the previous tick
+        Precondition: previous is a Snapshot of the same formation size
+
+        Parameter step: the pixels a bolt moves per tick
+        Precondition: step is a float > 0
+
+        Parameter tick: the seconds per tick
+        Precondition: tick is a float > 0
+        """
+        flags = 0
+        data = bytearray((0,))
+        if self._counters != previous._counters:
+            flags |= COUNTERS_CHANGED
+            data += struct.pack(COUNTERS, *self._counters)
+        if self._time != previous._time+tick:
+            flags |= CLOCK_CHANGED
+            data += struct.pack('<d', self._time)
+        if not (self._ship == previous._ship or
+                math.isnan(self._ship) and math.isnan(previous._ship)):
+            flags |= SHIP_CHANGED
+            data += struct.pack('<f', self._ship)
+        if self._origin != previous._origin:
+            flags |= ORIGIN_CHANGED
+            data += struct.pack('<ff', *self._origin)
+        if self._alive != previous._alive:
+            flags |= ALIENS_CHANGED
+            changed = self._alive ^ previous._alive
+            putvarint(data, bin(changed).count('1'))
+            last = 0
+            while changed:
+                low = changed & -changed
+                i = low.bit_length()-1
+                putvarint(data, i-last)
+                last = i
+                changed ^= low
+        predicted = previous._predict(step)
+        count = len(self._xs)
+        slots = [k for k in range(count) if k >= len(predicted._xs) or
+                 self._xs[k] != predicted._xs[k] or self._ys[k] != predicted._ys[k] or
+                 self._enemy[k] != predicted._enemy[k]]
+        if slots or count != len(predicted._xs):
+            flags |= BOLTS_CHANGED
+            putvarint(data, count)
+            putvarint(data, len(slots))
+            for k in slots:
+                putvarint(data, k)
+                data += struct.pack('<ffB', self._xs[k], self._ys[k], self._enemy[k])
+        data[0] = flags
+        return bytes(data)
+
+    # HELPER METHODS
+    def _copy(self):
+        """
+        Returns a new snapshot with the same values as this one
+        """
+        result = Snapshot()
+        result._cols = self._cols
+        result._rows = self._rows
+        result._counters = self._counters
+        result._time = self._time
+        result._ship = self._ship
+        result._origin = self._origin
+        result._alive = self._alive
+        result._count = self._count
+        result._xs = array('f', self._xs)
+        result._ys = array('f', self._ys)
+        result._enemy = bytearray(self._enemy)
+        return result
+
+    def _predict(self, step):
+        """
+        Returns a copy of this snapshot with every bolt moved one tick
+
+        Parameter step: the pixels a bolt moves per tick
+        Precondition: step is a float > 0
+        """
+        result = self._copy()
+        ys = result._ys
+        enemy = result._enemy
+        for k in range(len(ys)):
+            ys[k] = ys[k]-step if enemy[k] else ys[k]+step
+        return result
+
+    def _bits(self, flags):
+        """
+        Returns a bytearray of 0s and 1s packed into a little-endian bitmask
+
+        Parameter flags: the values to pack
+        Precondition: flags is a bytearray of 0s and 1s
+        """
+        value = int(flags.translate(BINARY)[::-1] or b'0', 2)
+        return value.to_bytes((len(flags)+7)//8, 'little')
+
+
+def decode(data, cols, rows):
+    """
+    Returns the snapshot encoded in a keyframe
+
+    Parameter data: the keyframe (without its length)
+    Precondition: data is a bytes-like object made by Snapshot.encode
+
+    Parameter cols: the number of columns of the formation
+    Precondition: cols is an int > 0
+
+    Parameter rows: the number of rows of the formation
+    Precondition: rows is an int > 0
+    """
+    result = Snapshot()
+    result._cols = cols
+    result._rows = rows
+    pos = 1
+    result._counters = struct.unpack_from(COUNTERS, data, pos)
+    pos += struct.calcsize(COUNTERS)
+    result._time, result._ship, ox, oy = struct.unpack_from('<dfff', data, pos)
+    result._origin = (ox, oy)
+    pos += struct.calcsize('<dfff')
+    size = (cols*rows+7)//8
+    result._alive = int.from_bytes(data[pos:pos+size], 'little')
+    result._count = bin(result._alive).count('1')
+    pos += size
+    count = struct.unpack_from('<H', data, pos)[0]
+    pos += 2
+    result._xs = array('f', data[pos:pos+4*count])
+    pos += 4*count
+    result._ys = array('f', data[pos:pos+4*count])
+    pos += 4*count
+    bits = int.from_bytes(data[pos:pos+(count+7)//8], 'little')
+    result._enemy = bytearray((bits >> k) & 1 for k in range(count))
+    return result
+
+
+def patch(previous, data, step, tick):
+    """
+    Returns the snapshot encoded in a delta against the previous snapshot
+
+    Parameter previous: the snapshot of the previous tick
+    Precondition: previous is a Snapshot object
+
+    Parameter data: the delta (without its length)
+    Precondition: data is a bytes-like object made by Snapshot.diff
+
+    Parameter step: the pixels a bolt moves per tick
+    Precondition: step is a float > 0
+
+    Parameter tick: the seconds per tick
+    Precondition: tick is a float > 0
+    """
+    result = previous._predict(step)
+    result._time = previous._time+tick
+    flags = data[0]
+    pos = 1
+    if flags & COUNTERS_CHANGED:
+        result._counters = struct.unpack_from(COUNTERS, data, pos)
+        pos += struct.calcsize(COUNTERS)
+    if flags & CLOCK_CHANGED:
+        result._time = struct.unpack_from('<d', data, pos)[0]
+        pos += 8
+    if flags & SHIP_CHANGED:
+        result._ship = struct.unpack_from('<f', data, pos)[0]
+        pos += 4
+    if flags & ORIGIN_CHANGED:
+        result._origin = struct.unpack_from('<ff', data, pos)
+        pos += 8
+    if flags & ALIENS_CHANGED:
+        count, pos = getvarint(data, pos)
+        i = 0
+        for n in range(count):
+            gap, pos = getvarint(data, pos)
+            i += gap
+            result._alive ^= 1 << i
+        result._count = bin(result._alive).count('1')
+    if flags & BOLTS_CHANGED:
+        count, pos = getvarint(data, pos)
+        changed, pos = getvarint(data, pos)
+        for arr in (result._xs, result._ys):
+            del arr[count:]
+            arr.extend([0.0]*(count-len(arr)))
+        del result._enemy[count:]
+        result._enemy.extend(bytes(count-len(result._enemy)))
+        for n in range(changed):
+            k, pos = getvarint(data, pos)
+            result._xs[k], result._ys[k], result._enemy[k] = struct.unpack_from('<ffB', data, pos)
+            pos += 9
+    return result
+
+
+class Stream(object):
+    """
+    A class to encode a simulation tick by tick.
+
+    Call the method tick once after every update of the simulation.  The first
+    call returns the header and a keyframe, and later calls a delta (or a
+    keyframe every SNAPSHOT_KEYFRAME ticks), each as a record starting with
+    its length.  Every update must last the same number of seconds (tick),
+    or the deltas get larger.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _sim: the simulation being encoded
+    # Invariant: _sim is a Simulation object
+    #
+    # Attribute _last: the snapshot of the last tick
+    # Invariant: _last is a Snapshot, or None before the first tick
+    #
+    # Attribute _ticks: the number of ticks encoded
+    # Invariant: _ticks is an int >= 0
+    #
+    # Attribute _keyframe: the number of ticks between keyframes
+    # Invariant: _keyframe is an int > 0
+    #
+    # Attribute _step: the pixels a bolt moves per tick
+    # Invariant: _step is a 4-byte float > 0
+    #
+    # Attribute _tick: the seconds per tick
+    # Invariant: _tick is a float > 0
+    #
+    # Attribute _bytes: the number of bytes returned so far
+    # Invariant: _bytes is an int >= 0
+
+    # GETTERS AND SETTERS
+    def getTicks(self):
+        """
+        Returns the number of ticks encoded so far
+        """
+        return self._ticks
+
+    def getBytes(self):
+        """
+        Returns the number of bytes encoded so far (header included)
+        """
+        return self._bytes
+
+    def __init__(self, sim, keyframe=SNAPSHOT_KEYFRAME, tick=SIM_STEP):
+        """
+        Initializes a stream of a simulation.
+
+        Parameter sim: the simulation to encode
+        Precondition: sim is a Simulation object
+
+        Parameter keyframe: the number of ticks between keyframes
+        Precondition: keyframe is an int > 0
+
+        Parameter tick: the seconds per update of sim
+        Precondition: tick is a float > 0
+        """
+        self._sim = sim
+        self._last = None
+        self._ticks = 0
+        self._keyframe = keyframe
+        self._step = single(sim.getBolts().getSpeed()*tick/SIM_STEP)
+        self._tick = tick
+        self._bytes = 0
+
+    def tick(self):
+        """
+        Returns the records of the state of the simulation in this tick
+        """
+        data = bytearray()
+        snapshot = Snapshot(self._sim, self._last)
+        if self._last is None:
+            cols, rows = snapshot.getSize()
+            header = MAGIC+struct.pack(HEADER, VERSION, cols, rows, self._step, self._tick)
+            putvarint(data, len(header))
+            data += header
+        if self._last is None or self._ticks % self._keyframe == 0:
+            record = snapshot.encode()
+        else:
+            record = snapshot.diff(self._last, self._step, self._tick)
+        putvarint(data, len(record))
+        data += record
+        self._last = snapshot
+        self._ticks += 1
+        self._bytes += len(data)
+        return bytes(data)
+
+
+class Reader(object):
+    """
+    A class to decode the records of a Stream back into snapshots.
+
+    Bytes can be fed in pieces of any size (as they arrive from a socket or
+    file); the method feed returns the snapshots of the records completed by
+    each piece.  Deltas before the first keyframe are skipped, so a reader
+    can start in the middle of a stream, once it has the header.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _buffer: the bytes of the record not complete yet
+    # Invariant: _buffer is a bytearray
+    #
+    # Attribute _size: the columns and rows of the formation
+    # Invariant: _size is a tuple of two ints > 0, or None before the header
+    #
+    # Attribute _step: the pixels a bolt moves per tick
+    # Invariant: _step is a float > 0 (once the header is read)
+    #
+    # Attribute _tick: the seconds per tick
+    # Invariant: _tick is a float > 0 (once the header is read)
+    #
+    # Attribute _last: the last snapshot decoded
+    # Invariant: _last is a Snapshot, or None before the first keyframe
+
+    def __init__(self):
+        """
+        Initializes a reader that has read nothing.
+        """
+        self._buffer = bytearray()
+        self._size = None
+        self._step = 0.0
+        self._tick = 0.0
+        self._last = None
+
+    def feed(self, data):
+        """
+        Returns the snapshots of the records completed by the given bytes
+
+        This method raises a ValueError if the stream does not start with a
+        valid header.
+
+        Parameter data: the next bytes of the stream
+        Precondition: data is a bytes-like object
+        """
+        buffer = self._buffer
+        buffer += data
+        result = []
+        pos = 0
+        while pos < len(buffer):
+            end = pos
+            while end < len(buffer) and buffer[end] & 0x80:
+                end += 1
+            if end == len(buffer):
+                break
+            length, start = getvarint(buffer, pos)
+            if start+length > len(buffer):
+                break
+            record = bytes(buffer[start:start+length])
+            pos = start+length
+            if self._size is None:
+                self._header(record)
+            elif record[0] == KEYFRAME:
+                self._last = decode(record, *self._size)
+                result.append(self._last)
+            elif self._last is not None:
+                self._last = patch(self._last, record, self._step, self._tick)
+                result.append(self._last)
+        del buffer[:pos]
+        return result
+
+    # HELPER METHODS
+    def _header(self, record):
+        """
+        Reads the header of the stream
+
+        Parameter record: the header (without its length)
+        Precondition: record is a bytes object
+        """
+        if record[:len(MAGIC)] != MAGIC:
+            raise ValueError('not a snapshot stream')
+        version, cols, rows, self._step, self._tick = struct.unpack_from(HEADER, record, len(MAGIC))
+        if version != VERSION:
+            raise ValueError('unknown snapshot stream version %d' % version)
+        self._size = (cols, rows)
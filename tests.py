@@ -0,0 +1,277 @@
+"""
+Unit tests for Alien Invaders
+
+These tests play the headless Simulation, so they need neither a window nor
+Kivy.  Run them from the game folder with
+
+    python -m unittest tests
+
+Paliska Bradley, bp355 and Philip Coppolino, pcc78
+"""
+from consts import *
+from simulation import Simulation, ScriptedInput, play
+from allocs import Audit
+from latency import EventInput, LatencyProbe
+import replay
+import snapshot
+import os
+import random
+import tempfile
+import tracemalloc
+import unittest
+
+
+def outcome(sim):
+    """
+    Returns what a player can see of a simulation, as a tuple
+
+    Parameter sim: the simulation to look at
+    Precondition: sim is a Simulation object
+    """
+    ship = sim.getShip()
+    aliens = sim.getAliens()
+    alive = tuple(aliens.isAlive(i) for i in range(aliens.getSize()))
+    return (sim.state(), sim.getScore(), sim.getLives(), ship and (ship.x, ship.y),
+            aliens.getOrigin(), alive)
+
+
+class SimulationTest(unittest.TestCase):
+    """
+    Tests of the headless Simulation
+    """
+
+    def test_ship_moves(self):
+        sim = Simulation()
+        start = sim.getShip().x
+        input = ScriptedInput([('left',)]*5)
+        play(sim, input, 5)
+        self.assertLess(sim.getShip().x, start)
+
+    def test_same_seed_same_game(self):
+        script = [('left', 'spacebar')]*60+[('right', 'spacebar')]*60
+        results = []
+        for run in range(2):
+            sim = Simulation(1110)
+            play(sim, ScriptedInput(script), 600)
+            results.append(outcome(sim))
+        self.assertEqual(results[0], results[1])
+
+
+    def test_reset_is_new_game(self):
+        script = [('right', 'spacebar')]*200+[('left', 'spacebar')]*400
+        sim = Simulation(7)
+        play(sim, ScriptedInput(script), 1200)
+        sim.nextwave()
+        play(sim, ScriptedInput(script), 300)
+        sim.reset(1110)
+        fresh = Simulation(1110)
+        self.assertEqual(outcome(sim), outcome(fresh))
+        self.assertEqual(sim.getWave(), 1)
+        play(sim, ScriptedInput(script), 1200)
+        play(fresh, ScriptedInput(script), 1200)
+        self.assertEqual(outcome(sim), outcome(fresh))
+
+    def test_long_update_cannot_tunnel(self):
+        for steps in (1, 4, 16, 64):
+            sim = Simulation(0, speed=float('inf'))
+            aliens = sim.getAliens()
+            count = aliens.getCount()
+            shooter = aliens.shooter(0)
+            sim.getBolts().fire(aliens.getX(shooter), DEFENSE_LINE+SHIP_HEIGHT, False)
+            for update in range(128//steps):
+                sim.update(ScriptedInput(), SIM_STEP*steps)
+            self.assertEqual(aliens.getCount(), count-1, steps)
+            self.assertEqual(sim.getBolts().getCount(), 0, steps)
+
+    def test_bolt_hits_ship_before_it_moves(self):
+        # The bolt reaches the ship in this update, which moves it out of reach
+        sim = Simulation(0, speed=float('inf'))
+        ship = sim.getShip()
+        reach = (SHIP_WIDTH+BOLT_WIDTH)/2
+        sim.getBolts().fire(ship.x+reach-1, ship.y+(SHIP_HEIGHT+BOLT_HEIGHT)/2+BOLT_SPEED/2, True)
+        lives = sim.getLives()
+        input = ScriptedInput()
+        input.hold(('left',))
+        sim.update(input, SIM_STEP)
+        self.assertEqual(sim.getLives(), lives-1)
+        self.assertNotEqual(sim.getFrame(), 0)
+
+    def test_bolt_hits_target_at_start_of_path(self):
+        # A bolt that starts inside the ship and moves out of it still hits it
+        sim = Simulation(0, speed=float('inf'))
+        ship = sim.getShip()
+        sim.getBolts().fire(ship.x, ship.y-(SHIP_HEIGHT+BOLT_HEIGHT)/2+BOLT_SPEED/2, True)
+        lives = sim.getLives()
+        sim.update(ScriptedInput(), SIM_STEP)
+        self.assertEqual(sim.getLives(), lives-1)
+        self.assertNotEqual(sim.getFrame(), 0)
+
+    def test_ship_explodes_for_death_speed(self):
+        sim = Simulation(0, speed=float('inf'))
+        ship = sim.getShip()
+        sim.getBolts().fire(ship.x, ship.y+(SHIP_HEIGHT+BOLT_HEIGHT)/2, True)
+        updates = 0
+        while sim.getShip() is not None:
+            sim.update(ScriptedInput(), SIM_STEP)
+            updates += 1
+        self.assertAlmostEqual(updates*SIM_STEP, DEATH_SPEED, delta=2*SIM_STEP)
+        self.assertEqual(sim.state(), 'pause')
+
+    def test_ship_stops_at_edges(self):
+        for key in ('right', 'left'):
+            edges = []
+            for steps in (1, 4, 64):
+                sim = Simulation(0, speed=float('inf'))
+                play(sim, ScriptedInput([(key,)]*(256//steps)), 256//steps, SIM_STEP*steps)
+                edges.append(sim.getShip().x)
+            self.assertEqual(edges, [edges[0]]*3, key)
+            self.assertIn(edges[0], (SHIP_WIDTH//2, GAME_WIDTH-SHIP_WIDTH//2))
+
+
+class ReplayTest(unittest.TestCase):
+    """
+    Tests of recording and replaying games
+    """
+
+    def test_round_trip(self):
+        rng = random.Random(5)
+        keys = ((), ('left',), ('right',), ('spacebar',), ('left', 'spacebar'))
+        script = [rng.choice(keys) for update in range(900)]
+        sim = Simulation(42)
+        recording = replay.Recording(sim.getSeed())
+        input = ScriptedInput()
+        for keys in script:
+            if sim.state() in ('over', 'win'):
+                break
+            if sim.state() == 'pause':
+                sim.new()
+            input.hold(keys)
+            recording.record(input)
+            sim.update(input, SIM_STEP)
+        handle, filename = tempfile.mkstemp(suffix='.inv')
+        os.close(handle)
+        try:
+            recording.save(filename)
+            loaded = replay.load(filename)
+        finally:
+            os.remove(filename)
+        self.assertEqual(loaded.getSeed(), 42)
+        self.assertEqual(loaded.getUpdates(), recording.getUpdates())
+        self.assertEqual(outcome(replay.replay(loaded)), outcome(sim))
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+class SnapshotTest(unittest.TestCase):
+    """
+    Tests of encoding games as snapshots
+    """
+
+    def test_stream_round_trip(self):
+        rng = random.Random(7)
+        keys = ((), ('left',), ('right',), ('spacebar',), ('left', 'spacebar'))
+        sim = Simulation(3)
+        stream = snapshot.Stream(sim, keyframe=100)
+        reader = snapshot.Reader()
+        input = ScriptedInput()
+        for update in range(900):
+            if sim.state() == 'pause':
+                sim.new()
+            elif sim.state() is not None:
+                break
+            input.hold(rng.choice(keys))
+            sim.update(input, SIM_STEP)
+            data = stream.tick()
+            # Feed the bytes in uneven pieces, as they would come from a socket
+            decoded = reader.feed(data[:3])+reader.feed(data[3:])
+            self.assertEqual(len(decoded), 1, update)
+            self.assertEqual(decoded[0].encode(), snapshot.Snapshot(sim).encode(), update)
+
+    def test_restore(self):
+        sim = Simulation(3)
+        input = ScriptedInput()
+        input.hold(('spacebar',))
+        for update in range(600):
+            sim.update(input, SIM_STEP)
+        taken = snapshot.Snapshot(sim)
+        copy = Simulation(4)
+        copy.restore(snapshot.decode(taken.encode(), *taken.getSize()))
+        self.assertEqual(snapshot.Snapshot(copy).encode(), taken.encode())
+
+
+class AuditTest(unittest.TestCase):
+    """
+    Tests of the allocations of the frame loop
+    """
+
+    def test_frames_within_budget(self):
+        self.addCleanup(tracemalloc.stop)
+        audit = Audit(600)
+        sim = Simulation(0)
+        sim.setProfiler(audit)
+        input = ScriptedInput()
+        rng = random.Random(0)
+        keys = ((), ('left',), ('right',), ('spacebar',), ('left', 'spacebar'))
+        for frame in range(720):
+            # The first frames fill the caches and grow the arrays
+            if frame == 120:
+                audit.clear()
+            input.hold(rng.choice(keys))
+            audit.start()
+            sim.update(input, SIM_STEP)
+            if sim.state() == 'pause':
+                sim.new()
+            elif sim.state() is not None:
+                sim.reset()
+            audit.lap('statecheck')
+            audit.finish()
+        self.assertEqual(audit.getFrames(), 600)
+        audit.check()
+
+
+class LatencyTest(unittest.TestCase):
+    """
+    Tests of the timestamped key events and the latency probe
+    """
+
+    def test_repeated_down_events(self):
+        # The window repeats the down events of a held key; they are not presses
+        keys = EventInput()
+        keys.press('s', 1.0)
+        keys.advance()
+        self.assertTrue(keys.is_key_pressed('s'))
+        self.assertEqual(keys.getPressed('s'), 1.0)
+        keys.press('s', 2.0)
+        keys.press('s', 3.0)
+        keys.advance()
+        self.assertTrue(keys.is_key_down('s'))
+        self.assertFalse(keys.is_key_pressed('s'))
+        keys.release('s', 4.0)
+        keys.press('s', 5.0)
+        keys.advance()
+        self.assertEqual(keys.getPressed('s'), 5.0)
+
+    def test_tap_between_updates(self):
+        keys = EventInput()
+        keys.press('left', 1.0)
+        keys.release('left', 2.0)
+        keys.advance()
+        self.assertTrue(keys.is_key_down('left'))
+        keys.advance()
+        self.assertEqual(keys.key_count, 0)
+
+    def test_probe(self):
+        probe = LatencyProbe(samples=4, timeout=1.0)
+        probe.press(10.0, (None, 100, 0))
+        probe.drawn((None, 100, 0), 10.01)
+        self.assertTrue(probe.isWaiting())
+        probe.drawn((None, 104, 0), 10.02)
+        self.assertFalse(probe.isWaiting())
+        # A press with no effect is dropped after the timeout
+        probe.press(20.0, (None, 0, 0))
+        probe.drawn((None, 0, 0), 21.5)
+        self.assertFalse(probe.isWaiting())
+        self.assertEqual(probe.getCount(), 1)
+        self.assertAlmostEqual(probe.percentiles((50,))[0], 0.02)
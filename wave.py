@@ -7,6 +7,11 @@ you move to a new level, you are expected to make a new instance of the class.
 
 The subcontroller Wave manages the ship, the aliens and any laser bolts on
 screen. These are model objects.  Their classes are defined in models.py.
+The rules of the wave are played by a headless Simulation (simulation.py);
+Wave keeps the model objects in sync with it and draws them.  The aliens and
+bolts are drawn in batches (render.py), a few draw calls for all of them.  The
+aliens and the defense line are drawn into an offscreen layer, which is only
+redrawn when the aliens march or one dies.
 
 Most of your work on this assignment will be in either this module or
 models.py. Whether a helper method belongs in this module or models.py is
@@ -19,13 +24,16 @@ Paliska Bradley, bp355 and Philip Coppolino, pcc78
 from game2d import *
 from consts import *
 from models import *
-import random
+from simulation import *
+from render import *
 
 # PRIMARY RULE: Wave can only access attributes in models.py via getters/setters
 # Wave is NOT allowed to access anything in app.py (Subcontrollers are not
 # permitted to access anything in their parent. To see why, take CS 3152)
 
 
+
+
 class Wave(object):
     """
     This class controls a single level or wave of Alien Invaders.
@@ -34,8 +42,13 @@ class Wave(object):
     on screen. It animates the laser bolts, removing any aliens as necessary.
     It also marches the aliens back and forth across the screen until they are
     all destroyed or they reach the defense line (at which point the player
-    loses). When the wave is complete, you  should create a NEW instance of
-    Wave (in Invaders) if you want to make a new wave of aliens.
+    loses). When the wave is complete, call nextwave (after a win) or reset
+    (for a new game) to start again; both reuse every object of the wave.
+
+    The rules themselves are played by a Simulation, which works on plain
+    geometry and can also run without a window.  After every update, Wave
+    copies the positions from the simulation to its model objects, creating
+    or removing them as the simulation does, so that they can be drawn.
 
     If you want to pause the game, tell this controller to draw, but do not
     update.  See subcontrollers.py from Lecture 24 for an example.  This
@@ -51,288 +64,223 @@ class Wave(object):
 
     """
     # HIDDEN ATTRIBUTES:
-    # Attribute _ship: the player ship to control
-    # Invariant: _ship is a Ship object or None
+    # Attribute _sim: the headless simulation playing the rules of the wave
+    # Invariant: _sim is a Simulation object
+    #
+    # Attribute _ship: the player ship to draw
+    # Invariant: _ship is _sprite, or None exactly when the ship of _sim is None
     #
-    # Attribute _aliens: the 2d list of aliens in the wave
-    # Invariant: _aliens is a rectangular 2d list containing Alien objects or None
+    # Attribute _sprite: the ship model, created once and reused on respawn
+    # Invariant: _sprite is a Ship object
     #
-    # Attribute _bolts: the laser bolts currently on screen
-    # Invariant: _bolts is a list of Bolt objects, possibly empty
+    # Attribute _aliens: the batch drawing the alien formation of _sim
+    # Invariant: _aliens is a FormationBatch object
+    #
+    # Attribute _bolts: the batch drawing the laser bolts of _sim
+    # Invariant: _bolts is a BoltBatch object
     #
     # Attribute _dline: the defensive line being protected
     # Invariant : _dline is a GPath object
     #
-    # Attribute _lives: the number of lives left
-    # Invariant: _lives is an int >= 0
+    # Attribute _layer: the offscreen layer with the aliens and defensive line
+    # Invariant: _layer is a Layer object showing _aliens and _dline as they
+    # were at the last call to _sync
     #
-    # Attribute _time: the amount of time since the last Alien "step"
-    # Invariant: _time is a float >= 0s
+    # Attribute _lastx: the x coordinate of the ship before the last update
+    # Invariant: _lastx is an int or a float, or None if the ship was not
+    # alive before the last update
     #
-    # You may change any attribute above, as long as you update the invariant
-    # You may also add any new attributes as long as you document them.
-    # LIST MORE ATTRIBUTES (AND THEIR INVARIANTS) HERE IF NECESSARY
-
-    #Attribute _right: the alien direction (True = right and False = left)
-    #Invariant: _right is a bool
-
-    #Attribute _player: the bolt from ship (True = ship and False = alien)
-    #Invariant: _player is a bool
-
-    #Attribute _mright: x coordinate of the alien most on the right
-    #Invariant: _mright is an int or a float
-
-    #Attribute _mleft: x coordinate of the alien most on the left
-    #Invariant: _mleft is an int or a float
-
-    #Attribute _mdown: y coordinate of the lowest alien
-    #Invariant: _mleft is an int or a float
-
-    #Attribute _step: number of alien steps since last bolt they fired
-    #Invariant: _step is an int
-
-    #Attribute _firestep: when to fire (in alien steps)
-    #Invariant: _firestep is an int or None
+    # Attribute _profiler: the profiler timing the stages of drawing
+    # Invariant: _profiler is a Profiler object, or None if profiling is off
 
     # GETTERS AND SETTERS (ONLY ADD IF YOU NEED THEM)
     def state(self):
         """
-        Determine the message to give to
-        """
-        if self._ship == None and self._lives > 0:
-            return 'pause'
-        if self._ship == None and self._lives == 0:
-            return 'over'
-        indexlist = []
-        max = GAME_HEIGHT
-        for col in self._aliens:
-            for aliens in col[::-1]:
-                if aliens is not None:
-                    if max > aliens.y:
-                        max = aliens.y
-                if aliens.y <= DEFENSE_LINE:
-                    return 'over'
-        currentwin = False
-        livingaliens = []
-        for row in self._aliens:
-            for alien in row:
-                if alien is not None:
-                    livingaliens.append(alien)
-        if len(livingaliens) == 0:
-            return 'win'
+        Returns the state of the wave ('pause', 'over', 'win' or None)
 
-    def new(self):
+        See the method state in Simulation for the meaning of each value.
         """
-        When the game is unpaused recreate a new ship
+        return self._sim.state()
+
+    def getScore(self):
         """
-        self._ship = Ship(GAME_WIDTH//2, SHIP_BOTTOM+SHIP_HEIGHT//2)
+        Returns the points for the aliens destroyed so far
+        """
+        return self._sim.getScore()
 
+    def getLives(self):
+        """
+        Returns the number of lives left
+        """
+        return self._sim.getLives()
 
-    # INITIALIZER (standard form) TO CREATE SHIP AND ALIENS
-    def __init__(self):
+    def getSeed(self):
         """
-        initialize the attributes before the animation starts
+        Returns the seed of the random numbers of this wave
         """
+        return self._sim.getSeed()
 
-        self._aliencreation()
-        self._ship = Ship(GAME_WIDTH//2, SHIP_BOTTOM+SHIP_HEIGHT//2)
-        self._dline = GPath(points=[0,DEFENSE_LINE,GAME_WIDTH,DEFENSE_LINE],linewidth=2,linecolor='black')
-        self._time = 0
-        self._lives = 3
-        self._right = True
-        self._mright = 0
-        self._mleft = GAME_WIDTH
-        self._bolts = []
-        self._mdown = 0
-        self._player = False
-        self._step = 0
-        self._firestep = random.randint(1, BOLT_RATE)
+    def getWave(self):
+        """
+        Returns the number of the current wave in this game (starting at 1)
+        """
+        return self._sim.getWave()
 
-    # UPDATE METHOD TO MOVE THE SHIP, ALIENS, AND LASER BOLTS
-    def update(self,input,dt):
+    def getShipX(self):
+        """
+        Returns the horizontal coordinate of the ship (None if there is no ship)
+        """
+        ship = self._sim.getShip()
+        return None if ship is None else ship.x
+
+    def getFired(self):
+        """
+        Returns the number of bolts fired by the player
         """
+        return self._sim.getFired()
 
+    def getSimulation(self):
         """
-        if self._ship != None:
-            self._shipmovement(input)
-            self._fireship(input)
-            self._hitdetection()
-        if self._aliens != None:
-            self._alienmovement(dt)
-            self._firealien()
-            self._boltmovement(dt)
+        Returns the headless simulation playing this wave
+        """
+        return self._sim
 
+    def setProfiler(self, profiler):
+        """
+        Sets the profiler timing the stages of each update and draw
 
+        Parameter profiler: the profiler to use (None turns profiling off)
+        Precondition: profiler is a Profiler object or None
+        """
+        self._profiler = profiler
+        self._sim.setProfiler(profiler)
 
-    # DRAW METHOD TO DRAW THE SHIP, ALIENS, DEFENSIVE LINE AND BOLTS
-    def _aliencreation(self):
+    def new(self):
         """
-        Return the list of aliens in the right position
+        When the game is unpaused recreate a new ship
         """
-        ystart = GAME_HEIGHT - (ALIEN_CEILING + (ALIEN_HEIGHT*(ALIEN_ROWS-1))+(ALIEN_V_SEP * ALIEN_ROWS))
-        aliens = []
-        for row in range(ALIENS_IN_ROW):
-            aliens.append([])
-            xoffset = 2 * ALIEN_H_SEP + (ALIEN_H_SEP + ALIEN_WIDTH)* row
-            for col in range(ALIEN_ROWS):
-                yoffset = ystart + (col*(ALIEN_V_SEP + ALIEN_HEIGHT))
-                imageselector = ALIEN_IMAGES1[(col//2) % len(ALIEN_IMAGES1)]
-                aliens[row].append(Alien(xoffset,yoffset,imageselector))
-        self._aliens = aliens
+        self._sim.new()
+        self._lastx = None
+        self._sync()
 
+    def reset(self, seed=None):
+        """
+        Starts a new game in place (see the method reset in Simulation)
 
+        Parameter seed: the seed of the random numbers (None picks one)
+        Precondition: seed is an int >= 0 or None
+        """
+        self._sim.reset(seed)
+        self._lastx = None
+        self._sync()
 
-    def _shipmovement(self,input):
+    def nextwave(self):
         """
-        Move the ship
+        Starts the next wave after this one was won (see Simulation)
+        """
+        self._sim.nextwave()
+        self._lastx = None
+        self._sync()
 
-        Parameter input: user input, used to control the ship or resume the game
-        Precondition: input is an instance of GInput (inherited from GameApp)
+
+    # INITIALIZER (standard form) TO CREATE SHIP AND ALIENS
+    def __init__(self, sim=None, atlas=None):
         """
-        if input.is_key_down('right'):
-            if self._ship.x < GAME_WIDTH - SHIP_WIDTH//2:
-                self._ship.x += SHIP_MOVEMENT
-        if input.is_key_down('left'):
-            if self._ship.x > SHIP_WIDTH//2:
-                self._ship.x -= SHIP_MOVEMENT
+        initialize the attributes before the animation starts
 
+        The atlas of the alien images is shared by every wave (see assets.py);
+        it is only built here if none is given.
 
+        Parameter sim: the simulation to render (a new one if None)
+        Precondition: sim is a Simulation object or None
 
-    def _alienmovement(self,dt):
+        Parameter atlas: the atlas of the alien images (a new one if None)
+        Precondition: atlas is an Atlas of ALIEN_IMAGES1, or None
         """
-        Move the aliens
+        if sim is None:
+            sim = Simulation()
+        if atlas is None:
+            atlas = Atlas(ALIEN_IMAGES1)
+        self._sim = sim
+        self._aliens = FormationBatch(atlas)
+        self._ship = None
+        self._sprite = Ship(0,SHIP_BOTTOM+SHIP_HEIGHT/2)
+        self._bolts = BoltBatch()
+        self._dline = GPath(points=[0,DEFENSE_LINE,GAME_WIDTH,DEFENSE_LINE],linewidth=2,linecolor='black')
+        self._layer = Layer()
+        self._lastx = None
+        self._profiler = None
+        self._sync()
 
-        Parameter dt: The time since the last animation frame.
-        Precondition: dt is a float.
+    # UPDATE METHOD TO MOVE THE SHIP, ALIENS, AND LASER BOLTS
+    def update(self,input,dt):
         """
-        self._time += dt
-        if self._time > ALIEN_SPEED:
-            self._step += 1
-            if self._right == True:
-                self._mostright()
-                for row in self._aliens:
-                    for alien in row:
-                        if self._mright + ALIEN_H_WALK < GAME_WIDTH - ALIEN_WIDTH/2:
-                            alien.x += ALIEN_H_WALK
-                        else:
-                            alien.y -= ALIEN_V_WALK
-                            self._right = False
-            else:
-                self._mostleft()
-                for row in self._aliens:
-                    for alien in row:
-                        if self._mleft - ALIEN_H_WALK > ALIEN_WIDTH/2:
-                            alien.x -= ALIEN_H_WALK
-                        else:
-                            alien.y -= ALIEN_V_WALK
-                            self._right = True
-            self._time = 0
+        Animates a single update of the wave.
 
+        The models are not moved until the wave is drawn, so several updates
+        per animation frame cost no more drawing work than one.
 
-    def _boltmovement(self,dt):
-        """
-        Move the bolt
+        Parameter input: user input, used to control the ship
+        Precondition: input is an instance of GInput (inherited from GameApp)
 
-        Parameter dt: The time since the last animation frame.
-        Precondition: dt is a float.
+        Parameter dt: The time in seconds since last update
+        Precondition: dt is a number (int or float)
         """
-        for bolt in self._bolts:
-            bolt.y += bolt._velocity
-            bolt.findcorners()
+        ship = self._sim.getShip()
+        self._lastx = None if ship is None else ship.x
+        self._sim.update(input,dt)
 
 
-    def _mostright(self):
-        """
-        Find the most right alien
+    # DRAW METHOD TO DRAW THE SHIP, ALIENS, DEFENSIVE LINE AND BOLTS
+    def draw(self, view, alpha=1.0):
         """
-        mright = 0
-        for row in self._aliens:
-            for alien in row:
-                if alien.x > mright:
-                    mright = alien.x
-        self._mright = mright
+        Draws the game objects to the view.
 
+        If alpha is less than 1, the ship and bolts are drawn between their
+        positions before and after the last update (alpha = 0 is before).
+        This smooths the animation when there is not exactly one update per
+        frame.  Aliens always jump from step to step, so they are not moved.
 
-    def _mostleft(self):
-        """
-        Find the most left alien
+        Parameter view: the game view, used in drawing
+        Precondition: view is an instance of GView
+
+        Parameter alpha: how far to draw between the last two updates
+        Precondition: alpha is a float in 0..1
         """
-        mleft = GAME_WIDTH
-        for row in self._aliens:
-            for alien in row:
-                if alien.x < mleft:
-                    mleft = alien.x
-        self._mleft = mleft
+        profiler = self._profiler
+        self._sync()
+        if alpha < 1 and self._ship is not None and self._lastx is not None:
+            self._ship.x = self._lastx + (self._ship.x - self._lastx)*alpha
+        if profiler is not None:
+            profiler.lap('sync')
+        self._bolts.update(self._sim.getBolts(),alpha)
+        if profiler is not None:
+            profiler.lap('boltbatch')
+        self._layer.draw(view)
+        if self._ship is not None:
+            self._ship.draw(view)
+        self._bolts.draw(view)
+        if profiler is not None:
+            profiler.lap('draw')
 
 
-    def _fireship(self,input):
+    # HELPER METHODS
+    def _sync(self):
         """
-        Make the ship fire a bolt
+        Copies the ship position and alien formation from the simulation
 
-        Parameter input: user input, used to control the ship or resume the game
-        Precondition: input is an instance of GInput (inherited from GameApp)
-        """
-        alreadybolt = False
-        for shoot in self._bolts:
-            if shoot.getVelocity() > 0:
-                alreadybolt = True
-            if GAME_HEIGHT <= shoot.y:
-                self._bolts.remove(shoot)
-                alreadybolt = False
-        if input.is_key_down('spacebar') and alreadybolt is False:
-            self._bolts.append(Bolt(self._ship.x, SHIP_BOTTOM+SHIP_HEIGHT, False))
-
-
-    def _firealien(self):
-        """
-        Make the most bottom alien from a random column fire a bolt. The aliens
-        fire a bolt every (random number between 1 and 5) steps.
-        """
-        if self._step == self._firestep:
-            activecols = []
-            for col in self._aliens:
-                activecol = False
-                for alien in col:
-                    if alien is not None:
-                        activecol = True
-                if activecol is True:
-                    activecols.append(self._aliens.index(col))
-            if len(activecols) != 0:
-                shootingcol = activecols[random.randint(0, (len(activecols)-1))]
-                for alien in self._aliens[shootingcol][::-1]:
-                    if alien is not None:
-                        shooter = alien
-                self._bolts.append(Bolt(shooter.x,shooter.y,True))
-                self._firestep = random.randint(1, BOLT_RATE)
-                self._step = 0
-
-
-    def _hitdetection(self):
-        """
-        Detect if the ship or the aliens gets hit by a bold
-        """
-        for bolt in self._bolts:
-            if self._ship.collides(bolt):
-                self._ship = None
-                self._bolts.remove(bolt)
-                self._lives -= 1
-            for row in self._aliens:
-                for alien in row:
-                    if alien.collides(bolt):
-                        self._aliens[self._aliens.index(row)].remove(alien)
-                        self._bolts.remove(bolt)
-
-
-    def draw(self, view):
+        The offscreen layer is rendered again only if the formation changed.
         """
-        Draws the game objects to the view.
-        """
-        for row in self._aliens:
-            for alien in row:
-                alien.draw(view)
-        if self._ship !=None:
-            self._ship.draw(view)
-        self._dline.draw(view)
-        for bolt in self._bolts:
-            bolt.draw(view)
-    # HELPER METHODS FOR COLLISION DETECTION
+        ship = self._sim.getShip()
+        if ship is None:
+            self._ship = None
+        else:
+            if self._ship is None:
+                self._ship = self._sprite
+                self._ship.y = ship.y
+            self._ship.x = ship.x
+            if self._ship.frame != self._sim.getFrame():
+                self._ship.frame = self._sim.getFrame()
+
+        if self._aliens.update(self._sim.getAliens()) or self._layer.getRenders() == 0:
+            self._layer.render((self._aliens, self._dline))